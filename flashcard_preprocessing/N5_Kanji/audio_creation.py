@@ -1,4 +1,3 @@
-import boto3
 import pandas as pd
 import os
 
@@ -7,20 +6,24 @@ aws_region = os.environ.get('AWS_REGION')
 aws_access_key = os.environ.get('AWS_ACCESS_KEY')
 aws_secret_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
 
-polly_client = boto3.client(
-    "polly",
-    region_name=aws_region,
-    aws_access_key_id=aws_access_key,
-    aws_secret_access_key=aws_secret_key,
-)
+_polly_client = None
 
-# Create output directories
-os.makedirs("flashcard_preprocessing/N5_Kanji/audio/words/female", exist_ok=True)
-os.makedirs("flashcard_preprocessing/N5_Kanji/audio/words/male", exist_ok=True)
+def get_polly_client():
+    """The Polly client, created on first use (boto3 is only imported then)."""
+    global _polly_client
+    if _polly_client is None:
+        import boto3
+        _polly_client = boto3.client(
+            "polly",
+            region_name=aws_region,
+            aws_access_key_id=aws_access_key,
+            aws_secret_access_key=aws_secret_key,
+        )
+    return _polly_client
 
 def synthesize_speech(text, output_file, voice_id, engine="neural"):
     try:
-        response = polly_client.synthesize_speech(
+        response = get_polly_client().synthesize_speech(
             Text=text,
             OutputFormat="mp3",
             VoiceId=voice_id,
@@ -32,36 +35,45 @@ def synthesize_speech(text, output_file, voice_id, engine="neural"):
     except Exception as e:
         print(f"Error generating audio for '{text}': {e}")
 
-# Load CSV
-csv_file = "flashcard_preprocessing/N5_Kanji/N5_Kanji_List.csv"
-df = pd.read_csv(csv_file)
+def main():
+    # Create output directories
+    os.makedirs("flashcard_preprocessing/N5_Kanji/audio/words/female", exist_ok=True)
+    os.makedirs("flashcard_preprocessing/N5_Kanji/audio/words/male", exist_ok=True)
+
+    # Load CSV
+    csv_file = "flashcard_preprocessing/N5_Kanji/N5_Kanji_List.csv"
+    df = pd.read_csv(csv_file)
+
+    for index, row in df.iterrows():
+        kanji = row.get("Kanji")
+        examples = row.get("Example Words")
+
+        # Skip if no kanji or no example words
+        if pd.isna(kanji) or pd.isna(examples):
+            continue
 
-for index, row in df.iterrows():
-    kanji = row.get("Kanji")
-    examples = row.get("Example Words")
+        print(f"Processing row {index + 1} | Kanji: {kanji}")
 
-    # Skip if no kanji or no example words
-    if pd.isna(kanji) or pd.isna(examples):
-        continue
+        # Split by semicolon to get each example entry
+        example_list = [ex.strip() for ex in examples.split(";") if ex.strip()]
 
-    print(f"Processing row {index + 1} | Kanji: {kanji}")
+        for i, ex_text in enumerate(example_list, start=1):
+            # Separate the Japanese part from the English part (split on colon)
+            # e.g., "日本(にほん): Japan" -> "日本(にほん)"
+            japanese_part = ex_text.split(":", 1)[0].strip()
 
-    # Split by semicolon to get each example entry
-    example_list = [ex.strip() for ex in examples.split(";") if ex.strip()]
+            # ----- FEMALE (Tomoko) -----
+            female_path = f"flashcard_preprocessing/N5_Kanji/audio/words/female/{kanji}_example_{i}.mp3"
+            if not os.path.exists(female_path):
+                synthesize_speech(japanese_part, female_path, "Tomoko")
 
-    for i, ex_text in enumerate(example_list, start=1):
-        # Separate the Japanese part from the English part (split on colon)
-        # e.g., "日本(にほん): Japan" -> "日本(にほん)"
-        japanese_part = ex_text.split(":", 1)[0].strip()
+            # ----- MALE (Takumi) -----
+            male_path = f"flashcard_preprocessing/N5_Kanji/audio/words/male/{kanji}_example_{i}.mp3"
+            if not os.path.exists(male_path):
+                synthesize_speech(japanese_part, male_path, "Takumi")
 
-        # ----- FEMALE (Tomoko) -----
-        female_path = f"flashcard_preprocessing/N5_Kanji/audio/words/female/{kanji}_example_{i}.mp3"
-        if not os.path.exists(female_path):
-            synthesize_speech(japanese_part, female_path, "Tomoko")
+    print("All audio files have been generated.")
 
-        # ----- MALE (Takumi) -----
-        male_path = f"flashcard_preprocessing/N5_Kanji/audio/words/male/{kanji}_example_{i}.mp3"
-        if not os.path.exists(male_path):
-            synthesize_speech(japanese_part, male_path, "Takumi")
 
-print("All audio files have been generated.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from flashcard_preprocessing.cli import main
+
+main("flashcard_preprocessing")
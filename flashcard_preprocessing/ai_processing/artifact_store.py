@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Columnar artifact store for the flashcard pipeline.
+
+Instead of every stage rewriting an ever-wider CSV (List -> with_Example_Sentences
+-> and_Breakdowns -> and_Lessons), the stages share one SQLite file with one
+entity per item type ("vocab", "grammar", "kanji"). Each column of an entity
+is its own table, (row_id, value), so:
+
+    - a stage reads only the columns it needs (the breakdown JSON is never
+      loaded by a stage that doesn't ask for it)
+    - a stage writes only its own columns, and only the rows whose value
+      actually changed
+
+Columns keep their CSV names ("Example Sentence JP", "breakdown", "Lesson", ...)
+and their order, so the old CSV files can still be exported for the seed
+scripts and anything else that reads them.
+
+Configuration (.env or environment):
+    ARTIFACT_STORE_PATH  SQLite file (default: flashcard_preprocessing/flashcards.sqlite3)
+
+Usage (from the project root):
+    python flashcard_preprocessing/ai_processing/artifact_store.py import all
+    python flashcard_preprocessing/ai_processing/artifact_store.py export all
+    python flashcard_preprocessing/ai_processing/artifact_store.py import vocab --csv path/to/file.csv
+    python flashcard_preprocessing/ai_processing/artifact_store.py columns vocab
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+
+from dotenv import load_dotenv
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_STORE_PATH = os.getenv(
+    "ARTIFACT_STORE_PATH", os.path.join(PROJECT_ROOT, "flashcard_preprocessing", "flashcards.sqlite3")
+)
+
+# The most complete CSV of each entity, used to fill the store the first time
+CSV_SOURCES = {
+    "vocab": "flashcard_preprocessing/lesson_selection/N5_Vocab_List_with_Example_Sentences_and_Breakdowns_and_Lessons.csv",
+    "grammar": "flashcard_preprocessing/lesson_selection/N5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lessons.csv",
+    "kanji": "flashcard_preprocessing/lesson_selection/N5_Kanji_List_and_Lessons.csv",
+}
+
+_EXAMPLE_COLUMNS = ["JLPT", "Word", "Reading", "Meaning", "Word Type", "Example Sentence JP", "Example Sentence EN"]
+_LESSON_COLUMNS = ["JLPT", "Lesson", "Word", "Reading", "Meaning", "Word Type",
+                   "Example Sentence JP", "Example Sentence EN", "breakdown", "type"]
+
+# The CSVs the stages used to write: (entity, path, columns, JLPT level)
+CSV_EXPORTS = [
+    ("vocab", "flashcard_preprocessing/N5_Vocab/N5_Vocab_List_with_Example_Sentences.csv", _EXAMPLE_COLUMNS, "N5"),
+    ("vocab", "flashcard_preprocessing/N5_Vocab/N5_Vocab_List_with_Example_Sentences_and_Breakdowns.csv",
+     _EXAMPLE_COLUMNS + ["breakdown"], "N5"),
+    ("vocab", CSV_SOURCES["vocab"], _LESSON_COLUMNS, "N5"),
+    ("grammar", "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences.csv", _EXAMPLE_COLUMNS, "N5"),
+    ("grammar", "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences_and_Breakdowns.csv",
+     _EXAMPLE_COLUMNS + ["breakdown"], "N5"),
+    ("grammar", CSV_SOURCES["grammar"], _LESSON_COLUMNS, "N5"),
+    ("kanji", CSV_SOURCES["kanji"], None, "N5"),
+]
+
+
+def _table(entity, column=None) -> str:
+    """Quoted table name for an entity's row list, or for one of its columns."""
+    name = entity if column is None else f"{entity}.{column}"
+    return '"' + name.replace('"', '""') + '"'
+
+
+class ArtifactStore:
+    """One SQLite file, one table per (entity, column)."""
+
+    def __init__(self, path=None):
+        self.path = str(path or DEFAULT_STORE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS columns ("
+            " entity TEXT NOT NULL, name TEXT NOT NULL, position INTEGER NOT NULL,"
+            " PRIMARY KEY (entity, name))"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── schema ──────────────────────────────────────────────────────────────
+
+    def columns(self, entity) -> list:
+        """The entity's columns in CSV order."""
+        return [name for (name,) in self.conn.execute(
+            "SELECT name FROM columns WHERE entity = ? ORDER BY position", (entity,))]
+
+    def _ensure_entity(self, entity):
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_table(entity)} (row_id INTEGER PRIMARY KEY)")
+
+    def add_column(self, entity, column, after=None):
+        """Adds an (empty) column; `after` puts it right behind an existing one in the CSV order."""
+        existing = self.columns(entity)
+        if column in existing:
+            return
+        self._ensure_entity(entity)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {_table(entity, column)} (row_id INTEGER PRIMARY KEY, value TEXT)"
+        )
+        position = existing.index(after) + 1 if after in existing else len(existing)
+        self.conn.execute("UPDATE columns SET position = position + 1 WHERE entity = ? AND position >= ?",
+                          (entity, position))
+        self.conn.execute("INSERT INTO columns (entity, name, position) VALUES (?, ?, ?)",
+                          (entity, column, position))
+        self.conn.commit()
+
+    def drop_entity(self, entity):
+        for column in self.columns(entity):
+            self.conn.execute(f"DROP TABLE IF EXISTS {_table(entity, column)}")
+        self.conn.execute(f"DROP TABLE IF EXISTS {_table(entity)}")
+        self.conn.execute("DELETE FROM columns WHERE entity = ?", (entity,))
+        self.conn.commit()
+
+    # ─── rows ────────────────────────────────────────────────────────────────
+
+    def row_ids(self, entity) -> list:
+        self._ensure_entity(entity)
+        return [row_id for (row_id,) in self.conn.execute(f"SELECT row_id FROM {_table(entity)} ORDER BY row_id")]
+
+    def append_rows(self, entity, rows) -> list:
+        """Adds new rows (dicts keyed by column name); returns their row ids."""
+        self._ensure_entity(entity)
+        # row ids count from 0, so for an imported CSV they match the row positions
+        # (the keys the breakdown journals and response archives use)
+        (next_id,) = self.conn.execute(f"SELECT COALESCE(MAX(row_id) + 1, 0) FROM {_table(entity)}").fetchone()
+        row_ids = []
+        columns = {}
+        for row_id, row in enumerate(rows, start=next_id):
+            self.conn.execute(f"INSERT INTO {_table(entity)} (row_id) VALUES (?)", (row_id,))
+            row_ids.append(row_id)
+            for column, value in row.items():
+                if column is not None:  # csv.DictReader's key for surplus fields
+                    columns.setdefault(column, {})[row_id] = value
+        for column, values in columns.items():
+            self.add_column(entity, column)
+            self.update(entity, column, values)
+        self.conn.commit()
+        return row_ids
+
+    def read(self, entity, columns, where=None) -> list:
+        """
+        Returns [{"row_id": ..., column: value, ...}] in row order, loading
+        only the given columns (plus the ones `where` filters on, e.g.
+        {"JLPT": "N5"}). Missing values are None.
+        """
+        rows = {row_id: {"row_id": row_id} for row_id in self.row_ids(entity)}
+        existing = set(self.columns(entity))
+        wanted = list(dict.fromkeys([*columns, *(where or {})]))
+        for column in wanted:
+            if column not in existing:
+                for row in rows.values():
+                    row[column] = None
+                continue
+            values = dict(self.conn.execute(f"SELECT row_id, value FROM {_table(entity, column)}"))
+            for row_id, row in rows.items():
+                row[column] = values.get(row_id)
+        result = [
+            row for row in rows.values()
+            if all(row.get(column) == value for column, value in (where or {}).items())
+        ]
+        for row in result:
+            for column in (where or {}):
+                if column not in columns:
+                    del row[column]
+        return result
+
+    def update(self, entity, column, values) -> int:
+        """
+        Writes {row_id: value} into one column, creating it if needed. Rows
+        whose stored value is already equal are not touched. Returns the
+        number of rows written.
+        """
+        self.add_column(entity, column)
+        table = _table(entity, column)
+        before = self.conn.total_changes
+        self.conn.executemany(
+            f"INSERT INTO {table} (row_id, value) VALUES (?, ?) "
+            f"ON CONFLICT(row_id) DO UPDATE SET value = excluded.value WHERE value IS NOT excluded.value",
+            [(row_id, None if value is None else str(value)) for row_id, value in values.items()],
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    # ─── CSV import / export ─────────────────────────────────────────────────
+
+    def import_csv(self, entity, csv_path):
+        """Replaces the entity with the rows of a CSV file (row ids follow the file order)."""
+        with open(csv_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.drop_entity(entity)
+        return self.append_rows(entity, rows)
+
+    def export_csv(self, entity, csv_path, columns=None, where=None):
+        """Writes the entity (or some of its columns) as a CSV, atomically."""
+        columns = columns or self.columns(entity)
+        rows = self.read(entity, columns, where)
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n", extrasaction="ignore")
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow({column: "" if row[column] is None else row[column] for column in columns})
+
+        atomic_write(csv_path, write)
+        return len(rows)
+
+
+def export_all(store, entities=None):
+    """Regenerates the CSV files the stages used to write."""
+    for entity, path, columns, level in CSV_EXPORTS:
+        if entities and entity not in entities:
+            continue
+        if not store.row_ids(entity):
+            continue
+        count = store.export_csv(entity, path, columns, where={"JLPT": level})
+        print(f"📄 {entity}: {count} rows -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import/export the flashcard artifact store")
+    parser.add_argument("command", choices=["import", "export", "columns"])
+    parser.add_argument("entities", nargs="+", choices=[*CSV_SOURCES, "all"])
+    parser.add_argument("--csv", help="CSV to import from / export to (single entity only)")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="SQLite file (default: %(default)s)")
+    args = parser.parse_args()
+
+    entities = list(CSV_SOURCES) if "all" in args.entities else args.entities
+    if args.csv and len(entities) != 1:
+        parser.error("--csv needs exactly one entity")
+
+    with ArtifactStore(args.store) as store:
+        for entity in entities:
+            if args.command == "columns":
+                print(f"{entity}: {', '.join(store.columns(entity))}")
+            elif args.command == "import":
+                source = args.csv or CSV_SOURCES[entity]
+                print(f"📥 {entity}: {len(store.import_csv(entity, source))} rows from {source}")
+            elif args.csv:
+                print(f"📄 {entity}: {store.export_csv(entity, args.csv)} rows -> {args.csv}")
+        if args.command == "export" and not args.csv:
+            export_all(store, entities)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Offline batch-job support for bulk chat completion runs.
+
+A batch run has four steps:
+    1. write_request_file   - one JSONL line per request, keyed by a custom_id
+    2. run_batch            - submit the file, poll until it finishes, collect the output
+    3. read_results         - {custom_id: completion text} for merging back into a CSV
+    4. finish_batch         - drop the saved batch state once the results are merged
+
+The submit/poll/collect step goes through a backend object so it can be
+swapped out:
+    OpenAIBatchBackend    - the real OpenAI Batch API (half price, 24h window)
+    LocalDirBatchBackend  - a directory-based stand-in for offline runs and tests
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from flashcard_preprocessing.ai_processing.llm_cache import get_cache, make_key, usage_to_dict
+
+# Load environment variables from .env file
+load_dotenv()
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_request_file(path, requests):
+    """
+    Writes a batch input file.
+
+    requests : iterable of (custom_id, params) where params are the
+               chat completion parameters (model, messages, ...)
+
+    Returns the number of requests written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, params in requests:
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": CHAT_ENDPOINT,
+                "body": params,
+            }, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_results(request_path, output_path):
+    """
+    Reads a collected batch output file and returns {custom_id: completion text}.
+
+    Failed requests are left out, so callers can treat missing ids as
+    "still to do". Successful answers are also stored in the response cache,
+    so a later live run with the same prompt costs nothing.
+    """
+    bodies = {}
+    with open(request_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                req = json.loads(line)
+                bodies[req["custom_id"]] = req["body"]
+
+    cache = get_cache()
+    results = {}
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                print(f"❌ Batch request {record.get('custom_id')} failed: {record.get('error') or response}")
+                continue
+
+            body = response["body"]
+            content = body["choices"][0]["message"]["content"]
+            results[record["custom_id"]] = content
+
+            params = bodies.get(record["custom_id"])
+            if cache is not None and params is not None and content:
+                usage = body.get("usage") or {}
+                cache.put(make_key(params), params.get("model", ""), content, {
+                    "prompt_tokens": usage.get("prompt_tokens", 0),
+                    "completion_tokens": usage.get("completion_tokens", 0),
+                    "total_tokens": usage.get("total_tokens", 0),
+                    "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+                })
+    return results
+
+
+def run_batch(backend, request_path, output_path, state_path=None, poll_interval=60):
+    """
+    Submits `request_path`, waits for the batch to finish and writes its
+    output to `output_path`.
+
+    If `state_path` is given, the batch id is saved there after submission,
+    so an interrupted run resumes polling the same batch instead of paying
+    for a second one. A completed batch stays in the state file until the
+    caller has merged the output and called `finish_batch`; until then a
+    rerun reuses the collected `output_path`. Returns the final status string.
+    """
+    state = {}
+    if state_path and os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    batch_id = state.get("batch_id")
+
+    if state.get("status") == "completed" and os.path.exists(output_path):
+        print(f"📦 Batch {batch_id} was already collected to: {output_path}")
+        return "completed"
+
+    if batch_id:
+        print(f"⏳ Resuming batch {batch_id}")
+    else:
+        batch_id = backend.submit(request_path)
+        print(f"🚀 Submitted batch {batch_id}")
+        state = {"batch_id": batch_id, "request_file": str(request_path)}
+        if state_path:
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+
+    while True:
+        status = backend.poll(batch_id)
+        if status in FINISHED_STATUSES:
+            break
+        print(f"   …batch {batch_id} is {status}, checking again in {poll_interval}s")
+        time.sleep(poll_interval)
+
+    if status == "completed":
+        backend.collect(batch_id, output_path)
+        print(f"📥 Batch output written to: {output_path}")
+        if state_path:
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump({**state, "status": status, "output_file": str(output_path)}, f)
+    else:
+        print(f"❌ Batch {batch_id} finished with status '{status}'")
+        finish_batch(state_path)
+    return status
+
+
+def finish_batch(state_path):
+    """Forgets a batch once its output has been merged, so the next run submits a new one."""
+    if state_path and os.path.exists(state_path):
+        os.remove(state_path)
+
+
+################################################################################
+# Backends
+################################################################################
+
+class OpenAIBatchBackend:
+    """Submits request files to the OpenAI Batch API."""
+
+    def __init__(self, client=None, completion_window="24h"):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None)
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, request_path):
+        with open(request_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def collect(self, batch_id, output_path):
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, "w", encoding="utf-8") as f:
+            if batch.output_file_id:
+                f.write(self.client.files.content(batch.output_file_id).text)
+            if batch.error_file_id:
+                f.write(self.client.files.content(batch.error_file_id).text)
+
+
+class LocalDirBatchBackend:
+    """
+    Directory-based stand-in for the Batch API.
+
+    submit() copies the request file to <root>/<batch_id>/input.jsonl. The
+    batch counts as completed once <root>/<batch_id>/output.jsonl exists,
+    which is written either by whoever plays the "server" (a test fixture,
+    another process) or right away by `responder`, a callable that takes the
+    request body and returns the completion text.
+    """
+
+    def __init__(self, root, responder=None):
+        self.root = root
+        self.responder = responder
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, batch_id):
+        return os.path.join(self.root, batch_id)
+
+    def submit(self, request_path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._dir(batch_id))
+        shutil.copyfile(request_path, os.path.join(self._dir(batch_id), "input.jsonl"))
+        if self.responder is not None:
+            self._respond(batch_id)
+        return batch_id
+
+    def _respond(self, batch_id):
+        with open(os.path.join(self._dir(batch_id), "input.jsonl"), encoding="utf-8") as fin, \
+             open(os.path.join(self._dir(batch_id), "output.jsonl"), "w", encoding="utf-8") as fout:
+            for line in fin:
+                if not line.strip():
+                    continue
+                req = json.loads(line)
+                content = self.responder(req["body"])
+                fout.write(json.dumps({
+                    "id": f"req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": req["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                            "usage": usage_to_dict(None),
+                        },
+                    },
+                    "error": None,
+                }, ensure_ascii=False) + "\n")
+
+    def poll(self, batch_id):
+        if not os.path.isdir(self._dir(batch_id)):
+            return "failed"
+        if os.path.exists(os.path.join(self._dir(batch_id), "output.jsonl")):
+            return "completed"
+        return "in_progress"
+
+    def collect(self, batch_id, output_path):
+        shutil.copyfile(os.path.join(self._dir(batch_id), "output.jsonl"), output_path)
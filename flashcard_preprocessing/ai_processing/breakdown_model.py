@@ -0,0 +1,246 @@
+"""
+Compact, lazily decoded model of a stored sentence breakdown.
+
+A Breakdown wraps the raw analysis_json / breakdown text of one CSV cell and
+decodes nothing up front. Each top-level section ("vocabulary", "grammar",
+"tips", "error") is located with one regex search and decoded on its own,
+the first time it is asked for, into slotted objects (VocabEntry, Component,
+Grammar, Tips) instead of nested dicts. Flag checks go further:
+`has_vocabulary` only peeks at the first character of the array, and
+`has_complete_vocabulary` decodes the vocabulary but never grammar or tips.
+
+Locating a key by search is safe here: inside a JSON string every quote is
+escaped, so `"vocabulary":` can only match a real key, and none of the
+section names is reused as a key further down the structure.
+
+Documents are only checked structurally (non-empty object); a section that
+fails to decode counts as missing. `to_dict()` still gives the full dict.
+"""
+import json
+import re
+
+SECTIONS = ("vocabulary", "grammar", "tips")
+
+_KEYS = {name: re.compile(rf'"{name}"\s*:\s*') for name in (*SECTIONS, "error")}
+_NON_EMPTY_ARRAY = re.compile(r"\[\s*[^\s\]]")
+_DECODER = json.JSONDecoder()
+_UNSET = object()
+
+
+class Component:
+    """One part of a vocabulary word (stem, ending, particle, ...)."""
+
+    __slots__ = ("part", "reading", "meaning", "contribution")
+
+    def __init__(self, part="", reading="", meaning="", contribution=""):
+        self.part = part
+        self.reading = reading
+        self.meaning = meaning
+        self.contribution = contribution
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("part", ""), data.get("reading", ""), data.get("meaning", ""),
+                   data.get("contribution", ""))
+
+
+class VocabEntry:
+    """One word of the vocabulary section."""
+
+    __slots__ = ("word", "reading", "meaning", "role", "components", "combined_explanation")
+
+    def __init__(self, word="", reading="", meaning="", role="", components=(), combined_explanation=""):
+        self.word = word
+        self.reading = reading
+        self.meaning = meaning
+        self.role = role
+        self.components = list(components)
+        self.combined_explanation = combined_explanation
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("word", ""), data.get("reading", ""), data.get("meaning", ""), data.get("role", ""),
+            [Component.from_dict(c) for c in data.get("components") or [] if isinstance(c, dict)],
+            data.get("combined_explanation", ""),
+        )
+
+    @property
+    def is_complete(self) -> bool:
+        """True if the word has a component breakdown or at least an explanation."""
+        return bool(self.components or self.combined_explanation)
+
+
+class Grammar:
+    """The grammar section."""
+
+    __slots__ = ("context", "steps", "sentence_pattern", "sentence_pattern_kanji",
+                 "sentence_pattern_hiragana", "sentence_pattern_english", "contribution")
+
+    def __init__(self, context="", steps=(), sentence_pattern="", sentence_pattern_kanji="",
+                 sentence_pattern_hiragana="", sentence_pattern_english="", contribution=""):
+        self.context = context
+        self.steps = list(steps)
+        self.sentence_pattern = sentence_pattern
+        self.sentence_pattern_kanji = sentence_pattern_kanji
+        self.sentence_pattern_hiragana = sentence_pattern_hiragana
+        self.sentence_pattern_english = sentence_pattern_english
+        self.contribution = contribution
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+class NewWord:
+    """A word introduced by the tips' alternative expression."""
+
+    __slots__ = ("word", "reading", "meaning", "description")
+
+    def __init__(self, word="", reading="", meaning="", description=""):
+        self.word = word
+        self.reading = reading
+        self.meaning = meaning
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("word", ""), data.get("reading", ""), data.get("meaning", ""),
+                   data.get("description", ""))
+
+
+class Tips:
+    """The beginner tips section; the alternative expression is flattened into three fields."""
+
+    __slots__ = ("tip", "common_mistake", "alternative_kanji", "alternative_hiragana",
+                 "alternative_english", "new_words_in_alternative")
+
+    def __init__(self, tip="", common_mistake="", alternative_kanji="", alternative_hiragana="",
+                 alternative_english="", new_words_in_alternative=()):
+        self.tip = tip
+        self.common_mistake = common_mistake
+        self.alternative_kanji = alternative_kanji
+        self.alternative_hiragana = alternative_hiragana
+        self.alternative_english = alternative_english
+        self.new_words_in_alternative = list(new_words_in_alternative)
+
+    @classmethod
+    def from_dict(cls, data):
+        alternative = data.get("alternative_expression") or {}
+        return cls(
+            data.get("tip", ""), data.get("common_mistake", ""),
+            alternative.get("kanji", ""), alternative.get("hiragana", ""), alternative.get("english", ""),
+            [NewWord.from_dict(w) for w in data.get("new_words_in_alternative") or [] if isinstance(w, dict)],
+        )
+
+    @property
+    def has_alternative(self) -> bool:
+        return bool(self.alternative_kanji or self.alternative_hiragana or self.alternative_english)
+
+
+class Breakdown:
+    """
+    One stored breakdown (str or UTF-8 bytes), decoded section by section on
+    first access.
+    """
+
+    __slots__ = ("raw", "_offsets", "_error", "_vocabulary", "_grammar", "_tips")
+
+    def __init__(self, raw):
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode("utf-8")
+        self.raw = raw.strip() if isinstance(raw, str) else ""
+        self._offsets = {}
+        self._error = self._vocabulary = self._grammar = self._tips = _UNSET
+
+    @property
+    def is_object(self) -> bool:
+        """True for a (structurally) non-empty JSON object."""
+        return (self.raw.startswith("{") and self.raw.endswith("}")
+                and self.raw[1:-1].strip() != "")
+
+    def _offset(self, name):
+        """Index where the value of top-level key `name` starts, or None."""
+        if name not in self._offsets:
+            match = _KEYS[name].search(self.raw) if self.is_object else None
+            self._offsets[name] = match.end() if match else None
+        return self._offsets[name]
+
+    def has_section(self, name) -> bool:
+        return self._offset(name) is not None
+
+    def _decode(self, name):
+        """Decodes only the value of key `name`; None if absent or malformed."""
+        offset = self._offset(name)
+        if offset is None:
+            return None
+        try:
+            value, _ = _DECODER.raw_decode(self.raw, offset)
+        except json.JSONDecodeError:
+            return None
+        return value
+
+    @property
+    def error(self):
+        """The "error" message of a failed generation, or None."""
+        if self._error is _UNSET:
+            value = self._decode("error")
+            self._error = None if value is None else str(value)
+        return self._error
+
+    @property
+    def has_vocabulary(self) -> bool:
+        """True if the vocabulary array is non-empty (nothing is decoded)."""
+        offset = self._offset("vocabulary")
+        return offset is not None and _NON_EMPTY_ARRAY.match(self.raw, offset) is not None
+
+    @property
+    def vocabulary(self) -> list:
+        if self._vocabulary is _UNSET:
+            value = self._decode("vocabulary")
+            self._vocabulary = [
+                VocabEntry.from_dict(entry) for entry in value if isinstance(entry, dict)
+            ] if isinstance(value, list) else []
+        return self._vocabulary
+
+    @property
+    def grammar(self):
+        """Grammar, or None if the section is absent."""
+        if self._grammar is _UNSET:
+            value = self._decode("grammar")
+            self._grammar = Grammar.from_dict(value) if isinstance(value, dict) else None
+        return self._grammar
+
+    @property
+    def tips(self):
+        """Tips, or None if the section is absent."""
+        if self._tips is _UNSET:
+            value = self._decode("tips")
+            self._tips = Tips.from_dict(value) if isinstance(value, dict) else None
+        return self._tips
+
+    @property
+    def has_complete_vocabulary(self) -> bool:
+        """
+        True if there is vocabulary and every word has components or an
+        explanation. Only the vocabulary section is decoded.
+        """
+        if not self.has_vocabulary:
+            return False
+        if self._vocabulary is not _UNSET:
+            return bool(self._vocabulary) and all(entry.is_complete for entry in self._vocabulary)
+        # a flag check: look at the decoded entries without building VocabEntry objects
+        value = self._decode("vocabulary")
+        return isinstance(value, list) and bool(value) and all(
+            isinstance(entry, dict) and bool(entry.get("components") or entry.get("combined_explanation"))
+            for entry in value
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        """True if blank, not a JSON object, or without any of the breakdown sections."""
+        return not any(self.has_section(name) for name in SECTIONS)
+
+    def to_dict(self) -> dict:
+        """Full decode, for code that edits the breakdown (e.g. section repair)."""
+        return json.loads(self.raw)
@@ -0,0 +1,443 @@
+"""
+Single-pass parser for the markdown sentence breakdowns.
+
+`parse_markdown_breakdown(text)` produces exactly the structure (and the
+exact values) of the original regex-based `parse_analysis_response`, but:
+
+    - every pattern is compiled once, at import time
+    - the section headings are found in one scan of the response
+    - each line of a section is looked at once, by a small state machine
+      (VocabularyParser, GrammarParser, TipsParser)
+
+The section parsers take one line at a time (`feed`) and build their part of
+the result as they go. StreamingBreakdownParser drives them from completion
+chunks while the answer is still being generated, hands each section over as
+soon as it closes, and can give up early on a malformed answer.
+"""
+import time
+from bisect import bisect_left
+
+import regex as re
+
+################################################################################
+# Patterns
+################################################################################
+
+# "### 1. Vocabulary Breakdown", "### 2. Grammar Explanation", "### 3. Beginner Tips ..."
+# and any other numbered heading, which ends the section before it.
+_HEADING = re.compile(
+    r"###\s*(?:"
+    r"(?P<vocabulary>1\.?\s*Vocabulary Breakdown\s*:?)"
+    r"|(?P<grammar>2\.?\s*Grammar Explanation\s*:?)"
+    r"|(?P<tips>3\.?\s*Beginner Tips\s*:?)"
+    r"|\d+\.)"
+)
+_SECTION_END = re.compile(r"###\s*\d+\.")
+# A line ending in what may be the start of a heading ("###", "### 2.") that continues on the next line
+_OPEN_HEADING = re.compile(r"###\s*(\d+\.?\s*)?$")
+
+# - **明日 (あした)**: “tomorrow” - [Noun]   (vocabulary, components, new words)
+_ENTRY = re.compile(r'^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]')
+_SIMPLE_COMPONENT = re.compile(r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)$")
+_SIMPLE_NEW_WORD = re.compile(r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)?")
+_COMPONENT_HEADER = re.compile(r"component breakdown", re.I)
+_CONTRIBUTION = re.compile(r"^- ?\*?\*?Contribution to Overall Meaning\*?\*?:\s*(.*)$", re.I)
+
+_CONTEXT = re.compile(r"(\d\.\s*)?\**Context\**", re.I)
+_STEPS = re.compile(r"(\d\.\s*)?\**Steps\**", re.I)
+_SENTENCE_PATTERN = re.compile(r"(\d\.\s*)?\**Sentence Pattern\**", re.I)
+_NUMBERED = re.compile(r"^\d\.\s*")
+_KANJI = re.compile(r"-?\s*\*\*Kanji\*\*:\s*(.*)$", re.I)
+_HIRAGANA = re.compile(r"-?\s*\*\*Hiragana\*\*:\s*(.*)$", re.I)
+_ENGLISH_TRANSLATION = re.compile(r"-?\s*\*\*English Translation\*\*:\s*(.*)$", re.I)
+_ENGLISH = re.compile(r"-?\s*\*\*English\*\*:\s*(.*)$", re.I)
+
+_TIP = re.compile(r"- ?\*\*Tip\*\*:", re.I)
+_COMMON_MISTAKE = re.compile(r"- ?\*\*Common Mistake\*\*:", re.I)
+_ALTERNATIVE = re.compile(r"- ?\*\*Alternative Expression\*\*:", re.I)
+_NEW_WORDS = re.compile(r"- ?\*\*New Words in Alternative Expression\*\*:", re.I)
+
+SECTIONS = ("vocabulary", "grammar", "tips")
+
+# A streamed answer without a vocabulary heading after this many characters is malformed
+MAX_PREAMBLE_CHARS = 600
+
+
+def split_sections(text: str) -> dict:
+    """
+    Returns {"vocabulary": str, "grammar": str, "tips": str}: the stripped
+    text after the first heading of each section up to the next numbered
+    "###" heading (empty if the heading is missing).
+    """
+    starts = {}
+    ends = []
+    for m in _HEADING.finditer(text):
+        name = m.lastgroup
+        if name is None or _SECTION_END.match(text, m.start()):
+            ends.append(m.start())
+        if name is not None and name not in starts:
+            starts[name] = m.end()
+
+    sections = {}
+    for name in SECTIONS:
+        start = starts.get(name)
+        if start is None:
+            sections[name] = ""
+            continue
+        k = bisect_left(ends, start)
+        end = ends[k] if k < len(ends) else len(text)
+        sections[name] = text[start:end].strip()
+    return sections
+
+
+################################################################################
+# Section parsers
+################################################################################
+
+class VocabularyParser:
+    """Vocabulary entries with their components and contribution text."""
+
+    SEEK, ENTRY, COMPONENTS = range(3)
+
+    def __init__(self):
+        self.result = []
+        self.entry = None
+        self.state = self.SEEK
+
+    def _start_entry(self, m):
+        word, reading, meaning, role = m.groups()
+        self.entry = {
+            "word": word.strip(),
+            "reading": reading.strip(),
+            "meaning": meaning.strip(),
+            "role": role.strip(),
+            "components": [],
+            "combined_explanation": ""
+        }
+        self.state = self.ENTRY
+
+    def feed(self, line: str):
+        if self.state == self.COMPONENTS:
+            comp_line = line.strip()
+            if comp_line.startswith("-"):
+                self._component(comp_line)
+                return
+            # The component list ends here; the line belongs to the entry
+            self.state = self.ENTRY
+
+        if self.state == self.SEEK:
+            m = _ENTRY.match(line.strip())
+            if m:
+                self._start_entry(m)
+            return
+
+        sub_line = line.rstrip()
+        m = _ENTRY.match(sub_line)
+        if m:
+            self.result.append(self.entry)
+            self._start_entry(m)
+        elif _COMPONENT_HEADER.search(sub_line):
+            self.state = self.COMPONENTS
+        else:
+            contrib = _CONTRIBUTION.match(sub_line)
+            if contrib:
+                self.entry["combined_explanation"] = contrib.group(1).strip()
+            elif sub_line.startswith("- "):
+                self.entry["combined_explanation"] += " " + sub_line.lstrip("- ").strip()
+
+    def _component(self, comp_line):
+        contrib = _CONTRIBUTION.match(comp_line)
+        if contrib:
+            self.entry["combined_explanation"] = contrib.group(1).strip()
+            return
+        m = _ENTRY.match(comp_line) or _SIMPLE_COMPONENT.match(comp_line)
+        if m:
+            part, reading, meaning, contribution = m.groups()
+            self.entry["components"].append({
+                "part": part.strip(),
+                "reading": reading.strip(),
+                "meaning": meaning.strip(),
+                "contribution": contribution.strip()
+            })
+
+    def finish(self):
+        if self.entry is not None:
+            self.result.append(self.entry)
+            self.entry = None
+        self.state = self.SEEK
+        return self.result
+
+
+class GrammarParser:
+    """Context, steps and sentence pattern of the grammar explanation."""
+
+    OUTER, CONTEXT, STEPS, PATTERN = range(4)
+
+    def __init__(self):
+        self.result = {
+            "context": "",
+            "steps": [],
+            "sentence_pattern": "",
+            "sentence_pattern_kanji": "",
+            "sentence_pattern_hiragana": "",
+            "sentence_pattern_english": "",
+            "contribution": ""
+        }
+        self.state = self.OUTER
+        self.lines = []
+
+    def feed(self, line: str):
+        if self.state == self.CONTEXT:
+            # The line that ends the context (blank or "Steps") is skipped
+            if not line.strip() or _STEPS.match(line):
+                self._close()
+            else:
+                self.lines.append(line.strip())
+            return
+
+        stripped = line.strip()
+        if self.state == self.STEPS:
+            # The line that ends the steps (blank or "Sentence Pattern") is skipped
+            if not stripped or _SENTENCE_PATTERN.match(stripped):
+                self._close()
+            elif stripped.startswith("-"):
+                self.lines.append(stripped.lstrip("- ").strip())
+            else:
+                self.lines.append(stripped)
+            return
+
+        if self.state == self.PATTERN:
+            if stripped and not stripped.startswith("---") and not _NUMBERED.match(stripped):
+                self.lines.append(stripped)
+                return
+            # The line that ends the pattern is looked at again as a heading
+            self._close()
+
+        if _CONTEXT.match(stripped):
+            self.state = self.CONTEXT
+        elif _STEPS.match(stripped):
+            self.state = self.STEPS
+        elif _SENTENCE_PATTERN.match(stripped):
+            self.state = self.PATTERN
+        else:
+            return
+        self.lines = []
+
+    def _close(self):
+        if self.state == self.CONTEXT:
+            self.result["context"] = " ".join(self.lines)
+        elif self.state == self.STEPS:
+            self.result["steps"] = self.lines
+        elif self.state == self.PATTERN:
+            self.result["sentence_pattern"] = "\n".join(self.lines)
+            for pline in self.lines:
+                for pattern, key in ((_KANJI, "sentence_pattern_kanji"),
+                                     (_HIRAGANA, "sentence_pattern_hiragana"),
+                                     (_ENGLISH_TRANSLATION, "sentence_pattern_english")):
+                    m = pattern.match(pline)
+                    if m:
+                        self.result[key] = m.group(1).strip()
+                        break
+        self.state = self.OUTER
+        self.lines = []
+
+    def finish(self):
+        self._close()
+        return self.result
+
+
+class TipsParser:
+    """Tip, common mistake, alternative expression and its new words."""
+
+    OUTER, ALTERNATIVE = range(2)
+
+    def __init__(self):
+        self.result = {
+            "tip": "",
+            "common_mistake": "",
+            "alternative_expression": {
+                "kanji": "",
+                "hiragana": "",
+                "english": ""
+            },
+            "new_words_in_alternative": []
+        }
+        self.state = self.OUTER
+        self.in_new_words = False
+
+    def feed(self, line: str):
+        tline = line.strip()
+
+        if self.state == self.ALTERNATIVE:
+            if tline and not _NEW_WORDS.match(tline):
+                alternative = self.result["alternative_expression"]
+                for pattern, key in ((_KANJI, "kanji"), (_HIRAGANA, "hiragana"), (_ENGLISH, "english")):
+                    m = pattern.match(tline)
+                    if m:
+                        alternative[key] = m.group(1).strip()
+                return
+            # The line that ends the alternative expression is looked at again below
+            self.state = self.OUTER
+
+        if _TIP.match(tline):
+            self.result["tip"] = tline.split(":", 1)[1].strip()
+            self.in_new_words = False
+        elif _COMMON_MISTAKE.match(tline):
+            self.result["common_mistake"] = tline.split(":", 1)[1].strip()
+            self.in_new_words = False
+        elif _ALTERNATIVE.match(tline):
+            self.state = self.ALTERNATIVE
+            self.in_new_words = False
+        elif _NEW_WORDS.match(tline):
+            self.in_new_words = True
+        elif self.in_new_words:
+            m = _ENTRY.match(tline) or _SIMPLE_NEW_WORD.match(tline)
+            if m:
+                word, reading, meaning, description = m.groups()
+                self.result["new_words_in_alternative"].append({
+                    "word": word.strip(),
+                    "reading": reading.strip(),
+                    "meaning": meaning.strip(),
+                    "description": (description or "").strip()
+                })
+
+    def finish(self):
+        self.state = self.OUTER
+        return self.result
+
+
+SECTION_PARSERS = {
+    "vocabulary": VocabularyParser,
+    "grammar": GrammarParser,
+    "tips": TipsParser,
+}
+
+
+def parse_section(name: str, text: str):
+    """Runs one section's text through its parser."""
+    parser = SECTION_PARSERS[name]()
+    for line in text.splitlines():
+        parser.feed(line)
+    return parser.finish()
+
+
+def parse_markdown_breakdown(response_text: str) -> dict:
+    """Parses a markdown breakdown into the {"vocabulary", "grammar", "tips"} structure."""
+    sections = split_sections(response_text)
+    return {name: parse_section(name, sections[name]) for name in SECTIONS}
+
+
+class StreamingBreakdownParser:
+    """
+    Parses a markdown breakdown while it streams in.
+
+        parser = StreamingBreakdownParser(on_section=...)
+        for chunk in stream:
+            if not parser.feed(chunk):
+                break               # malformed: stop generating
+        result = parser.finish()
+
+    Complete lines go straight into the section parsers. When a section
+    closes (at the next numbered "###" heading, or at the end of the answer)
+    `on_section(name, value)` is called with its parsed value; returning
+    False from it aborts the parse. The parser also aborts by itself when no
+    vocabulary heading shows up within `max_preamble_chars` characters, or
+    when the vocabulary section closes without any entries. `aborted` then
+    holds the reason.
+
+    For complete answers the result is the same as parse_markdown_breakdown().
+    """
+
+    def __init__(self, on_section=None, max_preamble_chars=MAX_PREAMBLE_CHARS):
+        self.on_section = on_section
+        self.max_preamble_chars = max_preamble_chars
+        self.result = {}
+        self.active = {}
+        # Sections whose heading may still take a ":" from the next non-blank line
+        self.colon_pending = set()
+        self.pending = ""
+        self.chars = 0
+        self.aborted = None
+        self.parse_ms = 0.0
+
+    def feed(self, chunk: str) -> bool:
+        """Adds the next piece of the answer. Returns False once the parse was aborted."""
+        if self.aborted:
+            return False
+        started = time.perf_counter()
+        self.chars += len(chunk)
+        self.pending += chunk
+        *lines, self.pending = self.pending.split("\n")
+        held = ""
+        for line in lines:
+            line = held + line
+            if _OPEN_HEADING.search(line):
+                held = line + "\n"
+                continue
+            held = ""
+            self._line(line)
+            if self.aborted:
+                break
+        self.pending = held + self.pending
+        if not self.aborted and "vocabulary" not in self.result and "vocabulary" not in self.active \
+                and self.chars > self.max_preamble_chars:
+            self.aborted = f"no vocabulary section in the first {self.max_preamble_chars} characters"
+        self.parse_ms += (time.perf_counter() - started) * 1000
+        return not self.aborted
+
+    def _line(self, line):
+        # Every active section sees the line from its heading (or the line start) onwards
+        starts = dict.fromkeys(self.active, 0)
+        if self.colon_pending and line.strip():
+            first = len(line) - len(line.lstrip())
+            for name in self.colon_pending:
+                if line[first] == ":":
+                    starts[name] = first + 1
+            self.colon_pending = set()
+        for m in _HEADING.finditer(line):
+            name = m.lastgroup
+            if name is None or _SECTION_END.match(line, m.start()):
+                for open_name, start in starts.items():
+                    self._feed_section(open_name, line[start:m.start()])
+                    self._close(open_name)
+                starts = {}
+                self.colon_pending = set()
+            if name is not None and name not in self.result and name not in self.active:
+                self.active[name] = SECTION_PARSERS[name]()
+                starts[name] = m.end()
+                if m.end() == len(line) and not m.group().endswith(":"):
+                    self.colon_pending.add(name)
+        for name, start in starts.items():
+            self._feed_section(name, line[start:])
+
+    def _feed_section(self, name, text):
+        parser = self.active.get(name)
+        if parser is not None:
+            for part in text.splitlines() or [""]:
+                parser.feed(part)
+
+    def _close(self, name):
+        parser = self.active.pop(name, None)
+        if parser is None:
+            return
+        value = self.result[name] = parser.finish()
+        if self.aborted:
+            return
+        if name == "vocabulary" and not value:
+            self.aborted = "the vocabulary section has no entries"
+        elif self.on_section is not None and self.on_section(name, value) is False:
+            self.aborted = f"{name} section rejected"
+
+    def finish(self) -> dict:
+        """Closes the open sections and returns the parsed breakdown."""
+        started = time.perf_counter()
+        if self.pending and not self.aborted:
+            self._line(self.pending)
+        self.pending = ""
+        for name in list(self.active):
+            self._close(name)
+        for name in SECTIONS:
+            if name not in self.result:
+                self.result[name] = parse_section(name, "")
+        self.parse_ms += (time.perf_counter() - started) * 1000
+        return {name: self.result[name] for name in SECTIONS}
@@ -0,0 +1,66 @@
+"""
+Crash-safe checkpointing for long row-by-row generation runs.
+
+A RowJournal is an append-only JSONL sidecar next to the output file. Each
+completed row is appended and fsync'd as soon as it finishes, so a crash
+loses at most the rows that were still in flight. On restart the journal is
+read back and rows with a valid result are skipped. Once the final output
+has been written (atomically, via `atomic_write`), the journal is removed.
+"""
+import json
+import os
+
+
+class RowJournal:
+    """Append-only, fsync'd journal of {key, source, value} records."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def load(self):
+        """
+        Returns {key: (source, value)} for every journaled row. A torn last
+        line (the process died mid-write) is ignored.
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[record["key"]] = (record.get("source"), record["value"])
+        return entries
+
+    def append(self, key, source, value):
+        """Durably records one finished row."""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"key": key, "source": source, "value": value}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def atomic_write(path, write_fn):
+    """
+    Calls write_fn(tmp_path), fsyncs the temp file and renames it over `path`,
+    so readers never see a half-written output file.
+    """
+    tmp_path = f"{path}.tmp"
+    write_fn(tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
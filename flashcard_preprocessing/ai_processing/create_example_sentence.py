@@ -1,19 +1,23 @@
 import os
+import sys
 import csv
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import argparse
 
-# Load environment variables from .env file
-load_dotenv()
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 
-# Initialize OpenAI Client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, chat_completion, run_jobs
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.artifact_store import ArtifactStore
 
 INPUT_FILE = "flashcard_preprocessing/N5_Grammar/N5_Grammar_List.csv"   
 OUTPUT_FILE = "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences.csv"
 
-def check_and_fix_with_openai(word, reading, meaning, word_type):
+async def check_and_fix_with_openai(word, reading, meaning, word_type):
     """
     Uses OpenAI's API to:
     1) Verify/fix meaning if incorrect.
@@ -21,7 +25,10 @@ def check_and_fix_with_openai(word, reading, meaning, word_type):
     3) Generate an N5-level example sentence (JP) using the 'word'.
     4) Provide an English translation (EN) of that sentence.
 
-    Returns: (corrected_meaning, corrected_word_type, example_jp, example_en)
+    Returns: (corrected_meaning, corrected_word_type, example_jp, example_en),
+    or None if the API call failed (after the rate limiter's retries) or no
+    answer with an example sentence came back. An unusable answer is asked
+    again, bypassing the cache.
     """
 
     prompt = f"""You are an assistant that validates Japanese flashcards.
@@ -44,43 +51,60 @@ Respond in valid JSON with this format:
 Ensure your response is **strictly JSON** formatted.
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,  # Lower temperature ensures more controlled responses
-        )
-
-        # Correct way to access the response data
-        content = response.choices[0].message.content  # ✅ FIXED
-
-        # Parse JSON response
-        data = json.loads(content)
-        corrected_meaning = data.get("meaning", meaning).strip()
-        corrected_word_type = data.get("word_type", word_type).strip()
-        example_jp = data.get("example_jp", "(Example sentence failed)").strip()
-        example_en = data.get("example_en", "(Example translation failed)").strip()
-
-    except json.JSONDecodeError:
-        corrected_meaning = meaning
-        corrected_word_type = word_type
-        example_jp = "(Failed to parse example sentence.)"
-        example_en = "(Failed to parse example sentence.)"
-    except Exception as e:
-        print(f"Error during OpenAI API call: {e}")
-        return meaning, word_type, "(Example sentence generation failed)", "(Example sentence generation failed)"
-
-    return corrected_meaning, corrected_word_type, example_jp, example_en
-
-
-def process_flashcards(input_file, output_file):
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            # An unparseable answer is cached too: retries must ask again
+            response = await chat_completion(
+                use_cache=(attempt == 0),
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,  # Lower temperature ensures more controlled responses
+            )
+
+            # Correct way to access the response data
+            content = response.choices[0].message.content  # ✅ FIXED
+
+            # Parse JSON response
+            data = json.loads(content)
+            example_jp = str(data.get("example_jp") or "").strip()
+            example_en = str(data.get("example_en") or "").strip()
+            if example_jp and example_en:
+                report_parse(True)
+                corrected_meaning = str(data.get("meaning") or meaning).strip()
+                corrected_word_type = str(data.get("word_type") or word_type).strip()
+                return corrected_meaning, corrected_word_type, example_jp, example_en
+            report_parse(False)
+            print(f"❌ No example sentence in the answer (attempt {attempt+1}) for '{word}'")
+
+        except json.JSONDecodeError:
+            report_parse(False)
+            print(f"❌ Unparseable answer (attempt {attempt+1}) for '{word}'")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Error during OpenAI API call: {e}")
+            return None
+
+    # Nothing is written for the row, so the next run picks it up again
+    return None
+
+
+async def check_and_fix_row(row):
+    """Runs `check_and_fix_with_openai` for one CSV row."""
+    word = row["Word"].strip()
+    reading = row["Reading"].strip() if "Reading" in row else ""
+    meaning = row["Meaning"].strip() if "Meaning" in row else ""
+    word_type = row["Word Type"].strip() if "Word Type" in row else ""
+    return await check_and_fix_with_openai(word, reading, meaning, word_type)
+
+
+def process_flashcards(input_file, output_file, concurrency=None):
     """
     Reads each row from the input CSV, calls the OpenAI function to
     check & fix meaning/word type, and generate example sentences.
     Then writes the updated data to the output CSV.
     """
-    updated_rows = []
-
     with open(input_file, mode="r", encoding="utf-8") as f_in:
         reader = csv.DictReader(f_in)
         fieldnames = reader.fieldnames
@@ -97,24 +121,27 @@ def process_flashcards(input_file, output_file):
         if "Example Sentence EN" not in fieldnames:
             fieldnames.append("Example Sentence EN")
 
-        for row in reader:
-            word = row["Word"].strip()
-            reading = row["Reading"].strip() if "Reading" in row else ""
-            meaning = row["Meaning"].strip() if "Meaning" in row else ""
-            word_type = row["Word Type"].strip() if "Word Type" in row else ""
-
-            # Call OpenAI to check/fix data and generate examples
-            new_meaning, new_word_type, example_jp, example_en = check_and_fix_with_openai(
-                word, reading, meaning, word_type
-            )
-
-            # Update the row with corrected data
-            row["Meaning"] = new_meaning
-            row["Word Type"] = new_word_type
-            row["Example Sentence JP"] = example_jp
-            row["Example Sentence EN"] = example_en
+        updated_rows = list(reader)
 
-            updated_rows.append(row)
+    # Call OpenAI to check/fix data and generate examples (results keep row order)
+    try:
+        results = run_jobs(updated_rows, check_and_fix_row, concurrency=concurrency,
+                           row_key=lambda row: row["Word"])
+    except CircuitOpenError as e:
+        raise SystemExit(f"[FATAL] {e}. {output_file} was not written.")
+
+    failed = 0
+    for row, result in zip(updated_rows, results):
+        if result is None:
+            # Leave the row as it was, so a rerun can fill it in
+            failed += 1
+            continue
+        new_meaning, new_word_type, example_jp, example_en = result
+        # Update the row with corrected data
+        row["Meaning"] = new_meaning
+        row["Word Type"] = new_word_type
+        row["Example Sentence JP"] = example_jp
+        row["Example Sentence EN"] = example_en
 
     # Write the updated rows to the output CSV
     with open(output_file, mode="w", encoding="utf-8", newline="") as f_out:
@@ -122,8 +149,60 @@ def process_flashcards(input_file, output_file):
         writer.writeheader()
         writer.writerows(updated_rows)
 
+    if failed:
+        print(f"⚠️ {failed} rows could not be processed and were left unchanged")
     print(f"✅ Successfully updated flashcards. Output written to: {output_file}")
 
 
+def process_flashcards_store(entity, concurrency=None, store_path=None):
+    """
+    Artifact-store version of `process_flashcards`: only rows without an
+    example sentence are sent, and only their Meaning / Word Type / example
+    columns are written back.
+    """
+    store = ArtifactStore(store_path)
+    try:
+        rows = store.read(entity, ["Word", "Reading", "Meaning", "Word Type", "Example Sentence JP"])
+        todo = [row for row in rows if not (row["Example Sentence JP"] or "").strip()]
+        if not todo:
+            print(f"✅ Every {entity} row already has an example sentence.")
+            return
+        for row in todo:
+            for column in ("Word", "Reading", "Meaning", "Word Type"):
+                row[column] = row[column] or ""
+
+        try:
+            results = run_jobs(todo, check_and_fix_row, concurrency=concurrency,
+                               row_key=lambda row: row["Word"])
+        except CircuitOpenError as e:
+            raise SystemExit(f"[FATAL] {e}. The store was not changed.")
+
+        updates = {"Meaning": {}, "Word Type": {}, "Example Sentence JP": {}, "Example Sentence EN": {}}
+        failed = 0
+        for row, result in zip(todo, results):
+            if result is None:
+                failed += 1
+                continue
+            for column, value in zip(updates, result):
+                updates[column][row["row_id"]] = value
+
+        store.add_column(entity, "Example Sentence JP", after="Word Type")
+        store.add_column(entity, "Example Sentence EN", after="Example Sentence JP")
+        written = sum(store.update(entity, column, values) for column, values in updates.items())
+    finally:
+        store.close()
+
+    if failed:
+        print(f"⚠️ {failed} rows could not be processed and were left unchanged")
+    print(f"✅ Updated {len(todo) - failed} {entity} rows ({written} values written) in the artifact store.")
+
+
 if __name__ == "__main__":
-    process_flashcards(INPUT_FILE, OUTPUT_FILE)
+    parser = argparse.ArgumentParser(description="Check flashcards and generate example sentences")
+    parser.add_argument("--store", choices=["vocab", "grammar"],
+                        help="work on this entity of the artifact store instead of the CSV files")
+    args = parser.parse_args()
+    if args.store:
+        process_flashcards_store(args.store)
+    else:
+        process_flashcards(INPUT_FILE, OUTPUT_FILE)
@@ -0,0 +1,118 @@
+"""
+Interned vocabulary entries for the breakdown corpus.
+
+Most breakdowns repeat the same vocabulary entries (は, が, を, です, the た
+past suffix, ...) word for word. An EntryTable stores every distinct
+vocabulary entry and component once, keyed by a hash of its content, and a
+normalized breakdown keeps only references to them:
+
+    full:        {"vocabulary": [{"word": "は", ..., "components": [{...}]}], "grammar": ...}
+    normalized:  {"vocabulary": ["3f2a9c0d1e7b4a55", ...], "grammar": ...}
+
+Entries hold their components as references as well. Grammar and tips are
+sentence-specific and stay inline. `rehydrate(doc)` rebuilds the full
+document; references are interned strings, so a normalized corpus in memory
+costs little more than its grammar and tips.
+
+The table is one JSON file shared by every level, so each new level only
+adds the entries it has not seen before:
+    {"components": {hash: {...}}, "entries": {hash: {..., "components": [hash, ...]}}}
+"""
+import hashlib
+import json
+import os
+import sys
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+# Default shared table, next to the per-level folders
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "breakdown_entries.json")
+
+
+def content_hash(value) -> str:
+    """Hash of the canonical JSON form (key order and spacing don't matter)."""
+    canonical = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class EntryTable:
+    """Deduplicated vocabulary entries and components, keyed by content hash."""
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        self.path = str(path)
+        self.components = {}
+        self.entries = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=DEFAULT_TABLE_PATH):
+        table = cls(path)
+        if os.path.exists(table.path):
+            with open(table.path, encoding="utf-8") as f:
+                data = json.load(f)
+            table.components = {sys.intern(k): v for k, v in data.get("components", {}).items()}
+            table.entries = {sys.intern(k): v for k, v in data.get("entries", {}).items()}
+        return table
+
+    def save(self):
+        if not self.dirty:
+            return
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                # sorted by hash for stable diffs; the entries keep their own key order
+                json.dump({"components": dict(sorted(self.components.items())),
+                           "entries": dict(sorted(self.entries.items()))},
+                          f, ensure_ascii=False, indent=0)
+
+        atomic_write(self.path, write)
+        self.dirty = False
+
+    def _intern(self, store, value) -> str:
+        ref = sys.intern(content_hash(value))
+        if ref not in store:
+            store[ref] = value
+            self.dirty = True
+        return ref
+
+    def intern_entry(self, entry) -> str:
+        """Stores one vocabulary entry (and its components) and returns its reference."""
+        stored = dict(entry)
+        if isinstance(entry.get("components"), list):
+            stored["components"] = [
+                self._intern(self.components, comp) if isinstance(comp, dict) else comp
+                for comp in entry["components"]
+            ]
+        return self._intern(self.entries, stored)
+
+    def entry(self, ref) -> dict:
+        """A fresh copy of the full entry behind `ref`."""
+        entry = dict(self.entries[ref])
+        if isinstance(entry.get("components"), list):
+            entry["components"] = [
+                dict(self.components[comp]) if isinstance(comp, str) else comp
+                for comp in entry["components"]
+            ]
+        return entry
+
+    def normalize(self, doc):
+        """Replaces the vocabulary entries of a parsed breakdown with references."""
+        if not isinstance(doc, dict) or not isinstance(doc.get("vocabulary"), list):
+            return doc
+        normalized = dict(doc)
+        normalized["vocabulary"] = [
+            self.intern_entry(entry) if isinstance(entry, dict) else entry
+            for entry in doc["vocabulary"]
+        ]
+        return normalized
+
+    def rehydrate(self, doc):
+        """Rebuilds the full breakdown from a normalized one (KeyError for unknown references)."""
+        if not isinstance(doc, dict) or not isinstance(doc.get("vocabulary"), list):
+            return doc
+        full = dict(doc)
+        full["vocabulary"] = [
+            self.entry(ref) if isinstance(ref, str) else ref
+            for ref in doc["vocabulary"]
+        ]
+        return full
@@ -1,24 +1,154 @@
-from openai import OpenAI
 import json
-import regex as re
+import sys
 import os
 from dotenv import load_dotenv
 
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, chat_completion, run_one, stream_chat_completion
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.breakdown_parser import StreamingBreakdownParser, parse_markdown_breakdown
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client with API key from .env
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# "markdown" (free-form answer parsed by regex) or "json" (schema-constrained answer)
+OUTPUT_MODE = os.getenv("BREAKDOWN_OUTPUT_MODE", "markdown")
+
+def _obj(properties: dict) -> dict:
+    """Strict JSON-schema object: every property required, nothing extra."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+_STR = {"type": "string"}
+
+# The structure documented in `parse_analysis_response`, as a JSON schema
+BREAKDOWN_JSON_SCHEMA = _obj({
+    "vocabulary": {"type": "array", "items": _obj({
+        "word": _STR,
+        "reading": _STR,
+        "meaning": _STR,
+        "role": _STR,
+        "components": {"type": "array", "items": _obj({
+            "part": _STR,
+            "reading": _STR,
+            "meaning": _STR,
+            "contribution": _STR,
+        })},
+        "combined_explanation": _STR,
+    })},
+    "grammar": _obj({
+        "context": _STR,
+        "steps": {"type": "array", "items": _STR},
+        "sentence_pattern": _STR,
+        "sentence_pattern_kanji": _STR,
+        "sentence_pattern_hiragana": _STR,
+        "sentence_pattern_english": _STR,
+        "contribution": _STR,
+    }),
+    "tips": _obj({
+        "tip": _STR,
+        "common_mistake": _STR,
+        "alternative_expression": _obj({
+            "kanji": _STR,
+            "hiragana": _STR,
+            "english": _STR,
+        }),
+        "new_words_in_alternative": {"type": "array", "items": _obj({
+            "word": _STR,
+            "reading": _STR,
+            "meaning": _STR,
+            "description": _STR,
+        })},
+    }),
+})
 
 # Function to analyze a Japanese sentence
-def analyze_japanese_sentence(sentence, translation):
+def analyze_japanese_sentence(sentence, translation, structured=None):
     """
-    Sends a prompt to the OpenAI API to analyze a Japanese sentence
-    with vocabulary, grammar explanation, and beginner tips.
+    Synchronous wrapper around `analyze_japanese_sentence_async` for one-off calls.
+    Bulk callers should submit `analyze_japanese_sentence_async` jobs to
+    `llm_executor.run_jobs` instead.
+    """
+    return run_one(analyze_japanese_sentence_async, sentence, translation, structured)
+
+def structured_analysis_request(sentence, translation):
+    """
+    Chat completion parameters for the JSON output mode. The schema fixes the
+    format, so the prompt only describes the content and needs no worked examples.
     """
     prompt = f"""
     You are a Japanese language tutor for beginners. Please analyze the following Japanese sentence:
 
+    Sentence: {sentence}
+    Translation: {translation}
+
+    Fill in every field of the JSON response:
+
+    - vocabulary: one entry for each word or phrase, in sentence order, with its reading
+      (hiragana), meaning and grammatical role (e.g. "Noun", "Particle", "Verb, past tense").
+      For any word or phrase that can be broken into meaningful parts (compounds like これから,
+      conjugated forms like 食べて or 経った), list each part under components, with
+      "contribution" giving its part of speech, and explain in combined_explanation how the
+      parts combine. Otherwise leave components empty and combined_explanation "".
+    - grammar.context: 1-2 sentences summarising what the sentence describes.
+    - grammar.steps: one short, beginner-friendly explanation per key grammar point,
+      written as "<item> - <explanation>", mentioning any conjugation involved.
+    - grammar.sentence_pattern: the pattern, e.g. "[Subject] + [は] + [Noun] + [です]".
+      sentence_pattern_kanji / _hiragana / _english: one new example of that pattern.
+      grammar.contribution: "".
+    - tips.tip: a simple, memorable way to understand the structure (1-2 sentences).
+    - tips.common_mistake: one typical beginner mistake and how to avoid it (1-2 sentences).
+    - tips.alternative_expression: one alternative phrasing in kanji, hiragana and English.
+    - tips.new_words_in_alternative: every word used in the alternative expression that is
+      not in the original sentence, with a short description.
+
+    Keep explanations concise and accessible for beginners.
+    """
+
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a Japanese tutor."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        top_p=0.7,
+        max_tokens=1500,
+        response_format={
+            "type": "json_schema",
+            "json_schema": {
+                "name": "sentence_breakdown",
+                "strict": True,
+                "schema": BREAKDOWN_JSON_SCHEMA,
+            },
+        },
+    )
+
+def analysis_request(sentence, translation, structured=None):
+    """
+    Builds the chat completion parameters (model, messages, sampling) used to
+    analyze a Japanese sentence. Shared by the live and the batch-job paths.
+
+    structured=True asks for schema-constrained JSON instead of markdown
+    (defaults to BREAKDOWN_OUTPUT_MODE).
+    """
+    if structured is None:
+        structured = OUTPUT_MODE == "json"
+    if structured:
+        return structured_analysis_request(sentence, translation)
+
+    prompt = f"""
+    You are a Japanese language tutor for beginners. Please analyze the following Japanese sentence:
+
     **Sentence:** {sentence}  
     **Translation:** {translation}
 
@@ -270,24 +400,63 @@ def analyze_japanese_sentence(sentence, translation):
 
     """
 
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a Japanese tutor."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        top_p=0.7,
+        max_tokens=1000,
+    )
+
+async def analyze_japanese_sentence_async(sentence, translation, structured=None, use_cache=True):
+    """
+    Sends a prompt to the OpenAI API to analyze a Japanese sentence
+    with vocabulary, grammar explanation, and beginner tips.
+
+    Pass use_cache=False when the row's previous breakdown was bad, so the
+    same unusable answer isn't read back from the response cache.
+    """
     try:
         # Send API request
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[
-                {"role": "system", "content": "You are a Japanese tutor."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            top_p=0.7,
-            max_tokens=1000,
-        )
+        response = await chat_completion(use_cache=use_cache, **analysis_request(sentence, translation, structured))
         # Extract and return the response content
         return response.choices[0].message.content
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"Error in API call: {e}")
         return None
 
+async def analyze_japanese_sentence_stream_async(sentence, translation, on_section=None, use_cache=True):
+    """
+    Streaming variant of analyze_japanese_sentence_async + parse_analysis_response
+    for the markdown format: the answer is parsed while it is generated,
+    `on_section(name, value)` gets each section as soon as it is complete, and
+    a malformed answer is cut off instead of being generated to the end.
+
+    Returns (raw_text, parsed, parse_ms). When the call failed or the answer
+    was aborted, raw_text is None and `parsed` is {"error": ...}. use_cache
+    works as in analyze_japanese_sentence_async.
+    """
+    parser = StreamingBreakdownParser(on_section)
+    try:
+        response = await stream_chat_completion(parser.feed, use_cache=use_cache,
+                                                **analysis_request(sentence, translation, structured=False))
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error in API call: {e}")
+        return None, {"error": str(e)}, parser.parse_ms
+
+    raw_text = response.choices[0].message.content
+    parsed = parser.finish()
+    if parser.aborted:
+        return None, {"error": f"Aborted malformed response: {parser.aborted}"}, parser.parse_ms
+    return raw_text, parsed, parser.parse_ms
+
 # Function to parse the response
 def parse_analysis_response(response_text: str) -> dict:
     """
@@ -341,176 +510,35 @@ def parse_analysis_response(response_text: str) -> dict:
         ]
       }
     }
+
+    Answers from the JSON output mode already have this structure; they are
+    decoded directly and the markdown parser is skipped.
     """
 
     if not response_text:
         return {"error": "No response text provided."}
 
-    # -------------------------------------------------------------------------
-    # 1) Extract the text for each major heading using improved regex
-    # -------------------------------------------------------------------------
-    vocab_match = re.search(
-        r"###\s*1\.?\s*Vocabulary Breakdown\s*:?(.*?)(?=###\s*2\.|###\s*\d+\.|$)",
-        response_text,
-        flags=re.S
-    )
-    grammar_match = re.search(
-        r"###\s*2\.?\s*Grammar Explanation\s*:?(.*?)(?=###\s*3\.|###\s*\d+\.|$)",
-        response_text,
-        flags=re.S
-    )
-    tips_match = re.search(
-        r"###\s*3\.?\s*Beginner Tips.*?\s*:?(.*?)(?=###\s*\d+\.|$)",
-        response_text,
-        flags=re.S
-    )
+    if response_text.lstrip().startswith("{"):
+        return parse_structured_response(response_text)
 
-    # Safely extract matched sections or empty string if not found
-    vocab_section = vocab_match.group(1).strip() if vocab_match else ""
-    grammar_section = grammar_match.group(1).strip() if grammar_match else ""
-    tips_section = tips_match.group(1).strip() if tips_match else ""
-
-    # Final output template
-    parsed_output = {
-        "vocabulary": [],
-        "grammar": {
-            "context": "",
-            "steps": [],
-            "sentence_pattern": "",
-            "sentence_pattern_kanji": "",
-            "sentence_pattern_hiragana": "",
-            "sentence_pattern_english": "",
-            "contribution": ""
-        },
-        "tips": {
-            "tip": "",
-            "common_mistake": "",
-            "alternative_expression": {
-                "kanji": "",
-                "hiragana": "",
-                "english": ""
-            },
-            "new_words_in_alternative": []
-        }
-    }
+    # Single pass over the markdown: the headings are found in one scan and
+    # every section line goes through a state machine (breakdown_parser.py)
+    return parse_markdown_breakdown(response_text)
 
-    # -------------------------------------------------------------------------
-    # 2) PARSE VOCABULARY BREAKDOWN
-    # -------------------------------------------------------------------------
-    def parse_vocab_section(text: str):
-        vocab_results = []
-        lines = text.splitlines()
-        i = 0
-
-        # Example line:
-        # - **明日 (あした)**: “tomorrow” - [Noun]
-        main_pattern = re.compile(
-            r'^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]',
-            re.U
-        )
 
-        while i < len(lines):
-            line = lines[i].strip()
-
-            m = main_pattern.match(line)
-            if not m:
-                i += 1
-                continue
-
-            word_str, reading_str, meaning_text, role_text = m.groups()
-            vocab_entry = {
-                "word": word_str.strip(),
-                "reading": reading_str.strip(),
-                "meaning": meaning_text.strip(),
-                "role": role_text.strip(),
-                "components": [],
-                "combined_explanation": ""
-            }
+def _fill_defaults(template, value):
+    """Returns `value` shaped like `template`: missing keys get the template's default."""
+    if isinstance(template, dict):
+        value = value if isinstance(value, dict) else {}
+        return {key: _fill_defaults(default, value.get(key)) for key, default in template.items()}
+    if isinstance(template, list):
+        return value if isinstance(value, list) else []
+    return value if isinstance(value, str) else template
 
-            i += 1
-            # Now parse sub-lines (component breakdown, contribution, etc.)
-            while i < len(lines):
-                sub_line = lines[i].rstrip()
-                # If we see a new main bullet that matches main_pattern, break
-                if main_pattern.match(sub_line):
-                    break
-
-                # 1) Look for "Component Breakdown"
-                if re.search(r"(?i)component breakdown", sub_line):
-                    i += 1
-                    while i < len(lines):
-                        comp_line = lines[i].strip()
-                        if not comp_line.startswith("-"):
-                            break
-
-                        # 1A) Check for "Contribution to Overall Meaning"
-                        contrib_match_inside = re.match(
-                            r"^- ?\*?\*?Contribution to Overall Meaning\*?\*?:\s*(.*)$",
-                            comp_line, re.I
-                        )
-                        if contrib_match_inside:
-                            vocab_entry["combined_explanation"] = contrib_match_inside.group(1).strip()
-                            i += 1
-                            continue
-
-                        # 1B) Otherwise parse as a component
-                        comp_regex = re.compile(
-                            r"^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]"
-                        )
-                        comp_match = comp_regex.match(comp_line)
-                        if comp_match:
-                            part_word, part_reading, part_meaning, part_contrib = comp_match.groups()
-                            vocab_entry["components"].append({
-                                "part": part_word.strip(),
-                                "reading": part_reading.strip(),
-                                "meaning": part_meaning.strip(),
-                                "contribution": part_contrib.strip()
-                            })
-                        else:
-                            # simpler fallback
-                            simple_comp = re.match(
-                                r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)$",
-                                comp_line
-                            )
-                            if simple_comp:
-                                part_word, part_reading, part_meaning, part_contrib = simple_comp.groups()
-                                vocab_entry["components"].append({
-                                    "part": part_word.strip(),
-                                    "reading": part_reading.strip(),
-                                    "meaning": part_meaning.strip(),
-                                    "contribution": part_contrib.strip()
-                                })
-
-                        i += 1
-                    continue
-
-                # 2) If line is "Contribution to Overall Meaning" outside
-                outside_contrib_pattern = re.match(
-                    r"^- ?\*?\*?Contribution to Overall Meaning\*?\*?:\s*(.*)$",
-                    sub_line, re.I
-                )
-                if outside_contrib_pattern:
-                    vocab_entry["combined_explanation"] = outside_contrib_pattern.group(1).strip()
-                    i += 1
-                    continue
-
-                # 3) If there's an extra bullet line, append it to combined_explanation
-                if sub_line.startswith("- "):
-                    text_only = sub_line.lstrip("- ").strip()
-                    vocab_entry["combined_explanation"] += " " + text_only
-
-                i += 1
-
-            vocab_results.append(vocab_entry)
-
-        return vocab_results
-
-    parsed_output["vocabulary"] = parse_vocab_section(vocab_section)
-
-    # -------------------------------------------------------------------------
-    # 3) PARSE GRAMMAR
-    # -------------------------------------------------------------------------
-    grammar_data = {
+# Default values for a structured answer (mirrors the template in parse_analysis_response)
+_STRUCTURED_TEMPLATE = {
+    "vocabulary": [],
+    "grammar": {
         "context": "",
         "steps": [],
         "sentence_pattern": "",
@@ -518,93 +546,8 @@ def parse_analysis_response(response_text: str) -> dict:
         "sentence_pattern_hiragana": "",
         "sentence_pattern_english": "",
         "contribution": ""
-    }
-
-    g_lines = grammar_section.splitlines()
-    idx = 0
-    while idx < len(g_lines):
-        gline = g_lines[idx].strip()
-
-        # Check for "Context"
-        if re.match(r"(\d\.\s*)?\**Context\**", gline, re.I):
-            idx += 1
-            context_lines = []
-            # gather lines until next big bullet or blank
-            while idx < len(g_lines):
-                if not g_lines[idx].strip() or re.match(r"(\d\.\s*)?\**Steps\**", g_lines[idx], re.I):
-                    break
-                context_lines.append(g_lines[idx].strip())
-                idx += 1
-            grammar_data["context"] = " ".join(context_lines)
-
-        # Check for "Steps"
-        elif re.match(r"(\d\.\s*)?\**Steps\**", gline, re.I):
-            idx += 1
-            step_list = []
-            while idx < len(g_lines):
-                line = g_lines[idx].strip()
-                if not line or re.match(r"(\d\.\s*)?\**Sentence Pattern\**", line, re.I):
-                    break
-                if line.startswith("-"):
-                    step_list.append(line.lstrip("- ").strip())
-                else:
-                    # Could also gather lines that don't start with '-'
-                    step_list.append(line)
-                idx += 1
-            grammar_data["steps"] = step_list
-
-        # Check for "Sentence Pattern"
-        elif re.match(r"(\d\.\s*)?\**Sentence Pattern\**", gline, re.I):
-            idx += 1
-            pattern_lines = []
-            while idx < len(g_lines):
-                line = g_lines[idx].strip()
-                # Stop if blank line or next bullet heading
-                if not line or line.startswith("---") or re.match(r"^\d\.\s*", line):
-                    break
-                pattern_lines.append(line)
-                idx += 1
-
-            # pattern_lines might be something like:
-            #   - [Time] + [は] + [Verb (dictionary form)] + [の] + [？]
-            #   - **Kanji**: 今日は何をするの？
-            #   - **Hiragana**: きょうはなにをするの？
-            #   - **English Translation**: What are you doing today?
-
-            # We can parse them more granularly:
-            joined_pattern = "\n".join(pattern_lines)
-            grammar_data["sentence_pattern"] = joined_pattern
-
-            # Attempt to capture sub-lines
-            for pline in pattern_lines:
-                pline_str = pline.strip()
-                # - **Kanji**: ...
-                kanji_match = re.match(r"-?\s*\*\*Kanji\*\*:\s*(.*)$", pline_str, re.I)
-                if kanji_match:
-                    grammar_data["sentence_pattern_kanji"] = kanji_match.group(1).strip()
-                    continue
-
-                # - **Hiragana**: ...
-                hira_match = re.match(r"-?\s*\*\*Hiragana\*\*:\s*(.*)$", pline_str, re.I)
-                if hira_match:
-                    grammar_data["sentence_pattern_hiragana"] = hira_match.group(1).strip()
-                    continue
-
-                # - **English Translation**: ...
-                eng_match = re.match(r"-?\s*\*\*English Translation\*\*:\s*(.*)$", pline_str, re.I)
-                if eng_match:
-                    grammar_data["sentence_pattern_english"] = eng_match.group(1).strip()
-                    continue
-
-            idx -= 1  # so outer loop doesn't skip next line
-        idx += 1
-
-    parsed_output["grammar"] = grammar_data
-
-    # -------------------------------------------------------------------------
-    # 4) PARSE TIPS
-    # -------------------------------------------------------------------------
-    tips_data = {
+    },
+    "tips": {
         "tip": "",
         "common_mistake": "",
         "alternative_expression": {
@@ -614,96 +557,207 @@ def parse_analysis_response(response_text: str) -> dict:
         },
         "new_words_in_alternative": []
     }
+}
+
+def parse_structured_response(response_text: str) -> dict:
+    """Decodes a JSON-mode answer into the same structure as `parse_analysis_response`."""
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        return {"error": f"Invalid JSON response: {e}"}
+    return _fill_defaults(_STRUCTURED_TEMPLATE, data)
+
+
+# -----------------------------------------------------------------------------
+# Section-level repair
+# -----------------------------------------------------------------------------
+# Sections that can be re-asked on their own, with the JSON snippet the model
+# should fill in. Vocabulary entries are handled separately, per word.
+REPAIR_FIELDS = {
+    "grammar.context": '"grammar": {"context": "<1-2 sentences summarising what the sentence describes>"}',
+    "grammar.steps": '"grammar": {"steps": ["<item> - <beginner-friendly explanation>", ...]}',
+    "tips.tip": '"tips": {"tip": "<a simple, memorable way to understand the structure>"}',
+    "tips.common_mistake": '"tips": {"common_mistake": "<one typical beginner mistake and how to avoid it>"}',
+    "tips.alternative_expression": (
+        '"tips": {"alternative_expression": {"kanji": "...", "hiragana": "...", "english": "..."}, '
+        '"new_words_in_alternative": [{"word": "...", "reading": "...", "meaning": "...", "description": "..."}]}'
+    ),
+}
+
+def find_missing_sections(data) -> list:
+    """
+    Lists the parts of a parsed breakdown that came back empty:
+        "vocabulary"       - no vocabulary at all (not repairable, regenerate)
+        "vocabulary[i]"    - entry i has neither components nor combined_explanation
+        keys of REPAIR_FIELDS for empty grammar / tips fields
+    """
+    if not isinstance(data, dict) or "error" in data or not data.get("vocabulary"):
+        return ["vocabulary"]
+
+    missing = [
+        f"vocabulary[{i}]"
+        for i, entry in enumerate(data["vocabulary"])
+        if not entry.get("components") and not entry.get("combined_explanation")
+    ]
+    grammar = data.get("grammar") or {}
+    tips = data.get("tips") or {}
+    if not grammar.get("context"):
+        missing.append("grammar.context")
+    if not grammar.get("steps"):
+        missing.append("grammar.steps")
+    if not tips.get("tip"):
+        missing.append("tips.tip")
+    if not tips.get("common_mistake"):
+        missing.append("tips.common_mistake")
+    if not any((tips.get("alternative_expression") or {}).values()):
+        missing.append("tips.alternative_expression")
+    return missing
+
+def _vocab_indices(missing):
+    return [int(section[len("vocabulary["):-1]) for section in missing if section.startswith("vocabulary[")]
+
+def section_repair_request(sentence, translation, data, missing):
+    """
+    Builds a short chat request that asks only for the missing sections,
+    instead of resending the full few-shot analysis prompt.
+    """
+    wanted = []
+    vocab_indices = _vocab_indices(missing)
+    if vocab_indices:
+        words = ", ".join(
+            f'{data["vocabulary"][i]["word"]} ({data["vocabulary"][i]["reading"]})' for i in vocab_indices
+        )
+        wanted.append(
+            f"- Component breakdown for these words from the sentence: {words}\n"
+            '  "vocabulary": [{"word": "<word exactly as given>", '
+            '"components": [{"part": "...", "reading": "...", "meaning": "...", "contribution": "<part of speech>"}], '
+            '"combined_explanation": "<how the parts combine, or what the word does in the sentence>"}]\n'
+            "  (leave components empty for words that cannot be split, but always give combined_explanation)"
+        )
+    for section in missing:
+        if section in REPAIR_FIELDS:
+            wanted.append(f"- {REPAIR_FIELDS[section]}")
+    fields = "\n".join(wanted)
+
+    prompt = f"""
+You are a Japanese language tutor for beginners. An earlier beginner-level analysis
+of this sentence is missing some parts. Provide ONLY the missing parts.
+
+Sentence: {sentence}
+Translation: {translation}
+
+Return ONLY a JSON object containing these keys (merge keys under "grammar"/"tips"
+into one object each):
+{fields}
+"""
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are a Japanese tutor."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        max_tokens=600,
+        response_format={"type": "json_object"},
+    )
+
+def merge_section_repair(data, repair, missing) -> dict:
+    """Copies the repaired sections into `data` (in place) and returns it."""
+    if not isinstance(repair, dict):
+        return data
+
+    repaired_vocab = {
+        entry.get("word", "").strip(): entry
+        for entry in repair.get("vocabulary") or []
+        if isinstance(entry, dict)
+    }
+    for i in _vocab_indices(missing):
+        entry = data["vocabulary"][i]
+        fix = repaired_vocab.get(entry["word"].strip())
+        if not fix:
+            continue
+        components = fix.get("components") or []
+        entry["components"] = [
+            {key: str(comp.get(key, "")).strip() for key in ("part", "reading", "meaning", "contribution")}
+            for comp in components if isinstance(comp, dict)
+        ]
+        entry["combined_explanation"] = str(fix.get("combined_explanation", "")).strip()
+
+    grammar_fix = repair.get("grammar") or {}
+    tips_fix = repair.get("tips") or {}
+    if "grammar.context" in missing and isinstance(grammar_fix.get("context"), str):
+        data["grammar"]["context"] = grammar_fix["context"].strip()
+    if "grammar.steps" in missing and isinstance(grammar_fix.get("steps"), list):
+        data["grammar"]["steps"] = [str(step).strip() for step in grammar_fix["steps"]]
+    if "tips.tip" in missing and isinstance(tips_fix.get("tip"), str):
+        data["tips"]["tip"] = tips_fix["tip"].strip()
+    if "tips.common_mistake" in missing and isinstance(tips_fix.get("common_mistake"), str):
+        data["tips"]["common_mistake"] = tips_fix["common_mistake"].strip()
+    if "tips.alternative_expression" in missing:
+        alt = tips_fix.get("alternative_expression") or {}
+        if isinstance(alt, dict):
+            data["tips"]["alternative_expression"] = {
+                key: str(alt.get(key, "")).strip() for key in ("kanji", "hiragana", "english")
+            }
+        new_words = tips_fix.get("new_words_in_alternative") or []
+        if isinstance(new_words, list):
+            data["tips"]["new_words_in_alternative"] = [
+                {key: str(word.get(key, "")).strip() for key in ("word", "reading", "meaning", "description")}
+                for word in new_words if isinstance(word, dict)
+            ]
+    return data
+
+async def repair_breakdown_async(sentence, translation, data, on_response=None, use_cache=True):
+    """
+    Re-asks only the missing sections of a parsed breakdown and merges them in.
+    Returns the (possibly still incomplete) breakdown; breakdowns without any
+    vocabulary can't be repaired and are returned unchanged.
 
-    t_lines = tips_section.splitlines()
-    j = 0
-    in_new_words_section = False
-    in_alt_expr_section = False
-
-    while j < len(t_lines):
-        tline = t_lines[j].strip()
-
-        # Tip
-        if re.match(r"- ?\*\*Tip\*\*:", tline, re.I):
-            tips_data["tip"] = tline.split(":", 1)[1].strip()
-            in_new_words_section = False
-            in_alt_expr_section = False
-
-        # Common Mistake
-        elif re.match(r"- ?\*\*Common Mistake\*\*:", tline, re.I):
-            tips_data["common_mistake"] = tline.split(":", 1)[1].strip()
-            in_new_words_section = False
-            in_alt_expr_section = False
-
-        # Alternative Expression
-        elif re.match(r"- ?\*\*Alternative Expression\*\*:", tline, re.I):
-            # We’ll parse the lines that follow as Kanji/Hiragana/English
-            in_alt_expr_section = True
-            in_new_words_section = False
-            j += 1
-            # Read lines until we hit a new bullet or blank
-            while j < len(t_lines):
-                alt_line = t_lines[j].strip()
-                # If we see 'New Words' bullet or run out of lines, stop
-                if not alt_line or re.match(r"- ?\*\*New Words in Alternative Expression\*\*:", alt_line, re.I):
-                    j -= 1
-                    break
-
-                # e.g. "- **Kanji**: 明日は出かけますか？"
-                kanji_match = re.match(r"-?\s*\*\*Kanji\*\*:\s*(.*)$", alt_line, re.I)
-                if kanji_match:
-                    tips_data["alternative_expression"]["kanji"] = kanji_match.group(1).strip()
-                hira_match = re.match(r"-?\s*\*\*Hiragana\*\*:\s*(.*)$", alt_line, re.I)
-                if hira_match:
-                    tips_data["alternative_expression"]["hiragana"] = hira_match.group(1).strip()
-                eng_match = re.match(r"-?\s*\*\*English\*\*:\s*(.*)$", alt_line, re.I)
-                if eng_match:
-                    tips_data["alternative_expression"]["english"] = eng_match.group(1).strip()
-
-                j += 1
-
-        # New Words in Alternative Expression
-        elif re.match(r"- ?\*\*New Words in Alternative Expression\*\*:", tline, re.I):
-            in_new_words_section = True
-            in_alt_expr_section = False
-
-        elif in_new_words_section:
-            # For lines like:
-            # - **出かけます (でかけます)**: "to go out" - [Verb, polite form]
-            new_word_pat = re.compile(
-                r"^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]"
-            )
-            mw = new_word_pat.match(tline)
-            if mw:
-                w_word, w_reading, w_meaning, w_extra = mw.groups()
-                tips_data["new_words_in_alternative"].append({
-                    "word": w_word.strip(),
-                    "reading": w_reading.strip(),
-                    "meaning": w_meaning.strip(),
-                    "description": w_extra.strip()
-                })
-            else:
-                # simpler fallback
-                simple_nw = re.match(
-                    r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)?",
-                    tline
-                )
-                if simple_nw:
-                    w_word, w_reading, w_meaning, w_extra = simple_nw.groups()
-                    if w_extra is None:
-                        w_extra = ""
-                    tips_data["new_words_in_alternative"].append({
-                        "word": w_word.strip(),
-                        "reading": w_reading.strip(),
-                        "meaning": w_meaning.strip(),
-                        "description": w_extra.strip()
-                    })
-
-        j += 1
-
-    parsed_output["tips"] = tips_data
-
-    return parsed_output
+    on_response(raw_text, missing) is called with the raw repair answer,
+    e.g. to archive it for rebuild_breakdown. Pass use_cache=False when an
+    earlier repair of the same breakdown left it incomplete.
+    """
+    missing = find_missing_sections(data)
+    if not missing or "vocabulary" in missing:
+        return data
+    try:
+        response = await chat_completion(use_cache=use_cache,
+                                         **section_repair_request(sentence, translation, data, missing))
+        if on_response is not None:
+            on_response(response.choices[0].message.content, missing)
+        repair = json.loads(response.choices[0].message.content)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"Error in repair call: {e}")
+        report_parse(False)
+        return data
+    merge_section_repair(data, repair, missing)
+    report_parse(not find_missing_sections(data))
+    return data
+
+def rebuild_breakdown(analysis_text, repairs=()):
+    """
+    Re-creates a breakdown from archived raw answers (see response_archive.py)
+    with the current parser: the analysis is parsed again and each archived
+    repair is merged into the sections that are still missing.
+
+    repairs : [(raw repair answer, missing sections it was asked for), ...]
+    """
+    data = parse_analysis_response(analysis_text)
+    for repair_text, missing in repairs:
+        if "error" in data:
+            break
+        still_missing = set(find_missing_sections(data))
+        todo = [section for section in missing if section in still_missing]
+        if not todo:
+            continue
+        try:
+            repair = json.loads(repair_text)
+        except json.JSONDecodeError:
+            continue
+        merge_section_repair(data, repair, todo)
+    return data
 
 
 # Example usage
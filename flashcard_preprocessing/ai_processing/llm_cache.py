@@ -0,0 +1,189 @@
+"""
+Persistent, content-addressed cache for chat completion responses.
+
+Entries live in one SQLite file and are keyed by a SHA-256 hash of the full
+request (model, temperature, messages and every other parameter), so a rerun
+with identical prompts costs zero API calls. Each entry stores the raw
+completion text plus its token usage and finish reason. An optional size
+cap evicts the least recently used entries.
+
+The file runs in WAL mode with synchronous=NORMAL, so a write is not an
+fsync; a power cut can lose the last few entries, which only costs their
+API calls again. Cache hits are not written one by one: their
+`last_used_at` is updated in batches of TOUCH_BATCH (and on close).
+
+Configuration (.env or environment):
+    LLM_CACHE            set to "0" to disable the cache
+    LLM_CACHE_PATH       SQLite file (default: .cache/llm_cache.sqlite3 in the project root)
+    LLM_CACHE_MAX_BYTES  optional size cap for the stored completions
+"""
+import hashlib
+import json
+import os
+import atexit
+import sqlite3
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+DEFAULT_CACHE_PATH = os.path.join(PROJECT_ROOT, ".cache", "llm_cache.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key          TEXT PRIMARY KEY,
+    model        TEXT NOT NULL,
+    content      TEXT NOT NULL,
+    usage_json   TEXT NOT NULL,
+    finish_reason TEXT NOT NULL DEFAULT 'stop',
+    size_bytes   INTEGER NOT NULL,
+    created_at   REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at);
+"""
+
+# Cache hits whose last_used_at is written in one transaction
+TOUCH_BATCH = 256
+
+
+def make_key(params: dict) -> str:
+    """Stable hash of the request parameters (model, temperature, messages, ...)."""
+    canonical = json.dumps(params, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def usage_to_dict(usage) -> dict:
+    """Pulls the token counts we care about out of an OpenAI usage object."""
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+    }
+
+
+def cached_response(content: str, usage: dict, finish_reason: str = "stop"):
+    """
+    Builds an object shaped like a ChatCompletion (`.choices[0].message.content`,
+    `.finish_reason` and `.usage`) so callers can't tell a cache hit from a
+    live response.
+    """
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+        usage=SimpleNamespace(**usage),
+        from_cache=True,
+    )
+
+
+class ResponseCache:
+    """SQLite-backed completion cache with optional LRU size cap."""
+
+    def __init__(self, path: str, max_bytes: int = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if "finish_reason" not in columns:  # cache file from before finish_reason was stored
+            self.conn.execute("ALTER TABLE responses ADD COLUMN finish_reason TEXT NOT NULL DEFAULT 'stop'")
+        self.conn.commit()
+        self._touched = {}  # key -> last_used_at not written yet
+        # Running size of the stored completions, so a put doesn't sum the table.
+        # Other processes sharing the file make it drift, so it is recounted
+        # before anything is evicted.
+        self._total = self._count_bytes() if max_bytes else None
+
+    def _count_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str):
+        """Returns (content, usage_dict, finish_reason) or None, marking the entry as recently used."""
+        row = self.conn.execute(
+            "SELECT content, usage_json, finish_reason FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._touched[key] = time.time()
+        if len(self._touched) >= TOUCH_BATCH:
+            self.flush()
+        return row[0], json.loads(row[1]), row[2]
+
+    def flush(self):
+        """Writes the pending last_used_at updates of cache hits."""
+        if not self._touched:
+            return
+        self.conn.executemany(
+            "UPDATE responses SET last_used_at = ? WHERE key = ?",
+            [(used_at, key) for key, used_at in self._touched.items()],
+        )
+        self.conn.commit()
+        self._touched.clear()
+
+    def put(self, key: str, model: str, content: str, usage: dict, finish_reason: str = "stop"):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        if self._total is not None:
+            old = self.conn.execute("SELECT size_bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            self._total += size - (old[0] if old else 0)
+        self._touched.pop(key, None)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, model, content, usage_json, finish_reason, size_bytes, created_at, last_used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, model, content, json.dumps(usage), finish_reason or "stop", size, now, now),
+        )
+        self.conn.commit()
+        if self.max_bytes and self._total > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        self.flush()  # the LRU order needs the pending hits
+        total = self._count_bytes()
+        self._total = total
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in self.conn.execute(
+            "SELECT key, size_bytes FROM responses ORDER BY last_used_at ASC"
+        ):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.conn.commit()
+        self._total = total
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the shared ResponseCache, or None when LLM_CACHE=0."""
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        max_bytes = os.getenv("LLM_CACHE_MAX_BYTES")
+        _cache = ResponseCache(
+            os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            int(max_bytes) if max_bytes else None,
+        )
+        atexit.register(_cache.flush)
+    return _cache
@@ -0,0 +1,272 @@
+"""
+Shared asyncio execution engine for the OpenAI-driven preprocessing scripts.
+
+Scripts build a list of row items and hand them to `run_jobs` together with
+an async job function. The jobs run on one event loop with at most
+`concurrency` requests in flight, all sharing a single pooled AsyncOpenAI
+client, and the results come back in the same order as the input items.
+
+Inside a job, use `chat_completion(...)` instead of creating a client, or
+`stream_chat_completion(...)` to consume the answer while it is generated.
+Requests are paced and retried by the run's RateLimiter (rate_limiter.py);
+if the API keeps failing, `run_jobs` stops early with CircuitOpenError.
+Set OPENAI_BASE_URL to send every request to another endpoint, e.g. the
+local record/replay stand-in in openai_standin.py.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+from flashcard_preprocessing.ai_processing import llm_telemetry
+from flashcard_preprocessing.ai_processing.llm_cache import cached_response, get_cache, make_key, usage_to_dict
+from flashcard_preprocessing.ai_processing.rate_limiter import CircuitOpenError, RateLimiter, estimate_tokens
+
+# Load environment variables from .env file
+load_dotenv()
+
+# How many requests may be in flight at once (override with OPENAI_CONCURRENCY)
+DEFAULT_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+
+# The client of the currently running `run_jobs` call
+_client = contextvars.ContextVar("openai_client", default=None)
+_limiter = contextvars.ContextVar("openai_limiter", default=None)
+
+
+def _build_client(concurrency: int):
+    """
+    One AsyncOpenAI client per run, with an HTTP connection pool sized to the
+    concurrency so every in-flight request reuses a kept-alive connection.
+    openai and httpx are imported here, so importing this module stays cheap.
+    """
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+        )
+    )
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        http_client=http_client,
+        # retries, backoff and Retry-After are handled by the RateLimiter
+        max_retries=0,
+    )
+
+
+async def chat_completion(use_cache=True, **params):
+    """
+    Same arguments as `client.chat.completions.create`, sent through the
+    pooled client of the surrounding `run_jobs` call.
+
+    Identical requests are answered from the persistent response cache
+    (see llm_cache.py). Pass use_cache=False to force a fresh completion,
+    e.g. when retrying after an unusable answer; the new answer replaces
+    the cached one.
+    """
+    client = _client.get()
+    if client is None:
+        raise RuntimeError("chat_completion() must be awaited inside a run_jobs() job")
+
+    model = params.get("model", "")
+    response_format = (params.get("response_format") or {}).get("type", "text")
+    started = time.perf_counter()
+
+    cache = get_cache()
+    key = make_key(params) if cache is not None else None
+    if use_cache and cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            content, usage, finish_reason = hit
+            llm_telemetry.record_call(model, started, usage, cached=True, response_format=response_format)
+            return cached_response(content, usage, finish_reason)
+
+    async def send():
+        nonlocal started
+        started = time.perf_counter()
+        return await client.chat.completions.create(**params)
+
+    def on_error(e):
+        llm_telemetry.record_call(model, started, {}, error=f"{type(e).__name__}: {e}",
+                                  response_format=response_format)
+
+    response = await _limiter.get().call(send, estimate_tokens(params), on_error=on_error)
+
+    usage = usage_to_dict(response.usage)
+    llm_telemetry.record_call(model, started, usage, response_format=response_format)
+
+    # An answer cut off at max_tokens is not cached: a rerun should get a complete one
+    choice = response.choices[0] if response.choices else None
+    if cache is not None and choice is not None and choice.message.content and choice.finish_reason != "length":
+        cache.put(key, model, choice.message.content, usage, choice.finish_reason)
+    return response
+
+
+async def stream_chat_completion(on_text, use_cache=True, **params):
+    """
+    Streaming variant of `chat_completion`: the answer is requested in
+    stream mode and `on_text(piece)` is called with every piece of text as
+    it arrives. If `on_text` returns False, the stream is closed right away,
+    so the rest of the answer is never generated (or billed).
+
+    A cache hit is passed to `on_text` in one piece. Only complete answers
+    are cached (not aborted, not cut off at max_tokens). Returns an object like `chat_completion`'s, with the text
+    received so far and `aborted` telling whether on_text stopped the stream.
+    """
+    client = _client.get()
+    if client is None:
+        raise RuntimeError("stream_chat_completion() must be awaited inside a run_jobs() job")
+
+    model = params.get("model", "")
+    response_format = (params.get("response_format") or {}).get("type", "text")
+    started = time.perf_counter()
+
+    cache = get_cache()
+    key = make_key(params) if cache is not None else None
+    if use_cache and cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            content, usage, finish_reason = hit
+            llm_telemetry.record_call(model, started, usage, cached=True, response_format=response_format)
+            response = cached_response(content, usage, finish_reason)
+            response.aborted = on_text(content) is False
+            return response
+
+    async def send():
+        nonlocal started
+        started = time.perf_counter()
+        return await client.chat.completions.create(
+            stream=True, stream_options={"include_usage": True}, **params
+        )
+
+    def on_error(e):
+        llm_telemetry.record_call(model, started, {}, error=f"{type(e).__name__}: {e}",
+                                  response_format=response_format)
+
+    # Only opening the stream is rate limited and retried; a failure half-way
+    # through can't be retried without sending the same text to on_text twice.
+    # The concurrency slot is held until the stream is closed.
+    limiter = _limiter.get()
+    stream = await limiter.call(send, estimate_tokens(params), on_error=on_error, hold_slot=True)
+
+    parts = []
+    usage = None
+    finish_reason = None
+    aborted = False
+    try:
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+            piece = chunk.choices[0].delta.content
+            if piece:
+                parts.append(piece)
+                if on_text(piece) is False:
+                    aborted = True
+                    break
+    except Exception as e:
+        on_error(e)
+        raise
+    finally:
+        # also after an error in on_text or mid-stream: the response holds one
+        # of the pool's `concurrency` connections until it is closed
+        try:
+            await stream.close()
+        finally:
+            await limiter.release_slot()
+
+    content = "".join(parts)
+    usage = usage_to_dict(usage)
+    llm_telemetry.record_call(model, started, usage, response_format=response_format,
+                              error="aborted: stream closed early" if aborted else None)
+
+    if aborted:
+        finish_reason = "aborted"
+    if cache is not None and content and not aborted and finish_reason != "length":
+        cache.put(key, model, content, usage, finish_reason or "stop")
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                 finish_reason=finish_reason or "stop")],
+        usage=SimpleNamespace(**usage) if usage else None,
+        from_cache=False,
+        aborted=aborted,
+    )
+
+
+async def _run_jobs(items, job, concurrency, on_result, row_key, stats):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(items)
+
+    async with _build_client(concurrency) as client:
+        token = _client.set(client)
+        limiter_token = _limiter.set(RateLimiter(concurrency))
+        try:
+            async def run_one(index, item):
+                llm_telemetry.start_job(stats, row_key(item) if row_key else str(index))
+                try:
+                    async with semaphore:
+                        result = await job(item)
+                finally:
+                    llm_telemetry.finish_job()
+                results[index] = result
+                if on_result is not None:
+                    on_result(index, result)
+
+            tasks = [asyncio.ensure_future(run_one(i, item)) for i, item in enumerate(items)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # e.g. CircuitOpenError: stop the other rows instead of letting them fail one by one
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            _limiter.reset(limiter_token)
+            _client.reset(token)
+
+    return results
+
+
+def run_jobs(items, job, concurrency=None, on_result=None, row_key=None, summary=True):
+    """
+    Runs `await job(item)` for every item with bounded concurrency.
+
+    items       : list of row items (anything `job` accepts)
+    job         : async function taking one item
+    concurrency : max requests in flight (defaults to OPENAI_CONCURRENCY)
+    on_result   : optional callback(index, result), called as each job finishes
+                  (in completion order, e.g. for progress bars)
+    row_key     : optional function item -> str naming the row in the telemetry
+                  log (defaults to the item's index)
+    summary     : print the telemetry summary at the end of the run
+
+    Returns the list of results in the same order as `items`.
+
+    Raises CircuitOpenError if the API kept failing and the run was stopped;
+    rows already handed to `on_result` are done, the rest were not attempted.
+    """
+    items = list(items)
+    if not items:
+        return []
+    concurrency = max(1, concurrency or DEFAULT_CONCURRENCY)
+    stats = llm_telemetry.RunStats(len(items))
+    try:
+        return asyncio.run(_run_jobs(items, job, concurrency, on_result, row_key, stats))
+    finally:
+        stats.close()
+        if summary:
+            stats.print_summary()
+
+
+def run_one(job, *args):
+    """Convenience wrapper to run a single async job call synchronously."""
+    return run_jobs([args], lambda item: job(*item), concurrency=1, summary=False)[0]
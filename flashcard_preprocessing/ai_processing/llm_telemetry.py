@@ -0,0 +1,166 @@
+"""
+Per-call telemetry for chat completions.
+
+Every `chat_completion` call inside a `run_jobs` job is recorded with the
+script name, row key, model, response format, latency, token usage, how
+many earlier calls the same row already needed (retries), whether it came
+from the response cache, and whether (and how fast) the caller could parse
+the answer (`report_parse`).
+
+Records are appended as JSONL once their row finishes, and `run_jobs`
+prints a summary at the end of every run (p50/p95 latency, tokens per row,
+rows per minute).
+
+Configuration (.env or environment):
+    LLM_TELEMETRY       set to "0" to disable the JSONL log (the summary is still printed)
+    LLM_TELEMETRY_PATH  JSONL file (default: .cache/telemetry/llm_calls.jsonl in the project root)
+"""
+import contextvars
+import json
+import os
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+DEFAULT_TELEMETRY_PATH = os.path.join(PROJECT_ROOT, ".cache", "telemetry", "llm_calls.jsonl")
+
+# State of the row job running in the current asyncio task
+_job = contextvars.ContextVar("llm_job", default=None)
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class RunStats:
+    """Collects the call records of one `run_jobs` run and appends them to the log."""
+
+    def __init__(self, total_rows):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.script = os.path.splitext(os.path.basename(sys.argv[0] or "interactive"))[0]
+        self.total_rows = total_rows
+        self.started = time.perf_counter()
+        self.records = []
+        self.log = None
+        if os.getenv("LLM_TELEMETRY", "1") != "0":
+            path = os.getenv("LLM_TELEMETRY_PATH", DEFAULT_TELEMETRY_PATH)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.log = open(path, "a", encoding="utf-8")
+
+    def add(self, records):
+        self.records.extend(records)
+        if self.log is not None:
+            for record in records:
+                self.log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.log.flush()
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def summary_lines(self):
+        elapsed = time.perf_counter() - self.started
+        live = [r for r in self.records if not r["cached"]]
+        latencies = [r["latency_ms"] for r in live if r["error"] is None]
+        prompt_tokens = sum(r["prompt_tokens"] for r in live)
+        completion_tokens = sum(r["completion_tokens"] for r in live)
+        parsed = [r for r in self.records if r["parse_ok"] is not None]
+        rows = max(self.total_rows, 1)
+
+        lines = [
+            f"Rows:                      {self.total_rows:>8}",
+            f"Calls (live / cached):     {len(live):>8} / {len(self.records) - len(live)}",
+            f"Retries:                   {sum(1 for r in self.records if r['retries']):>8}",
+            f"Errors:                    {sum(1 for r in self.records if r['error']):>8}",
+        ]
+        if latencies:
+            lines.append(
+                f"Latency p50 / p95:         {_percentile(latencies, 50):>8.0f} / {_percentile(latencies, 95):.0f} ms"
+            )
+        lines += [
+            f"Prompt tokens per row:     {prompt_tokens / rows:>8.0f}",
+            f"Completion tokens per row: {completion_tokens / rows:>8.0f}",
+            f"Rows per minute:           {self.total_rows / max(elapsed, 1e-9) * 60:>8.1f}",
+        ]
+        if parsed:
+            ok = sum(1 for r in parsed if r["parse_ok"])
+            lines.append(f"Parse success:             {ok:>8} / {len(parsed)}")
+        parse_times = [r["parse_ms"] for r in self.records if r["parse_ms"] is not None]
+        if parse_times:
+            lines.append(f"Parse CPU per answer:      {sum(parse_times) / len(parse_times):>8.2f} ms")
+        return lines
+
+    def print_summary(self):
+        print("────────────────────────────────────────────────────────")
+        print(f"📈  LLM CALL SUMMARY  ({self.script}, run {self.run_id})")
+        print("────────────────────────────────────────────────────────")
+        for line in self.summary_lines():
+            print(line)
+        print("────────────────────────────────────────────────────────")
+
+
+class _JobState:
+    __slots__ = ("stats", "row_key", "records")
+
+    def __init__(self, stats, row_key):
+        self.stats = stats
+        self.row_key = row_key
+        self.records = []
+
+
+def start_job(stats, row_key):
+    """Called by run_jobs at the start of each row job (inside the job's task)."""
+    _job.set(_JobState(stats, row_key))
+
+
+def finish_job():
+    """Called by run_jobs when a row job returns; flushes its call records."""
+    state = _job.get()
+    if state is not None and state.records:
+        state.stats.add(state.records)
+
+
+def record_call(model, started, usage, cached=False, error=None, response_format="text"):
+    """Records one chat completion call made by the current row job."""
+    state = _job.get()
+    if state is None:
+        return
+    state.records.append({
+        "ts": time.time(),
+        "run_id": state.stats.run_id,
+        "script": state.stats.script,
+        "row_key": state.row_key,
+        "model": model,
+        "format": response_format,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "cached_tokens": usage.get("cached_tokens", 0),
+        "retries": len(state.records),
+        "cached": cached,
+        "error": error,
+        "parse_ok": None,
+        "parse_ms": None,
+    })
+
+
+def report_parse(ok, parse_ms=None):
+    """
+    Marks whether the answer of the current row's latest call could be parsed,
+    optionally with the CPU time the parser took.
+    """
+    state = _job.get()
+    if state is not None and state.records:
+        state.records[-1]["parse_ok"] = bool(ok)
+        if parse_ms is not None:
+            state.records[-1]["parse_ms"] = round(parse_ms, 3)
@@ -0,0 +1,174 @@
+"""
+Near-duplicate detection for short Japanese texts (fill-gap questions).
+
+Byte-identical checks miss questions that differ only by punctuation, a
+swapped noun or a name. Texts are normalized first (NFKC, so full-/half-width
+forms match; katakana folded to hiragana; the ____ blank, punctuation and
+spaces removed) and turned into sets of character shingles (bigrams by
+default: the questions are only ~10 characters long).
+
+Each distinct normalized text gets a MinHash signature. LSH banding then
+puts texts into buckets by each band of `rows` signature values. Only texts
+that share a bucket are candidates, so the work grows with the number of
+similar texts rather than with n². Candidates are verified with the exact
+Jaccard similarity of their shingle sets and grouped into clusters around a
+leader text.
+
+With the defaults (60 hashes = 20 bands x 3 rows) a pair with similarity 0.5
+becomes a candidate with probability ~0.93, one at 0.3 with ~0.42 (and is
+then dropped by the verification), unrelated pairs (~0.03) almost never.
+
+    clusters = find_clusters(["彼は本____読みます。", "彼は本を____読みます", ...])
+    # -> [[0, 1], ...] indexes into the input, only clusters of 2+
+"""
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+DEFAULT_SHINGLE = 2
+DEFAULT_BANDS = 20
+DEFAULT_ROWS = 3
+DEFAULT_THRESHOLD = 0.5
+
+_BLANK = re.compile(r"_+|＿+")
+_MASK = (1 << 64) - 1
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize(text) -> str:
+    """Width-, kana- and punctuation-insensitive form of a question, without the blank."""
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _BLANK.sub("", text).translate(_KATAKANA_TO_HIRAGANA).lower()
+    # drop punctuation (P*), separators/spaces (Z*) and symbols (S*)
+    return "".join(c for c in text if unicodedata.category(c)[0] not in "PZS")
+
+
+def shingles(text, k=DEFAULT_SHINGLE) -> frozenset:
+    if len(text) <= k:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + k] for i in range(len(text) - k + 1))
+
+
+def jaccard(a, b) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """`bands * rows` hash functions h(x) = (a*x + b) mod 2^64 over the CRC32 of each shingle."""
+
+    def __init__(self, bands=DEFAULT_BANDS, rows=DEFAULT_ROWS, seed=1):
+        rng = random.Random(seed)
+        self.bands = bands
+        self.rows = rows
+        # odd multipliers keep every h a permutation of the 64-bit range
+        self.params = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(bands * rows)]
+        self._vectors = {}  # shingle -> its value under every hash; shingles repeat across texts
+
+    def _vector(self, shingle):
+        vector = self._vectors.get(shingle)
+        if vector is None:
+            h = zlib.crc32(shingle.encode("utf-8"))
+            vector = self._vectors[shingle] = [(a * h + b) & _MASK for a, b in self.params]
+        return vector
+
+    def signature(self, shingle_set) -> list:
+        if not shingle_set:
+            return [0] * len(self.params)
+        return list(map(min, zip(*map(self._vector, shingle_set))))
+
+    def band_keys(self, signature):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+
+def lsh_buckets(texts, shingle_sets, hasher, band_cache=None):
+    """
+    Band keys of every text and the texts in each bucket: (keys per text,
+    {band key: [text index, ...]}). A band key is the (stable) hash of the
+    band number and its signature values, so `band_cache` ({text: keys}) can
+    be saved between runs and skips the signatures of texts seen before.
+    """
+    keys = []
+    buckets = defaultdict(list)
+    for i, (text, shingle_set) in enumerate(zip(texts, shingle_sets)):
+        own = band_cache.get(text) if band_cache is not None else None
+        if own is None:
+            # 32 bits keep the cache small; a collision only adds a candidate
+            own = [hash(key) & 0xFFFFFFFF for key in hasher.band_keys(hasher.signature(shingle_set))]
+            if band_cache is not None:
+                band_cache[text] = own
+        keys.append(own)
+        for key in own:
+            buckets[key].append(i)
+    return keys, buckets
+
+
+def find_clusters(texts, threshold=DEFAULT_THRESHOLD, k=DEFAULT_SHINGLE,
+                  bands=DEFAULT_BANDS, rows=DEFAULT_ROWS, band_cache=None):
+    """
+    Groups near-duplicate texts. Returns clusters (lists of input indexes,
+    2+ members, sorted); texts that normalize to the same string are always
+    in the same cluster.
+
+    Clusters are built around a leader: the first text (in input order) not
+    yet taken collects every untaken text that shares an LSH bucket with it
+    and is at least `threshold` similar. Unlike connected components this
+    cannot chain short, formulaic sentences ("この…はとても…です") into one
+    giant cluster, and a text is never verified again once it is taken.
+
+    `band_cache` ({normalized text: band keys}, only valid for one k/bands/
+    rows setting) is read and updated; afterwards it holds exactly the
+    current texts, so it never grows past the corpus.
+    """
+    # identical normalized texts share one signature
+    by_text = defaultdict(list)
+    normalized = {}  # raw text -> normalized; exact copies are common
+    for i, text in enumerate(texts):
+        norm = normalized.get(text)
+        if norm is None:
+            norm = normalized[text] = normalize(text)
+        by_text[norm].append(i)
+    unique = list(by_text)
+    shingle_sets = [shingles(text, k) for text in unique]
+    sizes = [len(s) for s in shingle_sets]
+    keys, buckets = lsh_buckets(unique, shingle_sets, MinHasher(bands, rows), band_cache)
+    if band_cache is not None and len(band_cache) > len(unique):
+        for text in set(band_cache) - set(by_text):
+            del band_cache[text]
+
+    clusters = []
+    taken = bytearray(len(unique))
+    for leader, text in enumerate(unique):
+        if taken[leader]:
+            continue
+        members = list(by_text[text])
+        leader_set, leader_size = shingle_sets[leader], sizes[leader]
+        for key in keys[leader]:
+            for other in buckets[key]:
+                if taken[other] or other <= leader:
+                    continue
+                size = sizes[other]
+                # Jaccard can't exceed min/max of the set sizes
+                if min(size, leader_size) < threshold * max(size, leader_size):
+                    continue
+                common = len(leader_set & shingle_sets[other])
+                if common >= threshold * (leader_size + size - common):
+                    taken[other] = 1
+                    members.extend(by_text[unique[other]])
+        if len(members) > 1:
+            clusters.append(sorted(members))
+    return sorted(clusters)
+
+
+def cluster_similarity(texts, k=DEFAULT_SHINGLE) -> float:
+    """Lowest pairwise similarity inside a cluster (1.0 = all identical after normalizing)."""
+    sets = list({normalize(text): None for text in texts})
+    sets = [shingles(text, k) for text in sets]
+    if len(sets) < 2:
+        return 1.0
+    return min(jaccard(a, b) for x, a in enumerate(sets) for b in sets[x + 1:])
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+normalize_breakdowns.py
+
+Moves the vocabulary entries of the breakdown CSVs into the shared entry
+table (see entry_table.py) and writes a normalized copy of each CSV whose
+breakdown column holds references instead of full entries:
+
+    .../N5_Vocab_List_with_Example_Sentences_and_Breakdowns.csv
+        -> .../N5_Vocab_List_with_Example_Sentences_and_Breakdowns.normalized.csv
+        +  flashcard_preprocessing/breakdown_entries.json (shared by all levels)
+
+Every normalized row is checked to rehydrate to the original document before
+anything is written. `rehydrate` rebuilds the full CSV (the format the seed
+scripts read) from the normalized one.
+
+Usage (from the project root):
+    python flashcard_preprocessing/ai_processing/normalize_breakdowns.py normalize all
+    python flashcard_preprocessing/ai_processing/normalize_breakdowns.py rehydrate n5-vocab
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+from flashcard_preprocessing.ai_processing.entry_table import DEFAULT_TABLE_PATH, EntryTable
+from flashcard_preprocessing.ai_processing.reparse_breakdowns import TARGETS, _newline
+
+
+def normalized_path_for(csv_path) -> str:
+    """'.../x_and_Breakdowns.csv' -> '.../x_and_Breakdowns.normalized.csv'"""
+    root, _ = os.path.splitext(str(csv_path))
+    return f"{root}.normalized.csv"
+
+
+def _read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def _write_csv(path, fieldnames, rows, newline):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator=newline)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    atomic_write(path, write)
+
+
+def _decode(cell):
+    """Parsed breakdown, or None for cells that aren't JSON (kept verbatim)."""
+    try:
+        return json.loads(cell)
+    except (TypeError, json.JSONDecodeError):
+        return None
+
+
+def load_normalized(name, table=None):
+    """
+    Reads a normalized CSV with its breakdown cells decoded (references only).
+    Returns (rows, table); `table.rehydrate(row[column])` gives the full
+    breakdown of a row on demand.
+    """
+    target = TARGETS[name]
+    table = table or EntryTable.load()
+    _, rows = _read_csv(normalized_path_for(target["csv"]))
+    for row in rows:
+        doc = _decode(row[target["column"]])
+        if doc is not None:
+            row[target["column"]] = doc
+    return rows, table
+
+
+def normalize_target(name, table):
+    target = TARGETS[name]
+    csv_path = target["csv"]
+    column = target["column"]
+    if not os.path.exists(csv_path):
+        print(f"⚠️ {name}: {csv_path} not found, skipping")
+        return
+
+    fieldnames, rows = _read_csv(csv_path)
+    if column not in fieldnames:
+        raise SystemExit(f"[FATAL] {csv_path} has no '{column}' column")
+
+    entries_before = len(table.entries)
+    for lineno, row in enumerate(rows, start=2):
+        doc = _decode(row[column])
+        if doc is None:
+            continue
+        normalized = table.normalize(doc)
+        if table.rehydrate(normalized) != doc:
+            raise SystemExit(f"[FATAL] {csv_path} line {lineno}: normalized breakdown does not round-trip")
+        row[column] = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"))
+
+    output_path = normalized_path_for(csv_path)
+    _write_csv(output_path, fieldnames, rows, _newline(csv_path))
+    print(f"🗜️ {name}: {os.path.getsize(csv_path):,} -> {os.path.getsize(output_path):,} bytes "
+          f"({len(table.entries) - entries_before} new entries) -> {output_path}")
+
+
+def rehydrate_target(name, table):
+    target = TARGETS[name]
+    csv_path = target["csv"]
+    column = target["column"]
+    normalized_path = normalized_path_for(csv_path)
+    if not os.path.exists(normalized_path):
+        print(f"⚠️ {name}: {normalized_path} not found, skipping")
+        return
+
+    fieldnames, rows = _read_csv(normalized_path)
+    for row in rows:
+        doc = _decode(row[column])
+        if doc is not None:
+            row[column] = json.dumps(table.rehydrate(doc), ensure_ascii=False)
+
+    _write_csv(csv_path, fieldnames, rows, _newline(normalized_path))
+    print(f"✅ {name}: rebuilt {csv_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize breakdown CSVs into a shared entry table, or rebuild them")
+    parser.add_argument("command", choices=["normalize", "rehydrate"])
+    parser.add_argument("targets", nargs="+", choices=[*TARGETS, "all"])
+    parser.add_argument("--table", default=DEFAULT_TABLE_PATH, help="entry table (default: %(default)s)")
+    args = parser.parse_args()
+
+    table = EntryTable.load(args.table)
+    names = list(TARGETS) if "all" in args.targets else args.targets
+    for name in names:
+        if args.command == "normalize":
+            normalize_target(name, table)
+        else:
+            rehydrate_target(name, table)
+
+    if args.command == "normalize" and table.entries:
+        table.save()
+        print(f"📚 {len(table.entries):,} entries, {len(table.components):,} components "
+              f"({os.path.getsize(table.path):,} bytes) in {table.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+openai_standin.py
+
+A local, OpenAI-compatible HTTP stand-in for offline benchmarks and load tests
+of the preprocessing pipeline. It serves POST /v1/chat/completions in two modes:
+
+    record  forwards every request to the real API, stores the response and
+            returns it unchanged
+    replay  answers from the stored responses, with configurable latency,
+            error rate and 429 (rate limit) responses
+
+Requests are matched by the same content hash the response cache uses, so a
+recorded run replays byte for byte. Streaming requests (stream=true) are
+answered as server-sent events built from the stored completion.
+
+Usage:
+    python flashcard_preprocessing/ai_processing/openai_standin.py record  [--store recordings.jsonl]
+    python flashcard_preprocessing/ai_processing/openai_standin.py replay  [--store recordings.jsonl] \
+        [--latency lognormal:800,0.4] [--error-rate 0.01] [--rate-limit-rate 0.05] [--on-miss stub]
+
+Point the scripts at it with (in .env or the environment):
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    LLM_CACHE=0          # otherwise the local response cache answers first
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.llm_cache import make_key
+
+DEFAULT_STORE = os.path.join(PROJECT_ROOT, ".cache", "openai_recordings.jsonl")
+UPSTREAM_URL = "https://api.openai.com/v1"
+
+# Request fields that don't change the completion itself
+_TRANSPORT_FIELDS = ("stream", "stream_options")
+
+
+def request_key(body: dict) -> str:
+    return make_key({k: v for k, v in body.items() if k not in _TRANSPORT_FIELDS})
+
+
+def error_body(message, err_type, code=None) -> dict:
+    """An error in the shape the OpenAI API sends, so the client raises the usual exception."""
+    return {"error": {"message": message, "type": err_type, "code": code}}
+
+
+def parse_latency(spec: str):
+    """
+    Returns a function giving one latency sample in seconds:
+        fixed:MS
+        uniform:LO_MS,HI_MS
+        lognormal:MEDIAN_MS,SIGMA
+    """
+    kind, _, values = spec.partition(":")
+    nums = [float(v) for v in values.split(",") if v]
+    if kind == "fixed":
+        return lambda: nums[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(nums[0], nums[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(nums[0])
+        return lambda: random.lognormvariate(mu, nums[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class RecordingStore:
+    """Append-only JSONL store of {key, request, response} records."""
+
+    def __init__(self, path):
+        self.path = path
+        self.responses = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["key"]] = record["response"]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get(self, key):
+        return self.responses.get(key)
+
+    def put(self, key, request, response):
+        with self.lock:
+            self.responses[key] = response
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "request": request, "response": response}, ensure_ascii=False) + "\n")
+
+
+def stub_response(body: dict) -> dict:
+    """Synthetic completion for replay misses with --on-miss stub."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    content = "{}" if body.get("response_format") else "(stand-in response)"
+    return {
+        "id": f"chatcmpl-standin-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stand-in"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_chars // 2, "completion_tokens": 5, "total_tokens": prompt_chars // 2 + 5},
+    }
+
+
+def make_handler(args, store):
+    sample_latency = parse_latency(args.latency)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *log_args):
+            if args.verbose:
+                super().log_message(fmt, *log_args)
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status, message, err_type, headers=None):
+            self._send_json(status, error_body(message, err_type), headers)
+
+        def _send_stream(self, response):
+            """Replays a stored completion as server-sent events."""
+            content = response["choices"][0]["message"]["content"] or ""
+            base = {"id": response.get("id"), "object": "chat.completion.chunk",
+                    "created": response.get("created"), "model": response.get("model")}
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def emit(payload):
+                data = f"data: {payload}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            step = max(1, args.stream_chunk_chars)
+            for i in range(0, len(content), step):
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}])
+                emit(json.dumps(chunk, ensure_ascii=False))
+                if args.stream_chunk_delay_ms:
+                    time.sleep(args.stream_chunk_delay_ms / 1000)
+            final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=response.get("usage"))
+            emit(json.dumps(final, ensure_ascii=False))
+            emit("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _forward(self, body):
+            """
+            Record mode: send the request (non-streaming) to the real API.
+            Returns (status, JSON body, headers to pass on). An unreachable or
+            timed-out upstream, or an answer that isn't JSON, becomes a 502
+            in the API's error shape (a non-JSON 4xx keeps its status).
+            """
+            upstream_body = {k: v for k, v in body.items() if k not in _TRANSPORT_FIELDS}
+            req = urllib.request.Request(
+                f"{args.upstream.rstrip('/')}/chat/completions",
+                data=json.dumps(upstream_body).encode("utf-8"),
+                headers={"Content-Type": "application/json",
+                         "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"},
+                method="POST",
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=600) as resp:
+                    raw = resp.read()
+                return 200, json.loads(raw), {}
+            except urllib.error.HTTPError as e:
+                headers = {name: e.headers[name] for name in ("Retry-After", "retry-after-ms")
+                           if e.headers and e.headers.get(name)}
+                raw = e.read()
+                try:
+                    return e.code, json.loads(raw or b"{}"), headers
+                except ValueError:
+                    text = raw[:200].decode("utf-8", "replace").strip()
+                    status = e.code if 400 <= e.code < 500 else 502
+                    return status, error_body(f"Upstream returned HTTP {e.code}: {text}", "upstream_error",
+                                              str(e.code)), headers
+            except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+                # URLError and socket timeouts are OSErrors; HTTPException covers dropped connections
+                reason = getattr(e, "reason", None) or e
+                return 502, error_body(f"Upstream unreachable: {type(reason).__name__}: {reason}",
+                                       "upstream_error"), {}
+            except ValueError:
+                text = raw[:200].decode("utf-8", "replace").strip()
+                return 502, error_body(f"Upstream answered with non-JSON: {text}", "upstream_error"), {}
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_error(404, f"Unknown endpoint {self.path}", "invalid_request_error")
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            key = request_key(body)
+
+            if args.mode == "record":
+                response = store.get(key)
+                if response is None:
+                    status, response, headers = self._forward(body)
+                    if status != 200:
+                        self._send_json(status, response, headers)
+                        return
+                    store.put(key, body, response)
+            else:
+                time.sleep(sample_latency())
+                roll = random.random()
+                if roll < args.rate_limit_rate:
+                    self._send_error(429, "Rate limit reached (stand-in)", "requests",
+                                     {"Retry-After": str(args.retry_after)})
+                    return
+                if roll < args.rate_limit_rate + args.error_rate:
+                    self._send_error(500, "Internal server error (stand-in)", "server_error")
+                    return
+                response = store.get(key)
+                if response is None:
+                    if args.on_miss == "stub":
+                        response = stub_response(body)
+                    else:
+                        self._send_error(404, f"No recording for request {key[:12]}", "invalid_request_error")
+                        return
+
+            if body.get("stream"):
+                self._send_stream(response)
+            else:
+                self._send_json(200, response)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local record/replay stand-in for the OpenAI chat API")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store", default=DEFAULT_STORE, help="recordings JSONL file")
+    parser.add_argument("--upstream", default=UPSTREAM_URL, help="real API base URL (record mode)")
+    parser.add_argument("--latency", default="fixed:0",
+                        help="replay latency: fixed:MS | uniform:LO,HI | lognormal:MEDIAN_MS,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of replayed requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of replayed requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--on-miss", choices=["error", "stub"], default="error",
+                        help="replay answer for requests without a recording")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="characters per streamed chunk")
+    parser.add_argument("--stream-chunk-delay-ms", type=float, default=0.0, help="delay between streamed chunks")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    store = RecordingStore(args.store)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args, store))
+    server.daemon_threads = True
+    print(f"🎛  OpenAI stand-in ({args.mode}) on http://{args.host}:{args.port}/v1 "
+          f"with {len(store.responses)} recorded responses")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
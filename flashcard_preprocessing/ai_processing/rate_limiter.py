@@ -0,0 +1,250 @@
+"""
+Adaptive rate limiting for chat completion requests.
+
+Every request sent by `llm_executor.chat_completion` goes through one
+RateLimiter per run, which combines:
+
+    - token buckets for requests-per-minute and tokens-per-minute
+    - AIMD concurrency: the in-flight limit grows by one per "window" of
+      successes and halves on every 429; Retry-After pauses all senders
+    - exponential backoff with full jitter between retries
+    - a circuit breaker that opens after too many consecutive failed
+      requests and stops the run (CircuitOpenError) instead of letting
+      every remaining row fail
+
+Configuration (.env or environment):
+    OPENAI_RPM                requests per minute (default 500)
+    OPENAI_TPM                tokens per minute (default 200000)
+    OPENAI_MAX_RETRIES        retries per request (default 6)
+    OPENAI_BREAKER_THRESHOLD  consecutive failed requests before the run stops (default 5)
+"""
+import asyncio
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_RPM = int(os.getenv("OPENAI_RPM", "500"))
+DEFAULT_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+DEFAULT_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+DEFAULT_BREAKER_THRESHOLD = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5"))
+
+# How many seconds of quota a bucket may hold (burst size)
+BURST_SECONDS = 10
+
+
+def _openai():
+    """openai, imported on the first request rather than with this module."""
+    import openai
+    return openai
+
+
+def retryable_errors() -> tuple:
+    """Errors worth retrying: throttling, timeouts, dropped connections, 5xx."""
+    openai = _openai()
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.InternalServerError,
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised once the API keeps failing; the run should stop and keep what it has."""
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(error):
+    """Reads Retry-After (or retry-after-ms) from an API error, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def estimate_tokens(params):
+    """
+    Rough upper estimate of what a request counts against the TPM limit:
+    prompt characters (Japanese-heavy, so ~1 token per 2 chars) plus max_tokens.
+    """
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in params.get("messages", []))
+    return prompt_chars // 2 + (params.get("max_tokens") or 1000)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        # The lock keeps waiters in FIFO order, so big requests aren't starved
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta):
+        """Charges (or refunds, if negative) the difference to an earlier estimate."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight requests, with a shared Retry-After pause."""
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.pause_until = 0.0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            while self.in_flight >= int(self.limit):
+                await self.condition.wait()
+            self.in_flight += 1
+        delay = self.pause_until - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:  # cancelled while paused: give the slot back
+                await self.release()
+                raise
+
+    async def release(self):
+        # counted before taking the lock, so a second cancellation can't leak the slot
+        self.in_flight -= 1
+        async with self.condition:
+            self.condition.notify_all()
+
+    def on_success(self):
+        # additive increase: +1 after about `limit` successes
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self, retry_after=None):
+        # multiplicative decrease, and hold everyone back for Retry-After
+        self.limit = max(self.min_limit, self.limit / 2)
+        if retry_after:
+            self.pause_until = max(self.pause_until, time.monotonic() + retry_after)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed requests and stays open for the run."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.failures = 0
+        self.open = False
+        self.last_error = None
+
+    def check(self):
+        if self.open:
+            raise CircuitOpenError(
+                f"Stopped after {self.failures} consecutive failed API requests "
+                f"(last error: {self.last_error})"
+            )
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.failures >= self.threshold:
+            self.open = True
+
+
+class RateLimiter:
+    """Runs requests under RPM/TPM buckets, AIMD concurrency, retries and a circuit breaker."""
+
+    def __init__(self, max_concurrency, rpm=None, tpm=None, max_retries=None, breaker_threshold=None):
+        self.requests = TokenBucket(rpm or DEFAULT_RPM)
+        self.tokens = TokenBucket(tpm or DEFAULT_TPM)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        self.breaker = CircuitBreaker(breaker_threshold or DEFAULT_BREAKER_THRESHOLD)
+
+    async def call(self, send, estimated_tokens, on_error=None, hold_slot=False):
+        """
+        Awaits `send()` (one API request) under the limits, retrying
+        retryable errors with backoff. `on_error(exc)` is called for every
+        failed attempt (e.g. for telemetry). Returns the response, or raises
+        the last error / CircuitOpenError.
+
+        With hold_slot=True the concurrency slot stays taken after a
+        successful send(), e.g. while a streamed answer is still being read;
+        the caller must give it back with `release_slot()`.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check()
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            await self.concurrency.acquire()
+            held = False
+            error = None
+            try:
+                response = await send()
+                held = hold_slot
+            except Exception as e:
+                error = e
+            finally:
+                # also when the job is cancelled mid-request, or the slot leaks
+                if not held:
+                    await self.concurrency.release()
+
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                if not isinstance(error, retryable_errors()):
+                    # Not retryable (bad request, auth, ...); still counts towards the breaker
+                    self.breaker.record_failure(error)
+                    raise error
+                retry_after = retry_after_seconds(error)
+                if isinstance(error, _openai().RateLimitError):
+                    self.concurrency.on_throttle(retry_after)
+                if attempt == self.max_retries:
+                    self.breaker.record_failure(error)
+                    raise error
+                await asyncio.sleep(max(retry_after or 0, backoff_delay(attempt)))
+                continue
+
+            self.concurrency.on_success()
+            self.breaker.record_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.tokens.adjust(usage.total_tokens - estimated_tokens)
+            return response
+
+    async def release_slot(self):
+        """Gives back the concurrency slot kept by `call(..., hold_slot=True)`."""
+        await self.concurrency.release()
@@ -0,0 +1,248 @@
+"""
+Append-only record log with an in-memory offset index.
+
+A RecordLog replaces "load the whole output CSV, add rows, rewrite it" for a
+generation run that fills one row per key. Each finished row is appended as
+one JSON line and fsync'd, so it is durable the moment it is written; a later
+record for the same key supersedes the earlier one. Reads go through an
+in-memory {key: (offset, status)} index, so looking up a row is one seek and
+one line decode, and checking whether a key is done needs no I/O at all.
+
+The index is saved next to the log (`<log>.idx`) together with the log size
+it covers. On open only the records appended after that point are scanned,
+so resuming a run costs O(new rows) rather than O(corpus); a missing or
+mismatched index is rebuilt with one full scan. A torn last line (the
+process died mid-write) is cut off before anything new is appended.
+
+`remove(key)` appends a tombstone, so the key is gone from the index after
+any later open. `compact()` writes the latest record of every key to a CSV
+(atomically) and rewrites the log without the superseded and removed records.
+
+    log = RecordLog("practice_preprocessing/fill_gap_breakdown.log.jsonl")
+    if ("12", "私は＿＿＿です") not in log: ...
+    log.append(("12", "私は＿＿＿です"), row, status="good")
+    log.compact("practice_preprocessing/fill_gap_breakdown.csv", fieldnames)
+"""
+import csv
+import json
+import os
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+
+class RecordLog:
+    """Append-only, fsync'd log of {key, status, row} records, indexed by key."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.index_path = f"{self.path}.idx"
+        self.index = {}  # key tuple -> (byte offset, status)
+        self.meta = {}   # free-form, saved with the index
+        self.records = 0  # lines in the log, superseded ones included
+        self._file = None
+        self._reader = None
+        self._open()
+
+    # ─── opening ─────────────────────────────────────────────────────────────
+
+    def _open(self):
+        size = self._truncate_torn_tail()
+        start = self._load_index(size)
+        if start < size:
+            self._scan(start)
+            self.save_index()
+
+    def _truncate_torn_tail(self) -> int:
+        """Drops a half-written last line; returns the log size."""
+        if not os.path.exists(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return 0
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return size
+            # walk back to the last complete line
+            end = size
+            while end > 0:
+                step = min(4096, end)
+                f.seek(end - step)
+                chunk = f.read(step)
+                cut = chunk.rfind(b"\n")
+                if cut != -1:
+                    end = end - step + cut + 1
+                    break
+                end -= step
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        return end
+
+    def _load_index(self, size) -> int:
+        """Loads the saved index if it still matches the log; returns where scanning must start."""
+        if not os.path.exists(self.index_path):
+            return 0
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        indexed = data.get("size", 0)
+        if indexed > size:  # the log was replaced or cut short behind our back
+            return 0
+        self.index = {tuple(key): (offset, status) for key, offset, status in data.get("entries", [])}
+        self.meta = data.get("meta", {})
+        self.records = data.get("records", len(self.index))
+        return indexed
+
+    def _scan(self, start):
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    offset += len(line)
+                    continue
+                if record.get("removed"):
+                    self.index.pop(tuple(record["key"]), None)
+                else:
+                    self.index[tuple(record["key"])] = (offset, record.get("status"))
+                self.records += 1
+                offset += len(line)
+
+    def _size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def save_index(self):
+        """Saves the index and `meta`; a crash after this only costs a scan of later records."""
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "size": self._size(),
+                    "records": self.records,
+                    "meta": self.meta,
+                    "entries": [[list(key), offset, status] for key, (offset, status) in self.index.items()],
+                }, f, ensure_ascii=False, separators=(",", ":"))
+
+        atomic_write(self.index_path, write)
+
+    # ─── reads ───────────────────────────────────────────────────────────────
+
+    def __contains__(self, key) -> bool:
+        return tuple(key) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self):
+        """Keys in the order they were first written."""
+        return self.index.keys()
+
+    def status(self, key):
+        """Status of the latest record for `key` (no I/O), or None."""
+        entry = self.index.get(tuple(key))
+        return entry[1] if entry else None
+
+    def get(self, key):
+        """The latest row for `key` (one seek, one line), or None."""
+        entry = self.index.get(tuple(key))
+        if entry is None:
+            return None
+        if self._file is not None:
+            self._file.flush()
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(entry[0])
+        return json.loads(self._reader.readline())["row"]
+
+    def rows(self):
+        """Yields the latest row of every key, in first-written order."""
+        for key in list(self.index):
+            yield self.get(key)
+
+    # ─── writes ──────────────────────────────────────────────────────────────
+
+    def _write(self, record) -> int:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        offset = self._file.tell()
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records += 1
+        return offset
+
+    def append(self, key, row, status=None):
+        """Durably records one row; it supersedes any earlier row for the same key."""
+        offset = self._write({"key": list(key), "status": status, "row": row})
+        key = tuple(key)
+        # a rewritten key keeps its place in the output order
+        self.index[key] = (offset, status)
+
+    def remove(self, key):
+        """Durably drops `key` (a no-op if it is not in the log)."""
+        key = tuple(key)
+        if key in self.index:
+            self._write({"key": list(key), "removed": True})
+            del self.index[key]
+
+    def close(self):
+        """Closes the files and saves the index, so the next open scans nothing."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self.records:
+            self.save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── compaction ──────────────────────────────────────────────────────────
+
+    def compact(self, csv_path=None, fieldnames=None):
+        """
+        Writes the latest row of every key to `csv_path` (if given) and
+        rewrites the log without superseded records. Returns the row count.
+        """
+        rows = list(self.rows())
+        self.close()
+
+        if csv_path is not None:
+            fieldnames = fieldnames or (list(rows[0]) if rows else [])
+
+            def write_csv(tmp_path):
+                with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                    writer.writeheader()
+                    writer.writerows(rows)
+
+            atomic_write(str(csv_path), write_csv)
+
+        if self.records > len(self.index):
+            # until the new index is saved, a crash must fall back to a full scan
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            index = {}
+
+            def write_log(tmp_path):
+                with open(tmp_path, "wb") as f:
+                    for (key, (_, status)), row in zip(self.index.items(), rows):
+                        index[key] = (f.tell(), status)
+                        f.write((json.dumps({"key": list(key), "status": status, "row": row},
+                                            ensure_ascii=False) + "\n").encode("utf-8"))
+
+            atomic_write(self.path, write_log)
+            self.index = index
+            self.records = len(index)
+            self.save_index()
+        return len(rows)
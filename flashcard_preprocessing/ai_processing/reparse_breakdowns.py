@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+reparse_breakdowns.py
+
+Rebuilds the breakdown column of a breakdown CSV from its raw response
+archive (see response_archive.py) with the current parser. No API calls are
+made; the parsing runs in a process pool across all cores, so a parser fix
+reaches the whole corpus in seconds.
+
+Usage (from the project root):
+    python flashcard_preprocessing/ai_processing/reparse_breakdowns.py fill-gap
+    python flashcard_preprocessing/ai_processing/reparse_breakdowns.py n5-vocab n5-grammar --workers 8
+    python flashcard_preprocessing/ai_processing/reparse_breakdowns.py all --dry-run
+
+Rows without an archived answer are left as they are.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+from flashcard_preprocessing.ai_processing.response_archive import archive_path_for, latest_responses
+
+
+def _n5_key(position, row):
+    sentence = row["Example Sentence JP"] if "Example Sentence JP" in row else row.get("sentence")
+    return (str(position), str(sentence))
+
+
+# CSV, breakdown column and archive key (same as the generating script uses) per target
+TARGETS = {
+    "fill-gap": {
+        "csv": "practice_preprocessing/fill_gap_breakdown.csv",
+        "column": "analysis_json",
+        "key": lambda position, row: (row["flashcard_id"].strip(), row["sentence"]),
+    },
+    "n5-vocab": {
+        "csv": "flashcard_preprocessing/N5_Vocab/N5_Vocab_List_with_Example_Sentences_and_Breakdowns.csv",
+        "column": "breakdown",
+        "key": _n5_key,
+    },
+    "n5-grammar": {
+        "csv": "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences_and_Breakdowns.csv",
+        "column": "breakdown",
+        "key": _n5_key,
+    },
+}
+
+
+def _rebuild_chunk(chunk):
+    """Worker: [(analysis_text, repairs), ...] -> [breakdown JSON string, ...]"""
+    from flashcard_preprocessing.ai_processing.generate_breakdowns import rebuild_breakdown
+    return [json.dumps(rebuild_breakdown(analysis, repairs), ensure_ascii=False) for analysis, repairs in chunk]
+
+
+def rebuild_all(entries, workers=None):
+    """Runs rebuild_breakdown over [(analysis_text, repairs), ...] in a process pool, keeping order."""
+    if not entries:
+        return []
+    workers = workers or os.cpu_count() or 1
+    size = max(1, len(entries) // (workers * 8))
+    chunks = [entries[i:i + size] for i in range(0, len(entries), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [value for chunk in pool.map(_rebuild_chunk, chunks) for value in chunk]
+
+
+def _newline(path):
+    """Keeps the line ending the CSV was written with (csv module: \\r\\n, pandas: \\n)."""
+    with open(path, "rb") as f:
+        return "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+
+
+def reparse_target(name, workers=None, dry_run=False):
+    target = TARGETS[name]
+    csv_path = target["csv"]
+    column = target["column"]
+    if not os.path.exists(csv_path):
+        print(f"⚠️ {name}: {csv_path} not found, skipping")
+        return
+
+    archive = latest_responses(archive_path_for(csv_path))
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    if column not in fieldnames:
+        raise SystemExit(f"[FATAL] {csv_path} has no '{column}' column")
+
+    positions = []
+    entries = []
+    for position, row in enumerate(rows):
+        archived = archive.get(target["key"](position, row))
+        if archived is not None:
+            positions.append(position)
+            entries.append((archived["analysis"], archived["repairs"]))
+
+    started = time.perf_counter()
+    values = rebuild_all(entries, workers)
+    elapsed = time.perf_counter() - started
+
+    changed = 0
+    for position, value in zip(positions, values):
+        if rows[position][column] != value:
+            rows[position][column] = value
+            changed += 1
+
+    print(f"🔁 {name}: re-parsed {len(entries)} of {len(rows)} rows in {elapsed:.2f}s "
+          f"({changed} changed, {len(rows) - len(entries)} without an archived answer)")
+    if dry_run or not changed:
+        return
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator=_newline(csv_path))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    atomic_write(csv_path, write)
+    print(f"✅ Updated {csv_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild breakdown columns from the raw response archives")
+    parser.add_argument("targets", nargs="+", choices=[*TARGETS, "all"])
+    parser.add_argument("--workers", type=int, help="parser processes (default: all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    names = list(TARGETS) if "all" in args.targets else args.targets
+    for name in names:
+        reparse_target(name, workers=args.workers, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
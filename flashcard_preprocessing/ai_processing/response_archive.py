@@ -0,0 +1,121 @@
+"""
+Compressed, append-only archive of raw completions.
+
+The breakdown scripts store every raw answer they receive, keyed by
+(flashcard id, sentence), next to their output CSV. A parser fix can then be
+rolled out with reparse_breakdowns.py without paying for new completions.
+
+Records are JSON lines:
+    {"key": [id, sentence], "kind": "analysis" | "repair", "ts": ..., "response": "...", ...}
+
+They are written in batches, each batch as one independent compressed frame
+appended to the file (gzip members, or zstd frames for a ".zst" path when the
+`zstandard` package is installed), so the archive never has to be rewritten
+and a crash can at most lose the last, unflushed batch.
+"""
+import gzip
+import io
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip archives work without it
+    zstandard = None
+
+# Records buffered before a compressed frame is written
+FLUSH_EVERY = 64
+
+# What a torn (half-written) last frame raises while reading
+_TORN_FRAME_ERRORS = (EOFError, OSError, json.JSONDecodeError) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def archive_path_for(csv_path) -> str:
+    """'.../fill_gap_breakdown.csv' -> '.../fill_gap_breakdown.responses.jsonl.gz'"""
+    root, _ = os.path.splitext(str(csv_path))
+    return f"{root}.responses.jsonl.gz"
+
+
+def _is_zstd(path) -> bool:
+    if not str(path).endswith(".zst"):
+        return False
+    if zstandard is None:
+        raise RuntimeError(f"{path}: reading/writing .zst archives needs the 'zstandard' package")
+    return True
+
+
+class ResponseArchive:
+    """Appends raw completions to a compressed JSONL archive."""
+
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = str(path)
+        self.flush_every = flush_every
+        self.buffer = []
+        self.zstd = _is_zstd(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def append(self, key, kind, response, **extra):
+        """Stores one raw completion; `key` is (flashcard id, sentence)."""
+        if response is None:
+            return
+        record = {"key": [str(k) for k in key], "kind": kind, "ts": time.time(), "response": response}
+        record.update(extra)
+        self.buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = ("\n".join(self.buffer) + "\n").encode("utf-8")
+        if self.zstd:
+            frame = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            frame = gzip.compress(data, compresslevel=6, mtime=0)
+        with open(self.path, "ab") as f:
+            f.write(frame)
+            f.flush()
+            os.fsync(f.fileno())
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def iter_archive(path):
+    """
+    Yields the archive's records in the order they were written. A torn
+    last frame (the process died mid-write) is ignored.
+    """
+    path = str(path)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as raw:
+        if _is_zstd(path):
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = gzip.GzipFile(fileobj=raw)
+        lines = io.TextIOWrapper(stream, encoding="utf-8")
+        try:
+            for line in lines:
+                if not line.endswith("\n"):
+                    break
+                yield json.loads(line)
+        except _TORN_FRAME_ERRORS:
+            return
+
+
+def latest_responses(path) -> dict:
+    """
+    Returns {(id, sentence): {"analysis": str, "repairs": [(response, missing), ...]}}
+    with the newest analysis per key and the repairs made after it.
+    """
+    latest = {}
+    for record in iter_archive(path):
+        key = tuple(record["key"])
+        if record["kind"] == "analysis":
+            latest[key] = {"analysis": record["response"], "repairs": []}
+        elif record["kind"] == "repair" and key in latest:
+            latest[key]["repairs"].append((record["response"], record.get("missing", [])))
+    return latest
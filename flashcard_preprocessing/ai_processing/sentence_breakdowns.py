@@ -0,0 +1,165 @@
+"""
+Example sentence breakdowns for the N5 vocab and grammar lists.
+
+n5_vocab_sentence_breakdown.py and n5_grammar_sentence_breakdown.py only
+differ in their file paths and artifact-store entity; the row jobs, the
+journal checkpoint/restore of `process_csv` and the store variant all live
+here, so the two lists are always processed the same way.
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from flashcard_preprocessing.ai_processing.generate_breakdowns import analyze_japanese_sentence_async, parse_analysis_response
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, run_jobs
+from flashcard_preprocessing.ai_processing.checkpoint import RowJournal, atomic_write
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.response_archive import ResponseArchive, archive_path_for
+from flashcard_preprocessing.ai_processing.breakdown_model import Breakdown
+from flashcard_preprocessing.ai_processing.artifact_store import ArtifactStore
+
+async def breakdown_row(item, archive=None):
+    """
+    Analyzes one (index, sentence, translation, structured, retry) item and
+    returns the breakdown JSON string. The raw answer is stored in `archive`,
+    keyed by (row index, sentence). `retry` marks a row whose earlier
+    breakdown was invalid; it bypasses the response cache.
+    """
+    index, sentence, translation, structured, retry = item
+    print(f"Processing row {index}: {sentence}")
+
+    # Generate analysis (this sends the sentence to the OpenAI API)
+    analysis_response = await analyze_japanese_sentence_async(sentence, translation, structured,
+                                                              use_cache=not retry)
+    if archive is not None:
+        archive.append((index, sentence), "analysis", analysis_response)
+    if analysis_response:
+        # Parse the API response into a structured JSON object
+        parse_start = time.perf_counter()
+        parsed_breakdown = parse_analysis_response(analysis_response)
+        report_parse(bool(parsed_breakdown.get("vocabulary")), (time.perf_counter() - parse_start) * 1000)
+    else:
+        parsed_breakdown = {"error": "No analysis generated."}
+
+    # Convert the parsed breakdown dict to a JSON string to store in one CSV cell.
+    return json.dumps(parsed_breakdown, ensure_ascii=False)
+
+def has_valid_breakdown(breakdown_json) -> bool:
+    """True if a stored breakdown parsed into at least one vocabulary entry."""
+    breakdown = Breakdown(breakdown_json)
+    return breakdown.has_vocabulary and not breakdown.has_section("error")
+
+def process_csv(input_csv: str, output_csv: str, concurrency: int = None, structured: bool = None):
+    """
+    structured=True requests schema-constrained JSON answers instead of
+    markdown (defaults to the BREAKDOWN_OUTPUT_MODE setting).
+
+    Every finished row is checkpointed to '<output_csv>.journal', so a rerun
+    after a crash skips rows that already have a valid breakdown. The journal
+    is removed once the final CSV has been written. Raw answers are archived
+    next to the output (see reparse_breakdowns.py).
+    """
+    # Read the CSV file into a pandas DataFrame.
+    # The CSV is expected to have columns like: sentence, translation (at least)
+    df = pd.read_csv(input_csv)
+
+    journal = RowJournal(f"{output_csv}.journal")
+    done = journal.load()
+    breakdowns = [None] * len(df)
+
+    # Collect one job per row that has no valid checkpointed breakdown yet.
+    items = []
+    positions = []
+    for position, (index, row) in enumerate(df.iterrows()):
+        sentence = row['Example Sentence JP'] if 'Example Sentence JP' in row else row.get('sentence')
+        translation = row['Example Sentence EN'] if 'Example Sentence EN' in row else row.get('translation')
+        # If your CSV columns differ from "sentence" and "translation", adjust accordingly.
+
+        checkpoint = done.get(str(index))
+        retry = bool(checkpoint) and checkpoint[0] == str(sentence)
+        if retry and has_valid_breakdown(checkpoint[1]):
+            breakdowns[position] = checkpoint[1]
+            continue
+        items.append((index, sentence, translation, structured, retry))
+        positions.append(position)
+
+    if done:
+        print(f"Resuming: {len(df) - len(items)} of {len(df)} rows restored from '{journal.path}'.")
+
+    def checkpoint_row(i, breakdown):
+        index, sentence = items[i][0], items[i][1]
+        journal.append(str(index), str(sentence), breakdown)
+
+    # Run the remaining rows through the shared executor; results come back in row order.
+    archive = ResponseArchive(archive_path_for(output_csv))
+    try:
+        results = run_jobs(items, lambda item: breakdown_row(item, archive),
+                           concurrency=concurrency, on_result=checkpoint_row)
+    except CircuitOpenError as e:
+        raise SystemExit(f"[FATAL] {e}. Finished rows are kept in '{journal.path}'; rerun to resume.")
+    finally:
+        journal.close()
+        archive.close()
+    for position, breakdown in zip(positions, results):
+        breakdowns[position] = breakdown
+    df['breakdown'] = breakdowns
+
+    # Save the updated DataFrame back to CSV (atomically), then drop the journal.
+    atomic_write(output_csv, lambda tmp_path: df.to_csv(tmp_path, index=False))
+    journal.remove()
+    print(f"Processing complete. Updated CSV saved to '{output_csv}'.")
+
+def process_store(entity, archive_csv, concurrency: int = None, structured: bool = None, store_path=None):
+    """
+    Artifact-store version of `process_csv`: reads only the example sentence
+    columns and the breakdowns, sends only rows without a valid breakdown,
+    and writes each finished breakdown to the store as soon as it arrives
+    (so the store itself is the checkpoint). Raw answers go to the same
+    archive as the CSV run writing `archive_csv`.
+    """
+    store = ArtifactStore(store_path)
+    archive = ResponseArchive(archive_path_for(archive_csv))
+    try:
+        rows = store.read(entity, ["Example Sentence JP", "Example Sentence EN", "breakdown"])
+        items = [
+            (row["row_id"], row["Example Sentence JP"], row["Example Sentence EN"], structured,
+             bool(row["breakdown"]))
+            for row in rows
+            if row["Example Sentence JP"] and not has_valid_breakdown(row["breakdown"])
+        ]
+        if not items:
+            print(f"✅ Every {entity} row already has a valid breakdown.")
+            return
+        print(f"{len(items)} of {len(rows)} {entity} rows need a breakdown.")
+
+        store.add_column(entity, "breakdown", after="Example Sentence EN")
+
+        def save_row(i, breakdown):
+            store.update(entity, "breakdown", {items[i][0]: breakdown})
+
+        try:
+            run_jobs(items, lambda item: breakdown_row(item, archive),
+                     concurrency=concurrency, on_result=save_row)
+        except CircuitOpenError as e:
+            raise SystemExit(f"[FATAL] {e}. Finished rows are saved in the store; rerun to resume.")
+    finally:
+        archive.close()
+        store.close()
+    print(f"Processing complete. Breakdowns saved to the artifact store ('{entity}').")
+
+def main(input_csv, output_csv, entity, argv=None):
+    """Command line of the per-list scripts."""
+    parser = argparse.ArgumentParser(description="Generate sentence breakdowns")
+    parser.add_argument("--store", action="store_true",
+                        help=f"work on the '{entity}' entity of the artifact store instead of the CSV files")
+    parser.add_argument("--structured", action="store_true",
+                        help="request schema-constrained JSON answers instead of markdown "
+                             "(default: BREAKDOWN_OUTPUT_MODE)")
+    args = parser.parse_args(argv)
+    structured = True if args.structured else None
+    if args.store:
+        process_store(entity, output_csv, structured=structured)
+    else:
+        process_csv(input_csv, output_csv, structured=structured)
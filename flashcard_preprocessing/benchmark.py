@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the CPU-bound (local, no API) preprocessing stages.
+
+Stages:
+    parse        generate_breakdowns.parse_analysis_response over markdown answers
+    validate     check_all_fill_gap_valid.validate
+    duplicates   check_duplicates.py
+    near-dups    check_near_duplicates.py (MinHash/LSH)
+    readings     insert_question_reading.py (needs pykakasi)
+    filter       filter_lessons.filter_and_write_by_lesson
+    split        lesson_division.split_all_lessons
+    rules        validate_fill_gaps.validate, every rule plus --fix (fill-gap and breakdown files)
+
+Dataset sizes:
+    n5    recorded: fill_gap_questions.csv + flashcards_n5.csv, the three
+          lesson_selection CSVs and the N5 vocab breakdowns
+    n3    synthetic: the N5-N3 words of jlpt_vocab.csv (~3.5k), 3 fill-gap rows each
+    full  synthetic: every word of jlpt_vocab.csv (8k+), 4 fill-gap rows each (30k+)
+
+The synthetic sets reuse the recorded questions, breakdowns and lesson
+columns with the jlpt_vocab words swapped in, so rows have realistic widths.
+Markdown answers for `parse` are rendered from the recorded breakdowns.
+
+For each stage the best of --repeat runs is reported, plus the peak
+Python heap (tracemalloc) of one extra run. `--save-baseline` records the
+results; later runs fail (exit 1) when a stage is slower than the baseline
+by more than --time-tolerance or uses more memory than --memory-tolerance
+allows. The baseline is machine-specific and lives in .cache/ by default.
+
+Usage (from the project root):
+    python -m flashcard_preprocessing benchmark --save-baseline
+    python -m flashcard_preprocessing benchmark
+    python -m flashcard_preprocessing benchmark --sizes n5 full --stages parse validate --repeat 5
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+DEFAULT_BASELINE_PATH = os.path.join(PROJECT_ROOT, ".cache", "benchmark_baseline.json")
+
+FP = os.path.join(PROJECT_ROOT, "flashcard_preprocessing")
+PP = os.path.join(PROJECT_ROOT, "practice_preprocessing")
+LESSONS = os.path.join(FP, "lesson_selection")
+
+JLPT_VOCAB = os.path.join(FP, "jlpt_vocab.csv")
+RECORDED_FLASHCARDS = os.path.join(PP, "flashcards_n5.csv")
+RECORDED_FILL_GAPS = os.path.join(PP, "fill_gap_questions.csv")
+RECORDED_BREAKDOWNS = os.path.join(FP, "N5_Vocab", "N5_Vocab_List_with_Example_Sentences_and_Breakdowns.csv")
+RECORDED_LESSONS = [
+    (os.path.join(LESSONS, "N5_Vocab_List_with_Example_Sentences_and_Breakdowns_and_Lessons.csv"), "Vocab"),
+    (os.path.join(LESSONS, "N5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lessons.csv"), "Grammar"),
+    (os.path.join(LESSONS, "N5_Kanji_List_and_Lessons.csv"), "Kanji"),
+]
+
+# synthetic sizes: (JLPT levels taken from jlpt_vocab.csv, fill-gap rows per word)
+SIZES = {
+    "n5": None,
+    "n3": ({"N5", "N4", "N3"}, 3),
+    "full": ({"N5", "N4", "N3", "N2", "N1"}, 4),
+}
+NUM_LESSONS = 22
+STAGES = ["parse", "validate", "duplicates", "near-dups", "readings", "filter", "split", "rules"]
+
+
+def _read_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _write_csv(path, rows, fieldnames=None):
+    fieldnames = fieldnames or list(rows[0])
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# ─── markdown answers ───────────────────────────────────────────────────────
+
+def render_markdown(doc, sentence="", english="") -> str:
+    """Renders a parsed breakdown back into the markdown format the model answers in."""
+    lines = [f"**Sentence**: {sentence}", f"**Translation**: {english}", "", "---", "",
+             "### 1. Vocabulary Breakdown", ""]
+    for entry in doc.get("vocabulary", []):
+        lines.append(f"- **{entry.get('word', '')} ({entry.get('reading', '')})**: "
+                     f"“{entry.get('meaning', '') or '-'}” - [{entry.get('role', '')}]")
+        if entry.get("components"):
+            lines.append("- **Component Breakdown**:")
+            for comp in entry["components"]:
+                lines.append(f"    - **{comp.get('part', '')} ({comp.get('reading', '')})**: "
+                             f"“{comp.get('meaning', '') or '-'}” - [{comp.get('contribution', '')}].")
+        if entry.get("combined_explanation"):
+            lines += ["- **Contribution to Overall Meaning**:", f"    {entry['combined_explanation']}"]
+        lines.append("")
+
+    grammar = doc.get("grammar", {})
+    lines += ["---", "", "### 2. Grammar Explanation", "",
+              "1. **Context (1-2 sentences)**", grammar.get("context", ""), "", "2. **Steps**"]
+    lines += [f"- {step}" for step in grammar.get("steps", [])]
+    lines += ["", "3. **Sentence Pattern**:", f"- {grammar.get('sentence_pattern', '')}",
+              f"- **Kanji**: {grammar.get('sentence_pattern_kanji', '')}",
+              f"- **Hiragana**: {grammar.get('sentence_pattern_hiragana', '')}",
+              f"- **English Translation**: {grammar.get('sentence_pattern_english', '')}", ""]
+
+    tips = doc.get("tips", {})
+    alternative = tips.get("alternative_expression", {})
+    lines += ["---", "", "### 3. Beginner Tips & Common Pitfalls", "",
+              f"- **Tip**: {tips.get('tip', '')}",
+              f"- **Common Mistake**: {tips.get('common_mistake', '')}", "",
+              "- **Alternative Expression**:",
+              f"- **Kanji**: {alternative.get('kanji', '')}",
+              f"- **Hiragana**: {alternative.get('hiragana', '')}",
+              f"- **English**: {alternative.get('english', '')}", "",
+              "- **New Words in Alternative Expression**:"]
+    for word in tips.get("new_words_in_alternative", []):
+        lines.append(f"- **{word.get('word', '')} ({word.get('reading', '')})**: "
+                     f"“{word.get('meaning', '') or '-'}” - [{word.get('description', '')}]")
+    return "\n".join(lines) + "\n"
+
+
+# ─── datasets ───────────────────────────────────────────────────────────────
+
+class Dataset:
+    """The input files of every stage for one size, written to a temp directory."""
+
+    def __init__(self, size, root):
+        self.size = size
+        self.root = root
+        self.flashcards = os.path.join(root, "flashcards.csv")
+        self.fill_gaps = os.path.join(root, "fill_gap_questions.csv")
+        self.breakdown_csv = os.path.join(root, "practice_preprocessing", "fill_gap_breakdown.csv")
+        self.lessons_dir = os.path.join(root, "lessons")
+        self.answers = []
+        self.lesson_rows = []
+
+    def describe(self) -> str:
+        with open(self.fill_gaps, encoding="utf-8") as f:
+            gaps = sum(1 for _ in f) - 1
+        with open(self.flashcards, encoding="utf-8") as f:
+            cards = sum(1 for _ in f) - 1
+        return (f"{cards:,} flashcards, {gaps:,} fill-gap rows, {len(self.answers):,} answers, "
+                f"{len(self.lesson_rows):,} lesson rows")
+
+
+def build_dataset(size, root) -> Dataset:
+    data = Dataset(size, root)
+    os.makedirs(os.path.dirname(data.breakdown_csv), exist_ok=True)
+    rng = random.Random(size)
+
+    breakdown_rows = [row for row in _read_csv(RECORDED_BREAKDOWNS) if row.get("breakdown", "").startswith("{")]
+    docs = [json.loads(row["breakdown"]) for row in breakdown_rows]
+    recorded_gaps = _read_csv(RECORDED_FILL_GAPS)
+
+    if SIZES[size] is None:
+        flashcards = _read_csv(RECORDED_FLASHCARDS)
+        fill_gaps = recorded_gaps
+        answer_count = len(docs)
+        from flashcard_preprocessing.lesson_selection.filter_lessons import combine_rows
+        data.lesson_rows = combine_rows(RECORDED_LESSONS)
+    else:
+        levels, per_word = SIZES[size]
+        words = [row for row in _read_csv(JLPT_VOCAB) if row.get("JLPT Level") in levels]
+        flashcards = [
+            {"flashcard_id": f"{size}-{i:05d}", "word": row["Original"], "meaning": row["English"],
+             "word_type": "", "example_sentence": ""}
+            for i, row in enumerate(words)
+        ]
+        fill_gaps = []
+        for card in flashcards:
+            for template in rng.sample(recorded_gaps, per_word):
+                fill_gaps.append({"flashcard_id": card["flashcard_id"], "question": template["question"],
+                                  "answer": card["word"], "english": template["english"]})
+        # a few repeated questions, like the real file has
+        for row in rng.sample(fill_gaps, len(fill_gaps) // 100):
+            fill_gaps.append(dict(row))
+        answer_count = len(words)
+        columns = list(breakdown_rows[0])
+        data.lesson_rows = []
+        for i, row in enumerate(words):
+            source = breakdown_rows[i % len(breakdown_rows)]
+            lesson_row = {column: source[column] for column in columns}
+            lesson_row.update({"JLPT": row["JLPT Level"], "Word": row["Original"], "Reading": row["Furigana"],
+                               "Meaning": row["English"], "Lesson": str(i % NUM_LESSONS + 1), "Source": "Vocab"})
+            data.lesson_rows.append(lesson_row)
+
+    _write_csv(data.flashcards, flashcards)
+    _write_csv(data.fill_gaps, fill_gaps, ["flashcard_id", "question", "answer", "english"])
+    _write_csv(data.breakdown_csv, [
+        {**row, "sentence": row["question"].replace("____", row["answer"]),
+         "analysis_json": breakdown_rows[i % len(breakdown_rows)]["breakdown"]}
+        for i, row in enumerate(fill_gaps)
+    ], ["flashcard_id", "question", "answer", "sentence", "english", "analysis_json"])
+
+    data.answers = [
+        render_markdown(docs[i % len(docs)], breakdown_rows[i % len(breakdown_rows)]["Example Sentence JP"],
+                        breakdown_rows[i % len(breakdown_rows)]["Example Sentence EN"])
+        for i in range(answer_count)
+    ]
+    return data
+
+
+# ─── stages ─────────────────────────────────────────────────────────────────
+
+def _run_script(path, args=(), cwd=None):
+    old_argv, old_cwd = sys.argv, os.getcwd()
+    sys.argv = [path, *args]
+    try:
+        if cwd:
+            os.chdir(cwd)
+        runpy.run_path(path, run_name="__main__")
+    finally:
+        sys.argv = old_argv
+        os.chdir(old_cwd)
+
+
+def stage_runner(stage, data):
+    """
+    Returns a zero-argument callable that runs `stage` on `data` (imports
+    happen here, outside the timing). Raises ImportError for a missing
+    optional dependency.
+    """
+    if stage == "parse":
+        from flashcard_preprocessing.ai_processing.generate_breakdowns import parse_analysis_response
+        return lambda: [parse_analysis_response(text) for text in data.answers]
+    if stage == "validate":
+        from practice_preprocessing.check_all_fill_gap_valid import validate
+        report = os.path.join(data.root, "fill_gap_report.csv")
+        return lambda: validate(data.flashcards, data.fill_gaps, report)
+    if stage == "duplicates":
+        report = os.path.join(data.root, "dup_report.csv")
+        return lambda: _run_script(os.path.join(PP, "check_duplicates.py"), [data.fill_gaps, "-o", report])
+    if stage == "near-dups":
+        report = os.path.join(data.root, "near_dup_report.csv")
+        return lambda: _run_script(os.path.join(PP, "check_near_duplicates.py"), [data.fill_gaps, "-o", report])
+    if stage == "readings":
+        import pykakasi  # noqa: F401  (only checks that it is installed)
+        return lambda: _run_script(os.path.join(PP, "insert_question_reading.py"), cwd=data.root)
+    if stage == "filter":
+        from flashcard_preprocessing.lesson_selection.filter_lessons import filter_and_write_by_lesson
+        return lambda: filter_and_write_by_lesson(data.lesson_rows, data.lessons_dir, num_lessons=NUM_LESSONS)
+    if stage == "split":
+        from flashcard_preprocessing.lesson_selection.filter_lessons import filter_and_write_by_lesson
+        from flashcard_preprocessing.lesson_selection.lesson_division import split_all_lessons
+        with contextlib.redirect_stdout(io.StringIO()):
+            filter_and_write_by_lesson(data.lesson_rows, data.lessons_dir, num_lessons=NUM_LESSONS)
+
+        def split():
+            random.seed(0)
+            split_all_lessons(data.lessons_dir)
+        return split
+    if stage == "rules":
+        from practice_preprocessing.validate_fill_gaps import validate as validate_rules
+        fixed = os.path.join(data.root, "fill_gap_questions_fixed.csv")
+        return lambda: validate_rules(data.flashcards, data.fill_gaps, data.breakdown_csv, fix=True, output_path=fixed)
+    raise ValueError(f"unknown stage '{stage}'")
+
+
+def measure(run, repeat):
+    """(best wall time in seconds, peak traced memory in bytes); the stage's output is swallowed."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+
+# ─── baseline ───────────────────────────────────────────────────────────────
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    baseline = load_baseline(path)
+    baseline.update(results)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+
+    atomic_write(path, write)
+
+
+def check_regressions(results, baseline, time_tolerance, memory_tolerance):
+    """[(key, message)] for every stage that got slower or bigger than allowed."""
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + time_tolerance):
+            failures.append((key, f"{result['seconds']:.3f}s vs baseline {base['seconds']:.3f}s"))
+        if result["peak_mb"] > base["peak_mb"] * (1 + memory_tolerance):
+            failures.append((key, f"{result['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB"))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local preprocessing stages")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (default: %(default)s)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="record these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="allowed slowdown over the baseline, as a fraction (default: %(default)s)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2,
+                        help="allowed peak memory growth over the baseline, as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    print(f"{'size':<6}{'stage':<12}{'time':>10}{'peak':>11}{'vs baseline':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f"benchmark-{size}-") as root:
+            data = build_dataset(size, root)
+            print(f"── {size}: {data.describe()}")
+            for stage in args.stages:
+                try:
+                    run = stage_runner(stage, data)
+                except ImportError as e:
+                    print(f"{size:<6}{stage:<12}{'skipped':>10}   ({e.name or e} not installed)")
+                    continue
+                seconds, peak = measure(run, args.repeat)
+                key = f"{size}/{stage}"
+                results[key] = {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2)}
+                base = baseline.get(key)
+                ratio = f"{seconds / base['seconds']:.2f}x" if base and base["seconds"] else "-"
+                print(f"{size:<6}{stage:<12}{seconds:>9.3f}s{peak / 2**20:>8.1f} MB{ratio:>14}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\n💾 Baseline saved to: {args.baseline}")
+        return
+
+    failures = check_regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if failures:
+        print("\n❌ Regressions:")
+        for key, message in failures:
+            print(f"   {key}: {message}")
+        raise SystemExit(1)
+    print("\n✅ No regressions" if baseline else "\nℹ️ No baseline yet; run with --save-baseline to record one")
+
+
+if __name__ == "__main__":
+    main()
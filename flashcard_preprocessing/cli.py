@@ -0,0 +1,88 @@
+"""
+One entry point for the preprocessing scripts:
+
+    python -m flashcard_preprocessing <command> [args...]
+    python -m practice_preprocessing <command> [args...]
+
+Run without a command (or with -h) to list the commands. Each command is one
+of the existing scripts, run as if it had been started directly: argv is
+passed through and the script's folder is put first on sys.path. Nothing is
+imported until a command is picked, so a cheap check such as
+`missing-breakdowns` or `check-duplicates` never pays for openai, pandas,
+boto3 or psycopg2.
+"""
+import os
+import runpy
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# command -> (script relative to the project root, one-line description)
+COMMANDS = {
+    "flashcard_preprocessing": {
+        "pipeline": ("flashcard_preprocessing/pipeline.py", "run the stages whose inputs changed"),
+        "vocab-list": ("flashcard_preprocessing/N5_Vocab/N5_vocab_list.py", "extract the N5 vocab list"),
+        "grammar-list": ("flashcard_preprocessing/N5_Grammar/N5_grammar_list.py", "extract the N5 grammar list"),
+        "examples": ("flashcard_preprocessing/ai_processing/create_example_sentence.py",
+                     "generate example sentences"),
+        "vocab-breakdowns": ("flashcard_preprocessing/N5_Vocab/n5_vocab_sentence_breakdown.py",
+                             "generate vocab example breakdowns"),
+        "grammar-breakdowns": ("flashcard_preprocessing/N5_Grammar/n5_grammar_sentence_breakdown.py",
+                               "generate grammar example breakdowns"),
+        "lessons": ("flashcard_preprocessing/lesson_selection/lesson_creation.py", "assign items to lessons"),
+        "filter-lessons": ("flashcard_preprocessing/lesson_selection/filter_lessons.py",
+                           "keep the N5 rows of the lesson CSVs"),
+        "divide-lessons": ("flashcard_preprocessing/lesson_selection/lesson_division.py",
+                           "split the lessons into per-lesson files"),
+        "vocab-audio": ("flashcard_preprocessing/N5_Vocab/audio_creation.py", "synthesize vocab audio (Polly)"),
+        "grammar-audio": ("flashcard_preprocessing/N5_Grammar/audio_creation.py", "synthesize grammar audio (Polly)"),
+        "kanji-audio": ("flashcard_preprocessing/N5_Kanji/audio_creation.py", "synthesize kanji audio (Polly)"),
+        "reparse": ("flashcard_preprocessing/ai_processing/reparse_breakdowns.py",
+                    "rebuild breakdowns from the response archives"),
+        "normalize": ("flashcard_preprocessing/ai_processing/normalize_breakdowns.py",
+                      "normalize/rehydrate breakdown CSVs"),
+        "store": ("flashcard_preprocessing/ai_processing/artifact_store.py", "import/export the artifact store"),
+        "standin": ("flashcard_preprocessing/ai_processing/openai_standin.py", "local OpenAI stand-in server"),
+        "benchmark": ("flashcard_preprocessing/benchmark.py", "time the local stages at N5/N3/full size"),
+        "integrity": ("flashcard_preprocessing/integrity_check.py",
+                      "check flashcards, practice CSVs and audio agree (deploy gate)"),
+    },
+    "practice_preprocessing": {
+        "extract-flashcards": ("practice_preprocessing/extract_flashcards.py", "export flashcards from the database"),
+        "fill-gap": ("practice_preprocessing/generate_fill_gap.py", "top up fill-gap questions to 3 per card"),
+        "validate": ("practice_preprocessing/validate_fill_gaps.py", "run every fill-gap rule in one pass (--fix)"),
+        "check-fill-gap": ("practice_preprocessing/check_all_fill_gap_valid.py", "validate fill-gap questions"),
+        "check-duplicates": ("practice_preprocessing/check_duplicates.py", "find duplicate fill-gap questions"),
+        "near-duplicates": ("practice_preprocessing/check_near_duplicates.py",
+                            "find near-duplicate fill-gap questions (MinHash/LSH)"),
+        "fix-answers": ("practice_preprocessing/fix_answer_in_fill_gap.py", "fix fill-gap answer mismatches"),
+        "breakdowns": ("practice_preprocessing/create_breakdown_csv.py", "generate fill-gap breakdowns"),
+        "missing-breakdowns": ("practice_preprocessing/missing_breakdowns_check.py", "list empty breakdowns"),
+        "readings": ("practice_preprocessing/insert_question_reading.py", "add hiragana readings"),
+    },
+}
+
+
+def print_commands(package):
+    print(f"usage: python -m {package} <command> [args...]\n\ncommands:")
+    width = max(len(name) for name in COMMANDS[package])
+    for name, (_, description) in COMMANDS[package].items():
+        print(f"  {name:<{width}}  {description}")
+
+
+def main(package, argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = COMMANDS[package]
+    if not argv or argv[0] in ("-h", "--help"):
+        print_commands(package)
+        return
+    name, args = argv[0], argv[1:]
+    if name not in commands:
+        print_commands(package)
+        raise SystemExit(f"\n[FATAL] unknown command '{name}'")
+
+    script = os.path.join(PROJECT_ROOT, commands[name][0])
+    # the same environment the script gets when started directly
+    sys.argv = [script, *args]
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name="__main__")
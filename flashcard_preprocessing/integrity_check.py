@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+integrity_check.py
+
+Checks that the whole artifact chain agrees, for every level that has
+artifacts in the tree (N5 today):
+
+    <level>_Vocab / <level>_Grammar lists ──> audio/{words,examples}/{female,male}/<word>[_example].mp3
+    <level>_Kanji list (example words)    ──> audio/words/{female,male}/<kanji>_example_<i>.mp3
+    flashcards_<level>.csv (flashcard_id, word)
+        ├─> the vocab/grammar item of that word (and so its audio)
+        └─> fill_gap_questions.csv rows ──> fill_gap_breakdown.csv row
+                                        └─> fill_gap_with_readings.csv row
+
+The graph is built in memory from one read of every CSV and one directory
+listing per audio folder. Every audio file found is then probed in a thread
+pool (stat, size, MP3 header), since that is thousands of small reads.
+
+Findings are either gaps (something the chain expects is missing, empty or
+inconsistent) or orphans (an artifact nothing points to). The JSON report
+lists both; the exit code is 1 when there are gaps (or orphans, with
+--strict), so the check can gate a deploy.
+
+Usage (from the project root):
+    python flashcard_preprocessing/integrity_check.py
+    python flashcard_preprocessing/integrity_check.py -o integrity_report.json --strict
+    python -m flashcard_preprocessing integrity --levels N5 --workers 32
+"""
+import argparse
+import collections
+import csv
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+FP = "flashcard_preprocessing"
+PP = "practice_preprocessing"
+PUBLIC = "frontend/public"
+
+# per kind: the list the audio is generated from (see <level>_<Kind>/audio_creation.py)
+SOURCE_LISTS = {
+    "Vocab": "{level}_Vocab/{level}_Vocab_List_with_Example_Sentences_and_Breakdowns.csv",
+    "Grammar": "{level}_Grammar/{level}_Grammar_List_with_Example_Sentences_and_Breakdowns.csv",
+    "Kanji": "{level}_Kanji/{level}_Kanji_List.csv",
+}
+
+# practice artifacts; only N5 has them so far
+PRACTICE_FILES = {
+    "N5": {
+        "flashcards": f"{PP}/flashcards_n5.csv",
+        "fillgaps": f"{PP}/fill_gap_questions.csv",
+        "breakdowns": f"{PP}/fill_gap_breakdown.csv",
+        "readings": f"{PP}/fill_gap_with_readings.csv",
+    },
+}
+
+GENDERS = ("female", "male")
+MIN_AUDIO_BYTES = 1024  # the shortest real clip (one kana) is ~2 KB
+DEFAULT_REPORT = os.path.join(PROJECT_ROOT, ".cache", "integrity_report.json")
+
+Finding = collections.namedtuple("Finding", "kind check level subject detail")
+
+
+def sanitize_filename(filename: str) -> str:
+    """Same as audio_creation.sanitize_filename (not imported: that module needs pandas)."""
+    return re.sub(r'[\\/*?:"<>|]', '_', filename)
+
+
+def nfc(text: str) -> str:
+    # file names come back decomposed on some filesystems (macOS)
+    return unicodedata.normalize("NFC", text)
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def discover_levels(root):
+    """Levels with a <level>_<Kind> folder under flashcard_preprocessing or frontend/public."""
+    levels = set()
+    for parent in (os.path.join(root, FP), os.path.join(root, PUBLIC)):
+        if os.path.isdir(parent):
+            for name in os.listdir(parent):
+                match = re.fullmatch(r"(N[1-5])_(Vocab|Grammar|Kanji)", name)
+                if match:
+                    levels.add(match.group(1))
+    return sorted(levels, reverse=True)  # N5 first
+
+
+################################################################################
+# Graph
+################################################################################
+
+class ArtifactGraph:
+    """
+    Everything the chain expects, built from the CSVs:
+
+        audio[(level, kind)]  {relative audio path: subject that expects it}
+        items[level]          {word: kind} for the vocab/grammar lists
+        cards[level]          {flashcard_id: word}
+        fillgaps[level]       {(flashcard_id, question): answer}
+        derived[level]        {"breakdowns"/"readings": {(flashcard_id, question): answer}}
+    """
+
+    def __init__(self, root, levels):
+        self.root = root
+        self.levels = levels
+        self.audio = {}
+        self.items = {}
+        self.cards = {}
+        self.fillgaps = {}
+        self.derived = {}
+        self.findings = []
+        self.counts = collections.Counter()
+
+    def gap(self, check, level, subject, detail=""):
+        self.findings.append(Finding("gap", check, level, subject, detail))
+
+    def orphan(self, check, level, subject, detail=""):
+        self.findings.append(Finding("orphan", check, level, subject, detail))
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def build(self):
+        for level in self.levels:
+            self.items[level] = {}
+            for kind in SOURCE_LISTS:
+                self._add_source_list(level, kind)
+            if level in PRACTICE_FILES:
+                self._add_practice(level, PRACTICE_FILES[level])
+        return self
+
+    def _add_source_list(self, level, kind):
+        relative = f"{FP}/" + SOURCE_LISTS[kind].format(level=level)
+        if not os.path.exists(self.path(relative)):
+            if os.path.isdir(self.path(f"{PUBLIC}/{level}_{kind}")):
+                self.gap("source-list-missing", level, relative, f"{level}_{kind} audio exists without its list")
+            return
+        expected = self.audio[(level, kind)] = {}
+        base = f"{PUBLIC}/{level}_{kind}/audio"
+        for row in read_csv(self.path(relative)):
+            if kind == "Kanji":
+                kanji = (row.get("Kanji") or "").strip()
+                examples = [ex for ex in (row.get("Example Words") or "").split(";") if ex.strip()]
+                for i in range(1, len(examples) + 1):
+                    for gender in GENDERS:
+                        expected[nfc(f"{base}/words/{gender}/{kanji}_example_{i}.mp3")] = kanji
+                continue
+            word = (row.get("Word") or "").strip()
+            if not word:
+                continue
+            self.items[level].setdefault(word, kind)
+            safe = sanitize_filename(word)
+            for gender in GENDERS:
+                expected[nfc(f"{base}/words/{gender}/{safe}.mp3")] = word
+                if (row.get("Example Sentence JP") or "").strip():
+                    expected[nfc(f"{base}/examples/{gender}/{safe}_example.mp3")] = word
+        self.counts["source_items"] += len(set(expected.values()))
+
+    def _add_practice(self, level, files):
+        if not os.path.exists(self.path(files["flashcards"])):
+            self.gap("file-missing", level, files["flashcards"])
+            return
+        cards = self.cards[level] = {}
+        for row in read_csv(self.path(files["flashcards"])):
+            fid = row["flashcard_id"].strip()
+            cards[fid] = row["word"].strip()
+            if cards[fid] not in self.items[level]:
+                self.gap("card-without-source-item", level, fid, f"word={cards[fid]} is in no vocab/grammar list")
+        self.counts["flashcards"] += len(cards)
+
+        fillgaps = self.fillgaps[level] = {}
+        if not os.path.exists(self.path(files["fillgaps"])):
+            self.gap("file-missing", level, files["fillgaps"])
+        else:
+            for row in read_csv(self.path(files["fillgaps"])):
+                fillgaps[(row["flashcard_id"].strip(), row["question"].strip())] = row["answer"].strip()
+            self.counts["fill_gap_rows"] += len(fillgaps)
+
+        self.derived[level] = {}
+        for name in ("breakdowns", "readings"):
+            if not os.path.exists(self.path(files[name])):
+                self.gap("file-missing", level, files[name])
+                continue
+            rows = self.derived[level][name] = {}
+            for row in read_csv(self.path(files[name])):
+                rows[(row["flashcard_id"].strip(), row["question"].strip())] = (row.get("answer") or "").strip()
+            self.counts[f"{name}_rows"] += len(rows)
+
+    ############################################################################
+    # Checks
+    ############################################################################
+
+    def check_practice(self):
+        for level, cards in self.cards.items():
+            fillgaps = self.fillgaps.get(level, {})
+            with_rows = {fid for fid, _ in fillgaps}
+            for fid in cards:
+                if fid not in with_rows:
+                    self.gap("card-without-fill-gaps", level, fid, f"word={cards[fid]}")
+            for fid in sorted(with_rows - set(cards)):
+                self.orphan("fill-gap-unknown-card", level, fid)
+
+            for name, rows in self.derived.get(level, {}).items():
+                for key, answer in fillgaps.items():
+                    if key not in rows:
+                        self.gap(f"fill-gap-without-{name[:-1]}", level, key[0], f"question={key[1]}")
+                    elif rows[key] != answer:
+                        self.gap(f"stale-{name[:-1]}", level, key[0],
+                                 f"question={key[1]} answer={rows[key]} fill-gap answer={answer}")
+                for key in rows.keys() - fillgaps.keys():
+                    self.orphan(f"{name[:-1]}-without-fill-gap", level, key[0], f"question={key[1]}")
+
+    def check_audio(self, workers):
+        """Lists every audio folder once, then probes the files found in a thread pool."""
+        found = set()
+        for level, kind in self.audio:
+            base = self.path(f"{PUBLIC}/{level}_{kind}/audio")
+            for sub in ("words", "examples"):
+                for gender in GENDERS:
+                    folder = os.path.join(base, sub, gender)
+                    if not os.path.isdir(folder):
+                        continue
+                    with os.scandir(folder) as entries:
+                        for entry in entries:
+                            if entry.name.endswith(".mp3"):
+                                found.add(nfc(f"{PUBLIC}/{level}_{kind}/audio/{sub}/{gender}/{entry.name}"))
+
+        expected = {}
+        for (level, _), paths in self.audio.items():
+            for relative, subject in paths.items():
+                expected[relative] = (level, subject)
+        self.counts["audio_expected"] = len(expected)
+        self.counts["audio_found"] = len(found)
+
+        for relative in sorted(expected.keys() - found):
+            level, subject = expected[relative]
+            self.gap("audio-missing", level, subject, relative)
+        for relative in sorted(found - expected.keys()):
+            self.orphan("audio-orphan", relative.split("/")[2].split("_")[0], relative)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for relative, problem in zip(sorted(found), pool.map(probe_audio, (self.path(p) for p in sorted(found)))):
+                if problem:
+                    level, subject = expected.get(relative, (relative.split("/")[2].split("_")[0], relative))
+                    self.gap("audio-invalid", level, subject, f"{relative}: {problem}")
+
+
+def probe_audio(path):
+    """None if the file looks like a usable MP3, else what is wrong with it."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(3)
+    except OSError as e:
+        return f"unreadable ({e.strerror})"
+    if size < MIN_AUDIO_BYTES:
+        return f"only {size} bytes"
+    # an ID3 tag, or straight into an MPEG frame (11 sync bits)
+    if head[:3] != b"ID3" and not (head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return f"not an MP3 (starts with {head.hex()})"
+    return None
+
+
+################################################################################
+# Report
+################################################################################
+
+def build_report(graph, elapsed):
+    summary = collections.Counter(f"{f.kind}:{f.check}" for f in graph.findings)
+
+    def listed(kind):
+        return [{"check": f.check, "level": f.level, "subject": f.subject, "detail": f.detail}
+                for f in graph.findings if f.kind == kind]
+
+    return {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "elapsed_seconds": round(elapsed, 3),
+        "levels": graph.levels,
+        "counts": dict(graph.counts),
+        "summary": dict(sorted(summary.items())),
+        "gaps": listed("gap"),
+        "orphans": listed("orphan"),
+    }
+
+
+def write_report(path, report):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    atomic_write(path, write)
+
+
+def check(root=PROJECT_ROOT, levels=None, workers=16):
+    """Builds the graph and runs every check; returns the report dict."""
+    start = time.perf_counter()
+    graph = ArtifactGraph(root, levels or discover_levels(root)).build()
+    graph.check_practice()
+    graph.check_audio(workers)
+    return build_report(graph, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that flashcards, practice CSVs and audio files agree")
+    parser.add_argument("--levels", nargs="+", help="levels to check (default: every level found)")
+    parser.add_argument("-o", "--output", default=DEFAULT_REPORT, help="JSON report (default: .cache/integrity_report.json)")
+    parser.add_argument("--workers", type=int, default=16, help="threads probing audio files (default: 16)")
+    parser.add_argument("--strict", action="store_true", help="fail on orphans too, not just gaps")
+    args = parser.parse_args()
+
+    report = check(PROJECT_ROOT, args.levels, args.workers)
+    write_report(args.output, report)
+
+    print("────────────────────────────────────────────────────────")
+    print(f"🔗  INTEGRITY CHECK ({', '.join(report['levels'])}) in {report['elapsed_seconds']:.2f}s")
+    print("────────────────────────────────────────────────────────")
+    for name, value in report["counts"].items():
+        print(f"{name + ':':<28}{value:>6}")
+    print("────────────────────────────────────────────────────────")
+    for name, value in report["summary"].items():
+        print(f"{'❌' if name.startswith('gap') else 'ℹ️ '} {name + ':':<40}{value:>6}")
+    if not report["summary"]:
+        print("✅ Everything is consistent.")
+    print(f"📝 Report written to: {args.output}")
+
+    if report["gaps"] or (args.strict and report["orphans"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
+import argparse
 import csv
+import json
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import sys
 
-# Load environment variables from .env file
-load_dotenv()
-# Initialize OpenAI client with API key from .env
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, chat_completion, run_jobs
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.artifact_store import ArtifactStore
 
 # Define lesson descriptions with clarifications to avoid overlap between spatial directions and commands:
 LESSON_DESCRIPTIONS = {
@@ -31,7 +37,7 @@ LESSON_SUMMARY_TEXT = "\n".join(
     f"Lesson {num}: {desc}" for num, desc in LESSON_DESCRIPTIONS.items()
 )
 
-def determine_lesson(item_text):
+async def determine_lesson(item_text):
     """
     Given an item description, returns the recommended lesson number (1-15).
     """
@@ -44,7 +50,7 @@ Here is a Japanese item: {item_text}
 Which lesson number (1 to 15) is the best fit for this item? 
 Return ONLY the lesson number (no extra words).
 """
-    response = client.chat.completions.create(
+    response = await chat_completion(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}],
         max_tokens=5,
@@ -53,19 +59,127 @@ Return ONLY the lesson number (no extra words).
     lesson_str = response.choices[0].message.content.strip()
     try:
         lesson_num = int(lesson_str)
+        report_parse(1 <= lesson_num <= 15)
         if 1 <= lesson_num <= 15:
             return lesson_num
         else:
             return 15  # fallback if out of range
     except Exception as e:
+        report_parse(False)
         print(f"Error parsing lesson number: {e}")
         return 15
 
-def classify_csv(input_csv, output_csv):
-    with open(input_csv, 'r', encoding='utf-8-sig', newline='') as fin, \
-         open(output_csv, 'w', encoding='utf-8', newline='') as fout:
+# How many items are classified per request, and how often a batch of
+# failed items is re-asked before falling back to one request per item.
+BATCH_SIZE = 50
+MAX_BATCH_RETRIES = 2
+
+def parse_lesson_list(content, expected_len):
+    """
+    Parses a {"lessons": [...]} reply. Returns a list with the lesson number
+    for each item, or None where the value is missing or out of range.
+    """
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return [None] * expected_len
+    lessons = data.get("lessons") if isinstance(data, dict) else data
+    if not isinstance(lessons, list) or len(lessons) != expected_len:
+        return [None] * expected_len
+
+    parsed = []
+    for value in lessons:
+        try:
+            lesson_num = int(value)
+        except (TypeError, ValueError):
+            lesson_num = None
+        parsed.append(lesson_num if lesson_num is not None and 1 <= lesson_num <= 15 else None)
+    return parsed
+
+async def determine_lessons(item_texts):
+    """
+    Classifies several items with one request per batch. The lesson list is
+    sent once, followed by the numbered items, and the model answers with a
+    JSON array of lesson numbers. Only items with a missing or invalid answer
+    are asked again; after MAX_BATCH_RETRIES they go through `determine_lesson`
+    one at a time.
+
+    Returns the lesson numbers (1-15) in the same order as `item_texts`;
+    an item whose single request failed too is left as None (unclassified),
+    so one bad item doesn't cost the rest of the batch.
+    """
+    results = [None] * len(item_texts)
+    pending = list(range(len(item_texts)))
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        if not pending:
+            break
+        numbered = "\n".join(f"{n}. {item_texts[i]}" for n, i in enumerate(pending, start=1))
+        prompt = f"""
+We have 15 lessons with the following themes:
+{LESSON_SUMMARY_TEXT}
+
+Here are {len(pending)} numbered Japanese items:
+{numbered}
 
+For each item, which lesson number (1 to 15) is the best fit?
+Return ONLY a JSON object of the form {{"lessons": [n1, n2, ...]}} with exactly
+{len(pending)} integers, in the same order as the items.
+"""
+        try:
+            response = await chat_completion(
+                use_cache=(attempt == 0),
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=8 * len(pending) + 20,
+                temperature=0.0,
+                response_format={"type": "json_object"},
+            )
+            answers = parse_lesson_list(response.choices[0].message.content, len(pending))
+            report_parse(None not in answers)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Error in batched lesson request: {e}")
+            answers = [None] * len(pending)
+
+        for i, lesson_num in zip(pending, answers):
+            results[i] = lesson_num
+        pending = [i for i in pending if results[i] is None]
+        if pending:
+            print(f"⚠️ {len(pending)} item(s) without a valid lesson (attempt {attempt + 1})")
+
+    for i in pending:
+        try:
+            results[i] = await determine_lesson(item_texts[i])
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Error in lesson request for '{item_texts[i]}': {e}")
+    return results
+
+def chunked(iterable, size):
+    """Yields lists of up to `size` consecutive items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def build_item_text(row):
+    """Build a description from the relevant columns: "Word", or if not available, "Kanji"."""
+    vocab = row.get("Word", "") or row.get("Kanji", "")
+    meaning = row.get("Meaning", "")
+    word_type = row.get("Word Type", "")
+    return f"{vocab} -> {meaning}. It's a {word_type}."
+
+def classify_csv(input_csv, output_csv, concurrency=None, batch_size=BATCH_SIZE):
+    with open(input_csv, 'r', encoding='utf-8-sig', newline='') as fin:
         reader = csv.DictReader(fin)
+        rows = list(reader)
         # Create new field order: insert "Lesson" right after "JLPT"
         fieldnames = []
         for field in reader.fieldnames:
@@ -74,23 +188,81 @@ def classify_csv(input_csv, output_csv):
                 fieldnames.append("Lesson")
         if "Lesson" not in fieldnames:
             fieldnames.append("Lesson")
-            
+
+    # Classify the rows in chunks of `batch_size` items per request;
+    # the chunks run through the shared executor and keep row order.
+    chunks = list(chunked(rows, batch_size))
+    try:
+        chunk_lessons = run_jobs(
+            [[build_item_text(row) for row in chunk] for chunk in chunks],
+            determine_lessons,
+            concurrency=concurrency,
+        )
+    except CircuitOpenError as e:
+        raise SystemExit(f"[FATAL] {e}. {output_csv} was not written.")
+
+    unclassified = 0
+    with open(output_csv, 'w', encoding='utf-8', newline='') as fout:
         writer = csv.DictWriter(fout, fieldnames=fieldnames)
         writer.writeheader()
+        for chunk, lesson_nums in zip(chunks, chunk_lessons):
+            for row, lesson_num in zip(chunk, lesson_nums):
+                # an item that couldn't be classified gets an empty Lesson
+                row["Lesson"] = lesson_num
+                unclassified += lesson_num is None
+                writer.writerow(row)
+    if unclassified:
+        print(f"⚠️ {unclassified} rows could not be classified and have an empty Lesson")
+
+def classify_store(entity, concurrency=None, batch_size=BATCH_SIZE, store_path=None):
+    """
+    Artifact-store version of `classify_csv`: reads only the columns the
+    item text is built from, and classifies only rows without a Lesson.
+    """
+    store = ArtifactStore(store_path)
+    try:
+        rows = store.read(entity, ["Word", "Kanji", "Meaning", "Word Type", "Lesson"])
+        todo = [row for row in rows if not (row["Lesson"] or "").strip()]
+        if not todo:
+            print(f"✅ Every {entity} row already has a lesson.")
+            return
+        for row in todo:
+            for column in ("Word", "Kanji", "Meaning", "Word Type"):
+                row[column] = row[column] or ""
+
+        chunks = list(chunked(todo, batch_size))
+        try:
+            chunk_lessons = run_jobs(
+                [[build_item_text(row) for row in chunk] for chunk in chunks],
+                determine_lessons,
+                concurrency=concurrency,
+            )
+        except CircuitOpenError as e:
+            raise SystemExit(f"[FATAL] {e}. The store was not changed.")
 
-        for row in reader:
-            # Build a description from the relevant columns:
-            # Try "Vocab", or if not available, "Grammar" or "Kanji"
-            vocab = row.get("Word", "") or row.get("Kanji", "")
-            meaning = row.get("Meaning", "")
-            word_type = row.get("Word Type", "")
-            item_text = f"{vocab} -> {meaning}. It's a {word_type}."
-            
-            lesson_num = determine_lesson(item_text)
-            row["Lesson"] = lesson_num
-            writer.writerow(row)
+        # unclassified rows are left without a Lesson, so the next run retries them
+        lessons = {
+            row["row_id"]: lesson_num
+            for chunk, lesson_nums in zip(chunks, chunk_lessons)
+            for row, lesson_num in zip(chunk, lesson_nums)
+            if lesson_num is not None
+        }
+        store.add_column(entity, "Lesson", after="JLPT")
+        store.update(entity, "Lesson", lessons)
+    finally:
+        store.close()
+    if len(lessons) < len(todo):
+        print(f"⚠️ {len(todo) - len(lessons)} rows could not be classified and were left unchanged")
+    print(f"✅ Classified {len(lessons)} {entity} rows in the artifact store.")
 
 if __name__ == "__main__":
-    input_csv = "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences_and_Breakdowns.csv"
-    output_csv = "flashcard_preprocessing/lesson_selection/5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lesson.csv"
-    classify_csv(input_csv, output_csv)
+    parser = argparse.ArgumentParser(description="Assign a lesson to every item")
+    parser.add_argument("--store", choices=["vocab", "grammar", "kanji"],
+                        help="work on this entity of the artifact store instead of the CSV files")
+    args = parser.parse_args()
+    if args.store:
+        classify_store(args.store)
+    else:
+        input_csv = "flashcard_preprocessing/N5_Grammar/N5_Grammar_List_with_Example_Sentences_and_Breakdowns.csv"
+        output_csv = "flashcard_preprocessing/lesson_selection/5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lesson.csv"
+        classify_csv(input_csv, output_csv)
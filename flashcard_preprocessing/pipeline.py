@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+
+Incremental runner for the flashcard preprocessing pipeline. The stages,
+their inputs and their outputs are declared in STAGES; the order follows from
+which stage produces which file:
+
+    vocab:   vocab-list -> vocab-examples -> vocab-breakdowns -> vocab-lessons -> lesson-files
+                                                             \\-> vocab-audio
+    grammar: grammar-list -> ... (same shape)
+    kanji:   kanji-lessons -> lesson-files, kanji-audio
+
+A stage runs only if the content hash of its inputs (or of its own code)
+changed since its last successful run; the hashes are kept in
+.cache/pipeline_state.json. When a rebuilt stage produces byte-identical
+outputs, the stages after it stay up to date. Independent branches (vocab /
+grammar / kanji) run in parallel, each stage in its own process, with its
+output in .cache/pipeline_logs/<stage>.log.
+
+Rebuilding is cheap where it matters: the API stages go through the LLM
+response cache, so after editing one vocab row only the prompts that changed
+reach the API. Outputs edited by hand (with unchanged inputs) are kept, not
+overwritten, and their new content is passed on downstream.
+
+Usage (from the project root):
+    python flashcard_preprocessing/pipeline.py --adopt           # record the current files as built
+    python flashcard_preprocessing/pipeline.py --dry-run         # show what would run
+    python flashcard_preprocessing/pipeline.py                   # rebuild what is out of date
+    python flashcard_preprocessing/pipeline.py vocab-lessons --jobs 2
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+
+STATE_PATH = os.path.join(PROJECT_ROOT, ".cache", "pipeline_state.json")
+LOG_DIR = os.path.join(PROJECT_ROOT, ".cache", "pipeline_logs")
+
+FP = "flashcard_preprocessing"
+LESSONS = f"{FP}/lesson_selection"
+AI = f"{FP}/ai_processing"
+
+# Shared code of the API stages; a change here rebuilds them
+_LLM_CODE = [f"{AI}/llm_executor.py", f"{AI}/llm_cache.py", f"{AI}/rate_limiter.py"]
+_BREAKDOWN_CODE = _LLM_CODE + [f"{AI}/generate_breakdowns.py", f"{AI}/breakdown_parser.py",
+                                f"{AI}/sentence_breakdowns.py"]
+
+
+class Stage:
+    """
+    One pipeline step. `call` is (module, function, args) run in a fresh
+    interpreter, `script` a script path run as-is (for the scripts that do
+    their work at import time).
+    """
+
+    def __init__(self, name, inputs, outputs, call=None, script=None, code=()):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.call = call
+        self.script = script
+        self.code = [script] if script else []
+        if call and call[0] != "flashcard_preprocessing.pipeline":  # the runner's own helpers are thin wrappers
+            self.code.append(call[0].replace(".", "/") + ".py")
+        self.code += list(code)
+
+    def command(self):
+        if self.script:
+            return [sys.executable, self.script]
+        module, function, args = self.call
+        source = (f"import sys; sys.path.insert(0, {PROJECT_ROOT!r}); "
+                  f"from {module} import {function}; {function}(*{args!r})")
+        return [sys.executable, "-c", source]
+
+
+################################################################################
+# Stage helpers (run inside the stage process)
+################################################################################
+
+def classify_items(input_csv, output_csv, item_type):
+    """lesson_creation.classify_csv plus the "type" column the seed script reads."""
+    from flashcard_preprocessing.lesson_selection.lesson_creation import classify_csv
+
+    classify_csv(input_csv, output_csv)
+    with open(output_csv, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    if "type" not in fieldnames:
+        fieldnames.append("type")
+    for row in rows:
+        row["type"] = item_type
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+
+    atomic_write(output_csv, write)
+
+
+def build_lesson_files(vocab_csv, grammar_csv, kanji_csv, output_dir):
+    """filter_lessons followed by lesson_division on the same folder."""
+    from flashcard_preprocessing.lesson_selection.filter_lessons import combine_rows, filter_and_write_by_lesson
+    from flashcard_preprocessing.lesson_selection.lesson_division import split_all_lessons
+
+    rows = combine_rows([(vocab_csv, "Vocab"), (grammar_csv, "Grammar"), (kanji_csv, "Kanji")])
+    filter_and_write_by_lesson(rows, output_dir, num_lessons=15)
+    split_all_lessons(output_dir)
+
+
+################################################################################
+# The pipeline
+################################################################################
+
+def _level_stages(kind, folder, prefix, list_script, list_source):
+    """The list -> examples -> breakdowns -> lessons -> audio chain of vocab or grammar."""
+    base = f"{folder}/N5_{prefix}_List"
+    listed = f"{base}.csv"
+    examples = f"{base}_with_Example_Sentences.csv"
+    breakdowns = f"{base}_with_Example_Sentences_and_Breakdowns.csv"
+    lessons = {
+        "vocab": f"{LESSONS}/N5_Vocab_List_with_Example_Sentences_and_Breakdowns_and_Lessons.csv",
+        "grammar": f"{LESSONS}/N5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lessons.csv",
+    }[kind]
+    return [
+        Stage(f"{kind}-list", [list_source], [listed], script=list_script),
+        Stage(f"{kind}-examples", [listed], [examples], code=_LLM_CODE,
+              call=("flashcard_preprocessing.ai_processing.create_example_sentence", "process_flashcards",
+                    [listed, examples])),
+        Stage(f"{kind}-breakdowns", [examples], [breakdowns], code=_BREAKDOWN_CODE,
+              call=(f"{folder.replace('/', '.')}.n5_{kind}_sentence_breakdown", "process_csv",
+                    [examples, breakdowns])),
+        Stage(f"{kind}-lessons", [breakdowns], [lessons], code=_LLM_CODE + [f"{LESSONS}/lesson_creation.py"],
+              call=("flashcard_preprocessing.pipeline", "classify_items", [breakdowns, lessons, kind])),
+        Stage(f"{kind}-audio", [breakdowns], [f"{folder}/audio"], script=f"{folder}/audio_creation.py"),
+    ]
+
+
+STAGES = [
+    *_level_stages("vocab", f"{FP}/N5_Vocab", "Vocab", f"{FP}/N5_Vocab/N5_vocab_list.py",
+                   f"{FP}/N5_Vocab/N5_vocab_with_breakdowns.csv"),
+    *_level_stages("grammar", f"{FP}/N5_Grammar", "Grammar", f"{FP}/N5_Grammar/N5_grammar_list.py",
+                   f"{FP}/N5_Grammar/N5_grammar_with_breakdowns.csv"),
+    Stage("kanji-lessons", [f"{FP}/N5_Kanji/N5_Kanji_List.csv"], [f"{LESSONS}/N5_Kanji_List_and_Lessons.csv"],
+          code=_LLM_CODE + [f"{LESSONS}/lesson_creation.py"],
+          call=("flashcard_preprocessing.pipeline", "classify_items",
+                [f"{FP}/N5_Kanji/N5_Kanji_List.csv", f"{LESSONS}/N5_Kanji_List_and_Lessons.csv", "kanji"])),
+    Stage("kanji-audio", [f"{FP}/N5_Kanji/N5_Kanji_List.csv"], [f"{FP}/N5_Kanji/audio"],
+          script=f"{FP}/N5_Kanji/audio_creation.py"),
+    Stage("lesson-files",
+          [f"{LESSONS}/N5_Vocab_List_with_Example_Sentences_and_Breakdowns_and_Lessons.csv",
+           f"{LESSONS}/N5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lessons.csv",
+           f"{LESSONS}/N5_Kanji_List_and_Lessons.csv"],
+          [f"{LESSONS}/lessons"],
+          code=[f"{LESSONS}/filter_lessons.py", f"{LESSONS}/lesson_division.py"],
+          call=("flashcard_preprocessing.pipeline", "build_lesson_files",
+                [f"{LESSONS}/N5_Vocab_List_with_Example_Sentences_and_Breakdowns_and_Lessons.csv",
+                 f"{LESSONS}/N5_Grammar_List_with_Example_Sentences_and_Breakdown_and_Lessons.csv",
+                 f"{LESSONS}/N5_Kanji_List_and_Lessons.csv",
+                 f"{LESSONS}/lessons"])),
+]
+
+
+################################################################################
+# Hashing and state
+################################################################################
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_hash(path):
+    """Content hash of a file or (recursively) a folder; None if it doesn't exist."""
+    full = os.path.join(PROJECT_ROOT, path)
+    if os.path.isfile(full):
+        return _file_hash(full)
+    if not os.path.isdir(full):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(full):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, full).encode("utf-8"))
+            digest.update(_file_hash(file_path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def stage_key(stage):
+    """Hash of everything a stage's result depends on: its inputs, its code and its command."""
+    digest = hashlib.sha256(json.dumps(stage.command()[1:]).encode("utf-8"))
+    for path in stage.inputs + stage.code:
+        digest.update(f"{path}={path_hash(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    atomic_write(STATE_PATH, write)
+
+
+################################################################################
+# Scheduling
+################################################################################
+
+def dependencies(stages):
+    """{stage name: names of the stages producing one of its inputs}"""
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    return {
+        stage.name: {producers[path] for path in stage.inputs if path in producers and producers[path] != stage.name}
+        for stage in stages
+    }
+
+
+def select(stages, targets):
+    """The target stages plus everything upstream of them, in declaration order."""
+    if not targets:
+        return stages
+    deps = dependencies(stages)
+    wanted = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+def plan(stage, state):
+    """
+    Decides what to do with a stage whose upstream is finished:
+        ("skip", reason) | ("run", reason) | ("fail", reason)
+    """
+    missing_inputs = [path for path in stage.inputs if path_hash(path) is None]
+    outputs = {path: path_hash(path) for path in stage.outputs}
+    have_outputs = all(value is not None for value in outputs.values())
+    if missing_inputs:
+        if have_outputs:
+            return "skip", f"source {', '.join(missing_inputs)} not present; keeping existing outputs"
+        return "fail", f"missing input {', '.join(missing_inputs)}"
+
+    previous = state.get(stage.name)
+    if previous is None:
+        return "run", "never built"
+    if previous["key"] != stage_key(stage):
+        return "run", "inputs or code changed"
+    if not have_outputs:
+        return "run", "output missing"
+    if outputs != previous["outputs"]:
+        return "skip", "outputs edited by hand; keeping them"
+    return "skip", "up to date"
+
+
+def run_stage(stage):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(stage.command(), cwd=PROJECT_ROOT, stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, log_path
+
+
+def _record(state, stage):
+    state[stage.name] = {"key": stage_key(stage), "outputs": {path: path_hash(path) for path in stage.outputs}}
+
+
+def run_pipeline(targets=(), jobs=3, dry_run=False, force=False, adopt=False):
+    stages = select(STAGES, targets)
+    deps = dependencies(stages)
+    state = load_state()
+
+    if adopt:
+        for stage in stages:
+            if all(path_hash(path) is not None for path in stage.outputs):
+                _record(state, stage)
+                print(f"📌 {stage.name}: recorded as built")
+        save_state(state)
+        return True
+
+    by_name = {stage.name: stage for stage in stages}
+    forced = set(targets) or set(by_name)
+    done, failed = set(), set()
+    would_run = set()  # dry run: stages that would run, and what may follow them
+    running = {}
+    ok = True
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) + len(failed) < len(stages):
+            for stage in stages:
+                name = stage.name
+                if name in done or name in failed or name in running.values():
+                    continue
+                if deps[name] & failed:
+                    print(f"⏭️ {name}: skipped, an upstream stage failed")
+                    failed.add(name)
+                    continue
+                if not deps[name] <= done:
+                    continue
+                action, reason = plan(stage, state)
+                if force and name in forced and action == "skip" and not reason.startswith("source"):
+                    action, reason = "run", "forced"
+                if dry_run and action == "skip" and deps[name] & would_run:
+                    print(f"🔨 {name}: may run, if {', '.join(sorted(deps[name] & would_run))} changes its outputs")
+                    would_run.add(name)
+                    done.add(name)
+                    continue
+                if action == "skip":
+                    if reason == "outputs edited by hand; keeping them" and not dry_run:
+                        _record(state, stage)
+                        save_state(state)
+                    print(f"✅ {name}: {reason}")
+                    done.add(name)
+                elif action == "fail":
+                    print(f"❌ {name}: {reason}")
+                    failed.add(name)
+                    ok = False
+                elif dry_run:
+                    print(f"🔨 {name}: would run ({reason})")
+                    would_run.add(name)
+                    done.add(name)
+                else:
+                    print(f"🔨 {name}: running ({reason})")
+                    running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                returncode, log_path = future.result()
+                if returncode == 0:
+                    _record(state, by_name[name])
+                    save_state(state)
+                    print(f"✅ {name}: built (log: {log_path})")
+                    done.add(name)
+                else:
+                    print(f"❌ {name}: failed with exit code {returncode} (log: {log_path})")
+                    failed.add(name)
+                    ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the out-of-date stages of the flashcard pipeline")
+    parser.add_argument("targets", nargs="*",
+                        help="stages to bring up to date, with everything they depend on (default: all)")
+    parser.add_argument("--jobs", type=int, default=3, help="stages run in parallel (default: 3)")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would run")
+    parser.add_argument("--force", action="store_true", help="rerun the selected stages even if up to date")
+    parser.add_argument("--adopt", action="store_true",
+                        help="record the existing outputs as built without running anything")
+    args = parser.parse_args()
+    unknown = set(args.targets) - {stage.name for stage in STAGES}
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))} "
+                     f"(choose from {', '.join(stage.name for stage in STAGES)})")
+
+    if not run_pipeline(args.targets, jobs=args.jobs, dry_run=args.dry_run, force=args.force, adopt=args.adopt):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+check_near_duplicates.py
+
+Finds fill-gap questions that are near-twins rather than byte-identical:
+same sentence with different punctuation, width or kana, or with one noun or
+name swapped. Questions are compared after normalizing (blank stripped,
+NFKC, katakana -> hiragana, punctuation dropped) via MinHash signatures of
+character shingles and LSH banding, so only likely pairs are ever compared
+and a 30k+ question corpus takes seconds, not an n² scan.
+
+Each cluster is reported as same_id (one flashcard repeats itself: needs
+variety) or cross_id (different cards share a sentence frame).
+
+Usage:
+    python check_near_duplicates.py fill_gap_questions.csv [-o near_dup_report.csv]
+    python check_near_duplicates.py fill_gap_questions.csv --threshold 0.6 --bands 20 --rows 3
+"""
+
+import csv
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.near_duplicates import (
+    DEFAULT_BANDS, DEFAULT_ROWS, DEFAULT_SHINGLE, DEFAULT_THRESHOLD, cluster_similarity, find_clusters,
+)
+
+###############################################################################
+# CLI
+###############################################################################
+
+parser = argparse.ArgumentParser(description="Detect near-duplicate fill‑gap questions (MinHash/LSH)")
+parser.add_argument("fillgaps", help="fill_gap_questions.csv to analyse")
+parser.add_argument("-o", "--output", help="optional CSV report of the clusters")
+parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help=f"minimum shingle Jaccard similarity (default: {DEFAULT_THRESHOLD})")
+parser.add_argument("--shingle", type=int, default=DEFAULT_SHINGLE,
+                    help=f"characters per shingle (default: {DEFAULT_SHINGLE})")
+parser.add_argument("--bands", type=int, default=DEFAULT_BANDS, help=f"LSH bands (default: {DEFAULT_BANDS})")
+parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"hashes per band (default: {DEFAULT_ROWS})")
+args = parser.parse_args()
+
+fillgap_path = Path(args.fillgaps)
+if not fillgap_path.exists():
+    raise SystemExit(f"[FATAL] file not found: {fillgap_path}")
+
+###############################################################################
+# 1. Read file
+###############################################################################
+
+rows = []   # (line_no, flashcard_id, question)
+
+with fillgap_path.open(encoding="utf-8", newline="") as f:
+    reader = csv.DictReader(f)
+    required = {"flashcard_id", "question"}
+    if required - set(reader.fieldnames):
+        missing = ", ".join(required - set(reader.fieldnames))
+        raise SystemExit(f"[FATAL] CSV missing column(s): {missing}")
+
+    for idx, row in enumerate(reader, start=2):        # header = line 1
+        rows.append((idx, row["flashcard_id"].strip(), row["question"].strip()))
+
+###############################################################################
+# 2. Cluster and categorise
+###############################################################################
+
+start = time.perf_counter()
+clusters = find_clusters([q for _, _, q in rows], threshold=args.threshold, k=args.shingle,
+                         bands=args.bands, rows=args.rows)
+elapsed = time.perf_counter() - start
+
+same_id_clusters  = []   # list[list[(line, id, question)]] (all same id)
+cross_id_clusters = []   # ≥2 different ids
+
+for members in clusters:
+    group = [rows[i] for i in members]
+    if len({fid for _, fid, _ in group}) == 1:
+        same_id_clusters.append(group)
+    else:
+        cross_id_clusters.append(group)
+
+def is_exact(group):
+    return len({q for _, _, q in group}) == 1
+
+###############################################################################
+# 3. Print summary
+###############################################################################
+
+print("────────────────────────────────────────────────────────")
+print("🔍  NEAR-DUPLICATE QUESTION ANALYSIS")
+print("────────────────────────────────────────────────────────")
+print(f"Total rows checked:              {len(rows):>6}")
+print(f"Similarity threshold:            {args.threshold:>6.2f}")
+print(f"Clustering time:                 {elapsed:>5.2f}s")
+print()
+print(f"Clusters (any kind):             {len(clusters):>6}")
+print(f"  ↳ Same flashcard_id:           {len(same_id_clusters):>6}")
+print(f"  ↳ Across different ids:        {len(cross_id_clusters):>6}")
+print(f"  ↳ Not byte-identical:          {sum(not is_exact(g) for g in same_id_clusters + cross_id_clusters):>6}")
+print("────────────────────────────────────────────────────────")
+
+def show(group):
+    for line, fid, q in group[:4]:
+        print(f"        line {line:<6} id={fid:<6} {q}")
+    if len(group) > 4:
+        print(f"        …and {len(group)-4} more")
+
+if same_id_clusters:
+    print("❗  Near-duplicates with the SAME flashcard_id (need variety):")
+    for group in same_id_clusters[:10]:                # show first 10
+        print(f"    • id={group[0][1]}  → {len(group)} questions")
+        show(group)
+    if len(same_id_clusters) > 10:
+        print(f"    …and {len(same_id_clusters)-10} more")
+
+if cross_id_clusters:
+    print("\nℹ️  Near-duplicates shared ACROSS ids (less critical):")
+    for group in cross_id_clusters[:10]:
+        id_list = ", ".join(sorted({fid for _, fid, _ in group}))
+        print(f"    • {len(group)} questions across ids: {id_list}")
+        show(group)
+    if len(cross_id_clusters) > 10:
+        print(f"    …and {len(cross_id_clusters)-10} more")
+
+###############################################################################
+# 4. Optional detailed CSV report
+###############################################################################
+
+if args.output:
+    with Path(args.output).open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["cluster", "duplicate_type", "exact", "min_similarity",
+                    "line_numbers", "flashcard_ids", "questions"])
+        for n, group in enumerate(same_id_clusters + cross_id_clusters, start=1):
+            ids = {fid for _, fid, _ in group}
+            dup_type = "same_id" if len(ids) == 1 else "cross_id"
+            similarity = cluster_similarity([q for _, _, q in group], k=args.shingle)
+            w.writerow([n, dup_type, "yes" if is_exact(group) else "",
+                        f"{similarity:.2f}",
+                        ";".join(str(line) for line, _, _ in group),
+                        ";".join(sorted(ids)),
+                        " | ".join(dict.fromkeys(q for _, _, q in group))])
+
+    print(f"\n📝  Detailed near-duplicate report written to: {args.output}")
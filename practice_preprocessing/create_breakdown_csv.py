@@ -1,12 +1,26 @@
 import csv
 import json
+import time
+import hashlib
+import argparse
 from pathlib import Path
 from tqdm import tqdm
 
 # ──────────────────────────────────────────────────────────────────────────
 # 1) Import your helper functions
 # ──────────────────────────────────────────────────────────────────────────
-from generate_breakdown import analyze_japanese_sentence, parse_analysis_response
+from generate_breakdown import (
+    analysis_request, analyze_japanese_sentence_async, analyze_japanese_sentence_stream_async,
+    parse_analysis_response, repair_breakdown_async,
+)
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, run_jobs
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.batch_jobs import (
+    LocalDirBatchBackend, OpenAIBatchBackend, finish_batch, read_results, run_batch, write_request_file,
+)
+from flashcard_preprocessing.ai_processing.response_archive import ResponseArchive, archive_path_for
+from flashcard_preprocessing.ai_processing.breakdown_model import Breakdown
+from flashcard_preprocessing.ai_processing.record_log import RecordLog
 
 # ──────────────────────────────────────────────────────────────────────────
 # 2) Hardcoded file paths
@@ -14,38 +28,112 @@ from generate_breakdown import analyze_japanese_sentence, parse_analysis_respons
 INPUT_CSV  = Path("practice_preprocessing/fill_gap_questions.csv")
 OUTPUT_CSV = Path("practice_preprocessing/fill_gap_breakdown.csv")
 
+# Finished rows are appended here as they come in; --compact turns the log into OUTPUT_CSV
+OUTPUT_LOG = Path("practice_preprocessing/fill_gap_breakdown.log.jsonl")
+
+# Batch-mode working files (request file, collected output, in-flight batch id)
+BATCH_DIR      = Path("practice_preprocessing/batch")
+BATCH_REQUESTS = BATCH_DIR / "fill_gap_breakdown_requests.jsonl"
+BATCH_RESULTS  = BATCH_DIR / "fill_gap_breakdown_results.jsonl"
+BATCH_STATE    = BATCH_DIR / "fill_gap_breakdown_batch.json"
+
+# Every raw answer is archived, so parser fixes can be rolled out with reparse_breakdowns.py
+archive = ResponseArchive(archive_path_for(OUTPUT_CSV))
+
+parser = argparse.ArgumentParser(description="Generate sentence breakdowns for fill-gap questions")
+parser.add_argument("--batch", action="store_true",
+                    help="run the missing rows as one offline batch job instead of live requests")
+parser.add_argument("--batch-dir",
+                    help="use a local directory stand-in for the batch API (for tests/offline runs)")
+parser.add_argument("--poll-interval", type=int, default=60,
+                    help="seconds between batch status checks (default: 60)")
+parser.add_argument("--structured", action="store_true",
+                    help="request schema-constrained JSON answers instead of markdown "
+                         "(default: BREAKDOWN_OUTPUT_MODE)")
+parser.add_argument("--no-repair", action="store_true",
+                    help="regenerate incomplete breakdowns in full instead of re-asking only the missing sections")
+parser.add_argument("--stream", action="store_true",
+                    help="stream the markdown answers and parse them while they are generated; "
+                         "malformed answers are cut off early and picked up again by the next run")
+parser.add_argument("--compact", action="store_true",
+                    help=f"write {OUTPUT_CSV} from the breakdown log (dropping superseded rows) and exit")
+args = parser.parse_args()
+if args.stream and args.structured:
+    parser.error("--stream works with the markdown format only; drop --structured")
+STRUCTURED = True if args.structured else None
+
 # ──────────────────────────────────────────────────────────────────────────
 # 3) Utility to decide which existing rows are “done”
 # ──────────────────────────────────────────────────────────────────────────
 def has_good_breakdown(analysis_json_text: str) -> bool:
-    try:
-        data = json.loads(analysis_json_text)
-    except json.JSONDecodeError:
-        return False
-    vocab = data.get("vocabulary", [])
-    if not vocab:
-        return False
-    for entry in vocab:
-        if not entry.get("components") and not entry.get("combined_explanation"):
-            return False
-    return True
+    # only the vocabulary section is decoded
+    return Breakdown(analysis_json_text).has_complete_vocabulary
+
+def breakdown_status(analysis_json_text: str) -> str:
+    """'good', 'repair' (has vocabulary, some sections missing) or 'failed'; kept in the log index."""
+    if has_good_breakdown(analysis_json_text):
+        return "good"
+    breakdown = Breakdown(analysis_json_text)
+    if breakdown.has_vocabulary and not breakdown.has_section("error"):
+        return "repair"
+    return "failed"
 
 # ──────────────────────────────────────────────────────────────────────────
-# 4) Load existing output (if any) into memory
+# 4) Open the breakdown log (only rows added since the last run are scanned)
 # ──────────────────────────────────────────────────────────────────────────
-existing_rows = []
-if OUTPUT_CSV.exists():
+fieldnames = ["flashcard_id", "question", "answer", "sentence", "english", "analysis_json"]
+
+log = RecordLog(OUTPUT_LOG)
+
+def csv_stamp(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+def row_digest(row):
+    return hashlib.sha1(row.get("analysis_json", "").encode("utf-8")).hexdigest()[:16]
+
+def csv_digests():
+    """key -> digest of every row in OUTPUT_CSV (keys as JSON, so they fit in log.meta)."""
     with OUTPUT_CSV.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            existing_rows.append(row)
+        return {json.dumps([r["flashcard_id"], r["question"]], ensure_ascii=False): row_digest(r)
+                for r in csv.DictReader(f)}
 
-# build a lookup by (flashcard_id, question)
-by_key = {
-    (r["flashcard_id"], r["question"]): r
-    for r in existing_rows
-    if r.get("analysis_json", "").strip() and has_good_breakdown(r["analysis_json"])
-}
+# Pick up the CSV when it changed since it was last written (--compact) or
+# read: the first run after switching to the log, or after another tool
+# (e.g. reparse_breakdowns.py) rewrote it. log.meta["csv_rows"] holds the
+# digests of the CSV's rows at that point, so each side's changes are known:
+# a CSV row is taken only if it changed and the logged row did not, or the
+# log doesn't have it at all. Rows appended since then stay newer.
+if OUTPUT_CSV.exists() and log.meta.get("csv") != csv_stamp(OUTPUT_CSV):
+    base = log.meta.get("csv_rows", {})
+    imported = kept = 0
+    with OUTPUT_CSV.open("r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            key = (r["flashcard_id"], r["question"])
+            logged = log.get(key)
+            if logged is not None:
+                digest = base.get(json.dumps(list(key), ensure_ascii=False))
+                if row_digest(r) in (digest, row_digest(logged)):
+                    continue  # CSV row unchanged, or already the same as the log
+                if digest != row_digest(logged):
+                    kept += 1  # changed in both: the logged row is newer
+                    continue
+            log.append(key, {name: r.get(name, "") for name in fieldnames},
+                       breakdown_status(r.get("analysis_json", "")))
+            imported += 1
+    log.meta["csv"] = csv_stamp(OUTPUT_CSV)
+    log.meta["csv_rows"] = csv_digests()
+    log.save_index()
+    print(f"📥 Took {imported} changed rows from {OUTPUT_CSV} into {OUTPUT_LOG}"
+          + (f" (kept {kept} newer logged rows)" if kept else ""))
+
+if args.compact:
+    count = log.compact(OUTPUT_CSV, fieldnames)
+    log.meta["csv"] = csv_stamp(OUTPUT_CSV)
+    log.meta["csv_rows"] = csv_digests()
+    log.close()
+    print(f"🗜️ Wrote {count} rows to: {OUTPUT_CSV}")
+    exit()
 
 # ──────────────────────────────────────────────────────────────────────────
 # 5) Figure out which new rows actually need processing
@@ -57,50 +145,157 @@ with INPUT_CSV.open("r", encoding="utf-8", newline="") as f:
     if required - set(reader.fieldnames):
         raise SystemExit(f"[FATAL] Missing columns: {required - set(reader.fieldnames)}")
 
+    # incomplete breakdowns that still have vocabulary can be repaired section by section
+    to_repair = {}
     for row in reader:
         key = (row["flashcard_id"], row["question"])
-        if key not in by_key:
-            rows_to_process.append(row)
+        status = log.status(key)
+        if status == "good":
+            continue
+        if status == "repair" and not args.no_repair:
+            try:
+                to_repair[key] = Breakdown(log.get(key)["analysis_json"]).to_dict()
+            except json.JSONDecodeError:
+                pass
+        rows_to_process.append(row)
 
 if not rows_to_process:
+    log.close()
     print("✅ All rows already have a good breakdown!")
     exit()
 
 # ──────────────────────────────────────────────────────────────────────────
-# 6) Process each “to_process” row and update our in-memory lookup
+# 6) Process each “to_process” row and append it to the log
 # ──────────────────────────────────────────────────────────────────────────
-fieldnames = ["flashcard_id", "question", "answer", "sentence", "english", "analysis_json"]
+def row_sentence(row):
+    return row["question"].strip().replace("＿＿＿", row["answer"].strip())
+
+def build_output_row(row, parsed_json):
+    return {
+        "flashcard_id": row["flashcard_id"].strip(),
+        "question":     row["question"].strip(),
+        "answer":       row["answer"].strip(),
+        "sentence":     row_sentence(row),
+        "english":      row["english"].strip(),
+        "analysis_json": json.dumps(parsed_json, ensure_ascii=False),
+    }
+
+def keep(new_row):
+    """Durably appends one finished row to the log."""
+    log.append((new_row["flashcard_id"], new_row["question"]), new_row,
+               breakdown_status(new_row["analysis_json"]))
 
-for row in tqdm(rows_to_process, desc="Analyzing", unit="sentence"):
-    fid      = row["flashcard_id"].strip()
-    question = row["question"].strip()
-    answer   = row["answer"].strip()
+def archive_key(row):
+    return (row["flashcard_id"].strip(), row_sentence(row))
+
+async def analyze_row(row):
+    sentence = row_sentence(row)
     english  = row["english"].strip()
-    sentence = question.replace("＿＿＿", answer)
+    archive_repair = lambda text, missing: archive.append(archive_key(row), "repair", text, missing=missing)
+    # A row that was tried before came out incomplete or failed: a cached
+    # answer would only give the same result again
+    use_cache = log.status((row["flashcard_id"], row["question"])) is None
+
+    # An incomplete earlier breakdown only needs its missing sections
+    parsed_json = to_repair.get((row["flashcard_id"], row["question"]))
+    if parsed_json is not None:
+        parsed_json = await repair_breakdown_async(sentence, english, parsed_json, on_response=archive_repair,
+                                                   use_cache=False)
+        return build_output_row(row, parsed_json)
 
+    parse_ms = None
     try:
-        raw_response = analyze_japanese_sentence(sentence, english)
-        parsed_json  = parse_analysis_response(raw_response)
+        if args.stream:
+            raw_response, parsed_json, parse_ms = await analyze_japanese_sentence_stream_async(
+                sentence, english, use_cache=use_cache)
+            archive.append(archive_key(row), "analysis", raw_response)
+        else:
+            raw_response = await analyze_japanese_sentence_async(sentence, english, STRUCTURED, use_cache)
+            archive.append(archive_key(row), "analysis", raw_response)
+            parse_start  = time.perf_counter()
+            parsed_json  = parse_analysis_response(raw_response)
+            parse_ms     = (time.perf_counter() - parse_start) * 1000
+    except CircuitOpenError:
+        raise
     except Exception as e:
         parsed_json = {"error": str(e)}
+    report_parse(has_good_breakdown(json.dumps(parsed_json, ensure_ascii=False)), parse_ms)
 
-    new_json = json.dumps(parsed_json, ensure_ascii=False)
-    by_key[(fid, question)] = {
-        "flashcard_id": fid,
-        "question":     question,
-        "answer":       answer,
-        "sentence":     sentence,
-        "english":      english,
-        "analysis_json": new_json,
-    }
+    # Fill any sections the model skipped with a short follow-up request
+    if not args.no_repair:
+        parsed_json = await repair_breakdown_async(sentence, english, parsed_json, on_response=archive_repair,
+                                                   use_cache=use_cache)
+    return build_output_row(row, parsed_json)
+
+def batch_custom_id(row):
+    """Stable id for a (flashcard_id, question) pair, so a resumed batch still maps back."""
+    key = json.dumps([row["flashcard_id"].strip(), row["question"].strip()], ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+live_rows = rows_to_process
+if args.batch:
+    # Incomplete rows only need a short repair request, which runs live below;
+    # everything else goes into the batch.
+    live_rows  = [row for row in rows_to_process if (row["flashcard_id"], row["question"]) in to_repair]
+    batch_rows = [row for row in rows_to_process if (row["flashcard_id"], row["question"]) not in to_repair]
+
+if args.batch and batch_rows:
+    # Step 1: emit the request file (kept as-is while a submitted batch is still in flight)
+    rows_by_id = {batch_custom_id(row): row for row in batch_rows}
+    if not BATCH_STATE.exists():
+        count = write_request_file(BATCH_REQUESTS, (
+            (cid, analysis_request(row_sentence(row), row["english"].strip(), STRUCTURED))
+            for cid, row in rows_by_id.items()
+        ))
+        print(f"📝 Wrote {count} batch requests to: {BATCH_REQUESTS}")
+
+    # Step 2: submit, poll and collect
+    backend = LocalDirBatchBackend(args.batch_dir) if args.batch_dir else OpenAIBatchBackend()
+    status = run_batch(backend, BATCH_REQUESTS, BATCH_RESULTS,
+                       state_path=BATCH_STATE, poll_interval=args.poll_interval)
+    if status != "completed":
+        raise SystemExit(f"[FATAL] Batch finished with status '{status}'")
+
+    # Step 3: merge; rows without a result are picked up again by the next run.
+    # The batch state is only dropped afterwards: a run stopped half-way merges
+    # the rest from the collected output instead of paying for a new batch.
+    contents = read_results(BATCH_REQUESTS, BATCH_RESULTS)
+    merged = 0
+    for cid, content in contents.items():
+        row = rows_by_id.get(cid)
+        if row is None:
+            continue  # merged by an earlier run
+        merged += 1
+        archive.append(archive_key(row), "analysis", content)
+        try:
+            parsed_json = parse_analysis_response(content)
+        except Exception as e:
+            parsed_json = {"error": str(e)}
+        keep(build_output_row(row, parsed_json))
+    finish_batch(BATCH_STATE)
+    print(f"🔗 Merged {merged} of {len(rows_by_id)} batch results")
+
+stopped = None
+if live_rows:
+    def keep_row(i, new_row):
+        # Rows are logged as they finish, so a stopped run still saves its progress
+        keep(new_row)
+        bar.update()
+
+    with tqdm(total=len(live_rows), desc="Analyzing", unit="sentence") as bar:
+        try:
+            run_jobs(live_rows, analyze_row, on_result=keep_row,
+                     row_key=lambda row: f"{row['flashcard_id']}|{row['question']}")
+        except CircuitOpenError as e:
+            stopped = e
+archive.close()
+log.close()
 
 # ──────────────────────────────────────────────────────────────────────────
-# 7) Write **all** rows back out, replacing the old file
+# 7) The CSV is only rebuilt on request (--compact), not on every run
 # ──────────────────────────────────────────────────────────────────────────
-with OUTPUT_CSV.open("w", encoding="utf-8", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in by_key.values():
-        writer.writerow(row)
+if stopped is not None:
+    raise SystemExit(f"[FATAL] {stopped}. Finished rows were saved to {OUTPUT_LOG}; rerun to continue.")
 
-print(f"\n🎉 Done! Updated breakdown saved to: {OUTPUT_CSV}")
+print(f"\n🎉 Done! New breakdowns saved to: {OUTPUT_LOG}")
+print(f"   Run with --compact to write {OUTPUT_CSV}")
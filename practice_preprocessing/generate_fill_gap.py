@@ -1,42 +1,109 @@
 import os
+import sys
 import csv
 import json
-import time
-from openai import OpenAI
-from dotenv import load_dotenv
+from collections import Counter, defaultdict
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.llm_executor import CircuitOpenError, chat_completion, run_jobs
+from flashcard_preprocessing.ai_processing.llm_telemetry import report_parse
+from flashcard_preprocessing.ai_processing.near_duplicates import normalize
+from flashcard_preprocessing.ai_processing.record_log import RecordLog
 
 # Input/Output files
 FLASHCARDS_INPUT = "practice_preprocessing/flashcards_n5.csv"
 FILL_GAP_OUTPUT = "practice_preprocessing/fill_gap_questions.csv"
+QUESTION_INDEX = "practice_preprocessing/fill_gap_question_index.log.jsonl"
+
+LEVEL = "N5"
+QUESTIONS_PER_CARD = 3
+FIELDNAMES = ["flashcard_id", "question", "answer", "english"]
+
+# The question index (QUESTION_INDEX) holds every question ever accepted,
+# for any word, level or run:
+#   (normalized question, normalized answer) -> {"level", "flashcard_id", "question", "answer", "english"}
+# It is a RecordLog, so opening it only scans what was appended since the
+# last run, and checking a question is one dict lookup. The key ignores the
+# blank, width, kana and punctuation (see near_duplicates.normalize), so a
+# reworded copy counts as a duplicate; it includes the answer, because many
+# words legitimately share a sentence frame (今日は____です。).
+KEY_FORMAT = "question+answer"
+
+def question_key(question, answer):
+    return (normalize(question), normalize(answer))
 
-# Dictionary to track used questions for each word:
-#   used_questions[word] = set of previously used "question" strings.
-used_questions = {}
+def csv_stamp(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
 
-def generate_fill_gap(word, meaning, word_type, example_sentence):
+def read_fill_gaps(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, mode="r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+def open_question_index(csv_path=FILL_GAP_OUTPUT):
     """
-    Returns a (question, answer, english) triple for a fill-in-the-gap sentence.
-    If it can't generate a new unique question after several attempts, returns ("ERROR", "ERROR", "ERROR").
+    Opens the question index and syncs it with `csv_path` whenever the CSV
+    changed since the last run (everything on the first run, hand edits
+    after that): CSV rows it has not seen are added, and this level's
+    questions that are no longer in the CSV are removed, so a deleted row
+    can be generated again.
     """
-    prompt = f"""
+    index = RecordLog(QUESTION_INDEX)
+    if index.meta.get("key") != KEY_FORMAT:
+        # written with the question-only key: re-key every entry, then
+        # resync, since rows that shared a question were indexed only once
+        for key in list(index.keys()):
+            row = index.get(key)
+            index.remove(key)
+            index.append(question_key(row["question"], row["answer"]), row, status="accepted")
+        index.meta["key"] = KEY_FORMAT
+        index.meta.pop("csv", None)
+        index.save_index()
+    stamp = csv_stamp(csv_path)
+    if index.meta.get("csv") != stamp:
+        in_csv = set()
+        added = removed = 0
+        for row in read_fill_gaps(csv_path):
+            key = question_key(row["question"], row["answer"])
+            in_csv.add(key)
+            if key not in index:
+                index.append(key, {"level": LEVEL, **{name: row.get(name, "") for name in FIELDNAMES}},
+                             status="accepted")
+                added += 1
+        for key in [key for key in index.keys() if key not in in_csv]:
+            if index.get(key).get("level") == LEVEL:
+                index.remove(key)
+                removed += 1
+        index.meta["csv"] = stamp
+        index.save_index()
+        print(f"📥 Synced {QUESTION_INDEX} with {csv_path}: +{added} / -{removed} questions ({len(index)} indexed)")
+    return index
+
+def fill_gap_prompt(word, meaning, word_type, example_sentence, count, avoid):
+    avoid = "".join(f'\n   Also do NOT repeat: "{question}"' for question in avoid)
+    return f"""
 You are a Japanese teacher preparing JLPT N5-level exercises.
 
 Task:
-1. Generate 3 unique Japanese sentences, each using the target word below.
+1. Generate {count} unique Japanese sentences, each using the target word below.
 2. In each sentence, replace the target word with ____ (an underline).
-3. Do NOT repeat the sentence used in this example: "{example_sentence}"
+3. Do NOT repeat the sentence used in this example: "{example_sentence}"{avoid}
 4. Each sentence must be natural, one setence long (can be simple or complex sentence) and be at an N5 level (N5 level).
 5. For each sentence, include:
    - "question" (Japanese with ____)
    - "answer" (the correct word)
    - "english" (a short English translation)
 
-Return a JSON array with 3 objects in this format:
+Return a JSON array with {count} objects in this format:
 
 [
   {{
@@ -51,10 +118,25 @@ Target word: "{word}"
 Meaning: "{meaning}"
 Type: "{word_type}"
 """
+
+async def generate_fill_gap(word, meaning, word_type, example_sentence, index, count=QUESTIONS_PER_CARD, existing=()):
+    """
+    Returns up to `count` (question, answer, english) triples for
+    fill-in-the-gap sentences that are not in `index` (the question index) yet.
+    While duplicates leave it short, it asks again (uncached) for the rest,
+    listing every question already used or rejected. Returns what it has
+    (possibly []) after several attempts.
+    """
+    results = []
+    seen = set()
+    avoid = list(existing)
     max_retries = 3
     for attempt in range(max_retries):
+        prompt = fill_gap_prompt(word, meaning, word_type, example_sentence, count - len(results), avoid)
         try:
-            response = client.chat.completions.create(
+            # Retries must not get the same cached answer back
+            response = await chat_completion(
+                use_cache=(attempt == 0),
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5
@@ -66,8 +148,8 @@ Type: "{word_type}"
                 content = content.replace("```json", "").replace("```", "").strip()
 
             data = json.loads(content)
+            report_parse(True)
 
-            results = []
             for item in data:
                 question = item.get("question", "").strip()
                 answer = item.get("answer", "").strip()
@@ -76,62 +158,127 @@ Type: "{word_type}"
                 if not question or not answer or not english:
                     continue
 
-                # Deduplicate
-                if question in used_questions[word]:
-                    continue
+                # Deduplicate against every accepted question and within these answers
+                key = question_key(question, answer)
+                if key not in seen:
+                    seen.add(key)
+                    avoid.append(question)  # never asked for again, used or not
+                    if key not in index:
+                        results.append((question, answer, english))
 
-                used_questions[word].add(question)
-                results.append((question, answer, english))
+                if len(results) == count:
+                    return results
 
-            return results
+            if attempt < max_retries - 1:
+                print(f"🔁 Only {len(results)}/{count} new questions for '{word}'; asking again")
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            # API errors were already retried with backoff by the rate limiter;
+            # this loop only re-asks after an unusable answer.
+            if isinstance(e, json.JSONDecodeError):
+                report_parse(False)
             print(f"❌ Error (attempt {attempt+1}) for '{word}': {e}")
-            time.sleep(1)
 
-    return []  # Return empty list if failed
+    return results
+
+async def fill_gap_row(row, index, count=QUESTIONS_PER_CARD, existing=()):
+    """Generates up to `count` new fill-gap questions for one flashcard row (skipped if it has no word)."""
+    word = row.get("word", "").strip()
+    if not word:
+        return []  # Skip if no word
+
+    meaning = row.get("meaning", "").strip()
+    word_type = row.get("word_type", "").strip()
+    example_sentence = row.get("example_sentence", "").strip()
 
-def create_fill_gap_csv():
+    return await generate_fill_gap(word, meaning, word_type, example_sentence, index, count, existing)
+
+def create_fill_gap_csv(concurrency=None):
     """
-    For each flashcard, generates 3 unique fill-in-the-gap sentences
-    that differ from the DB example and from each other.
+    Tops up every flashcard to QUESTIONS_PER_CARD fill-in-the-gap sentences
+    that differ from the DB example and from every question accepted before.
+    Only cards that are short get an API call, asking for just the shortfall;
+    new rows are appended to the CSV (and the index) as each card finishes.
     """
-    with open(FLASHCARDS_INPUT, mode="r", encoding="utf-8") as f_in, \
-         open(FILL_GAP_OUTPUT, mode="w", encoding="utf-8", newline="") as f_out:
+    with open(FLASHCARDS_INPUT, mode="r", encoding="utf-8") as f_in:
+        rows = list(csv.DictReader(f_in))
 
-        reader = csv.DictReader(f_in)
-        fieldnames = ["flashcard_id", "question", "answer", "english"]
-        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-        writer.writeheader()
+    question_index = open_question_index()
+    have = defaultdict(list)  # flashcard_id -> questions already in the CSV
+    for fill_gap in read_fill_gaps(FILL_GAP_OUTPUT):
+        have[fill_gap["flashcard_id"].strip()].append(fill_gap["question"].strip())
 
-        for row in reader:
-            flashcard_id = row.get("flashcard_id", "").strip()
-            word = row.get("word", "").strip()
-            meaning = row.get("meaning", "").strip()
-            word_type = row.get("word_type", "").strip()
-            example_sentence = row.get("example_sentence", "").strip()
+    todo = [row for row in rows
+            if row.get("word", "").strip() and len(have[row.get("flashcard_id", "").strip()]) < QUESTIONS_PER_CARD]
+    if not todo:
+        question_index.close()
+        print(f"✅ Every flashcard already has {QUESTIONS_PER_CARD} fill-gap questions in: {FILL_GAP_OUTPUT}")
+        return
+    shortfall = sum(QUESTIONS_PER_CARD - len(have[row["flashcard_id"].strip()]) for row in todo)
+    print(f"🧮 {len(todo)} flashcards need {shortfall} questions ({len(rows) - len(todo)} already complete)")
 
-            if not word:
-                continue  # Skip if no word
+    new_file = not os.path.exists(FILL_GAP_OUTPUT) or os.path.getsize(FILL_GAP_OUTPUT) == 0
+    added = Counter()
+    raced = Counter()  # flashcard_id -> questions another card accepted first
+    with open(FILL_GAP_OUTPUT, mode="a", encoding="utf-8", newline="") as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=FIELDNAMES)
+        if new_file:
+            writer.writeheader()
 
-            # Initialise used set if not already
-            if word not in used_questions:
-                used_questions[word] = set()
+        def accept(flashcard_id, question, answer, english):
+            """Appends one question to the CSV, then records it in the index; False if it was taken."""
+            key = question_key(question, answer)
+            if key in question_index:  # another card took it while this one was waiting
+                return False
+            new_row = {"flashcard_id": flashcard_id, "question": question, "answer": answer, "english": english}
+            writer.writerow(new_row)
+            f_out.flush()
+            # a crash between the two only means the next run re-indexes it from the CSV
+            question_index.append(key, {"level": LEVEL, **new_row}, status="accepted")
+            added[flashcard_id] += 1
+            return True
 
-            results = generate_fill_gap(word, meaning, word_type, example_sentence)
+        async def top_up(row):
+            flashcard_id = row.get("flashcard_id", "").strip()
+            avoid = list(have[flashcard_id])
+            # One more round if other cards took some of these questions meanwhile
+            for _ in range(2):
+                needed = QUESTIONS_PER_CARD - len(have[flashcard_id]) - added[flashcard_id]
+                if needed <= 0:
+                    return
+                results = await fill_gap_row(row, question_index, needed, avoid)
+                taken = 0
+                for question, answer, english in results[:needed]:  # Just in case GPT returns more
+                    if not accept(flashcard_id, question, answer, english):
+                        avoid.append(question)
+                        taken += 1
+                if not taken:
+                    return
+                raced[flashcard_id] += taken
+                print(f"🔁 {taken} questions for '{row['word'].strip()}' were taken by another card; asking again")
 
-            for question, answer, english in results[:3]:  # Just in case GPT returns more than 3
-                writer.writerow({
-                    "flashcard_id": flashcard_id,
-                    "question": question,
-                    "answer": answer,
-                    "english": english
-                })
+        # All flashcards go through the shared executor
+        try:
+            run_jobs(todo, top_up, concurrency=concurrency,
+                     row_key=lambda row: row.get("flashcard_id", ""))
+        except CircuitOpenError as e:
+            raise SystemExit(f"[FATAL] {e}. The {sum(added.values())} questions accepted so far were "
+                             f"appended to {FILL_GAP_OUTPUT}; rerun to top up the rest.")
+        finally:
+            f_out.close()
+            question_index.meta["csv"] = csv_stamp(FILL_GAP_OUTPUT)
+            question_index.close()
 
-            if len(results) < 3:
-                print(f"⚠️ Only got {len(results)} questions for '{word}' ({flashcard_id})")
+    for row in todo:
+        flashcard_id = row["flashcard_id"].strip()
+        count = len(have[flashcard_id]) + added[flashcard_id]
+        if count < QUESTIONS_PER_CARD:
+            lost = f", {raced[flashcard_id]} lost to other cards" if raced[flashcard_id] else ""
+            print(f"⚠️ Only got {count} questions for '{row['word'].strip()}' ({flashcard_id}{lost}); rerun to top up")
 
-    print(f"✅ 3 fill-gap exercises generated for each flashcard and saved to: {FILL_GAP_OUTPUT}")
+    print(f"✅ Appended {sum(added.values())} fill-gap questions for {len(added)} flashcards to: {FILL_GAP_OUTPUT}")
 
 if __name__ == "__main__":
     create_fill_gap_csv()
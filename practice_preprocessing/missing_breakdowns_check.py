@@ -1,30 +1,25 @@
 #!/usr/bin/env python3
 import csv
-import json
+import os
+import sys
 from pathlib import Path
 
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing.breakdown_model import Breakdown
+
 CSV_PATH = Path("practice_preprocessing/fill_gap_breakdown.csv")
 
 def is_empty_breakdown(raw_json: str) -> bool:
-    """True if the analysis_json is blank or not valid JSON."""
-    raw = raw_json.strip()
-    if not raw:
-        return True
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        return True
-        # also treat an empty object as “no breakdown”
-    if data == {}:
-        return True
-
-    # if you want to be extra sure, you could also require
-    # that at least one of the main keys is present:
-    required_keys = {"vocabulary", "grammar", "tips"}
-    if not required_keys & data.keys():
-        return True
-
-    return False
+    """
+    True if the analysis_json is blank, not a JSON object, or has none of the
+    main keys (vocabulary / grammar / tips). The sections are not decoded.
+    """
+    return Breakdown(raw_json).is_empty
 
 def main():
     missing = []
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+validate_fill_gaps.py
+
+One validator for the fill-gap artifacts. The checks are registered rules
+(see RULES); every file is read once, and each row is handed to every rule
+that looks at that file:
+
+    flashcards_n5.csv           -> {flashcard_id: word} for the other rules
+    fill_gap_questions.csv      -> missing-id, row-count, answer-matches-word,
+                                   duplicate-question, near-duplicate-question,
+                                   extra-id
+    fill_gap_breakdown.csv      -> empty-breakdown
+
+With --fix, fixable rules correct the row while it is being read and the
+corrected fill-gap file is written in the same pass (atomically), so
+validation and fixing stay a single linear scan however many rules run.
+
+Runs are incremental (see ValidationCache, kept in .cache/validate_fill_gaps/):
+a file that is unchanged since the last run is not read at all. In a changed
+breakdown file only the added or edited records are parsed and checked. In
+a changed fill-gap file the rows are re-read (cheaper than caching them) and
+the cross-row rules recomputed; their one expensive part, the near-duplicate
+signatures, is cached per question, so only new questions are hashed.
+--fix and --no-cache always do a full run.
+
+Usage (from the project root):
+    python practice_preprocessing/validate_fill_gaps.py
+    python practice_preprocessing/validate_fill_gaps.py -f flashcards_n5.csv -g fill_gap_questions.csv --per-card 3
+    python practice_preprocessing/validate_fill_gaps.py --fix -o fill_gap_questions_fixed.csv --report report.csv
+    python practice_preprocessing/validate_fill_gaps.py --rules answer-matches-word duplicate-question
+    python practice_preprocessing/validate_fill_gaps.py --no-cache
+"""
+import argparse
+import collections
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+from pathlib import Path
+
+# Get the absolute path of the project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Add it to the Python path
+sys.path.append(PROJECT_ROOT)
+
+from flashcard_preprocessing.ai_processing import breakdown_model, near_duplicates
+from flashcard_preprocessing.ai_processing.breakdown_model import Breakdown
+from flashcard_preprocessing.ai_processing.checkpoint import atomic_write
+from flashcard_preprocessing.ai_processing.near_duplicates import find_clusters
+
+DEFAULT_FLASHCARDS = "practice_preprocessing/flashcards_n5.csv"
+DEFAULT_FILLGAPS   = "practice_preprocessing/fill_gap_questions.csv"
+DEFAULT_BREAKDOWNS = "practice_preprocessing/fill_gap_breakdown.csv"
+DEFAULT_CACHE_DIR  = os.path.join(PROJECT_ROOT, ".cache", "validate_fill_gaps")
+
+# a change in any of these invalidates the cached results
+CODE_FILES = [__file__, breakdown_model.__file__, near_duplicates.__file__]
+
+# Files whose unchanged records are reused from the cache instead of parsed.
+# Breakdown rows are kilobytes of JSON; a fill-gap row is ~100 bytes, and
+# parsing it again is cheaper than loading its cached columns.
+RECORD_CACHED = {"breakdowns"}
+
+# A warning is reported but doesn't fail the run (exit status 0)
+Issue = collections.namedtuple("Issue", "rule file line flashcard_id details fixed warning", defaults=(False,))
+
+################################################################################
+# Rule registry
+################################################################################
+
+RULES = {}
+
+
+def rule(name, source, columns=(), fixable=False, per_row=False):
+    """
+    Registers a rule class under `name`; `source` is the file whose rows it
+    sees. `per_row` rules judge each row on its own (and the flashcard file),
+    so their results can be reused for rows that did not change.
+    """
+    def register(cls):
+        cls.name, cls.source, cls.columns, cls.fixable = name, source, set(columns), fixable
+        cls.per_row = per_row
+        RULES[name] = cls
+        return cls
+    return register
+
+
+class Rule:
+    """
+    Base class. `check(ctx, line, row)` sees every row of the rule's source
+    file and returns an Issue or None; with ctx.fix it may correct `row` in
+    place. `finish(ctx)` yields the issues only known at the end.
+    """
+
+    def check(self, ctx, line, row):
+        return None
+
+    def finish(self, ctx):
+        return ()
+
+    def issue(self, ctx, line, flashcard_id, details, fixed=False, warning=False):
+        return Issue(self.name, ctx.paths[self.source], line, flashcard_id, details, fixed, warning)
+
+
+class Context:
+    def __init__(self, paths, words, per_card, fix, cache=None):
+        self.paths = paths
+        self.words = words          # {flashcard_id: word} from the flashcard file
+        self.per_card = per_card
+        self.fix = fix
+        self.cache = cache          # ValidationCache, or None for a full run
+        self.counts = collections.Counter()  # fill-gap rows per flashcard_id, shared by the id rules
+
+
+################################################################################
+# Rules
+################################################################################
+
+@rule("missing-id", "fillgaps", columns={"flashcard_id"})
+class MissingId(Rule):
+    """A flashcard without any fill-gap question."""
+
+    def finish(self, ctx):
+        for fid in ctx.words:
+            if not ctx.counts[fid]:
+                yield self.issue(ctx, None, fid, "no fill-gap rows")
+
+
+@rule("row-count", "fillgaps", columns={"flashcard_id"})
+class RowCount(Rule):
+    """A flashcard with a different number of questions than --per-card."""
+
+    def finish(self, ctx):
+        for fid in ctx.words:
+            count = ctx.counts[fid]
+            if count and count != ctx.per_card:
+                yield self.issue(ctx, None, fid, f"has {count}, expected {ctx.per_card}")
+
+
+@rule("answer-matches-word", "fillgaps", columns={"flashcard_id", "answer"}, fixable=True, per_row=True)
+class AnswerMatchesWord(Rule):
+    """The answer must be the flashcard's word; --fix replaces it."""
+
+    def check(self, ctx, line, row):
+        fid = row["flashcard_id"].strip()
+        word = ctx.words.get(fid)
+        answer = row["answer"].strip()
+        if word is None or answer == word:
+            return None
+        if ctx.fix:
+            row["answer"] = word
+        return self.issue(ctx, line, fid, f"answer='{answer}' expected='{word}'", fixed=ctx.fix)
+
+
+@rule("duplicate-question", "fillgaps", columns={"flashcard_id", "question"})
+class DuplicateQuestion(Rule):
+    """The same question text twice; same-id copies fail the run, cross-id ones (another word's answer) only warn."""
+
+    def __init__(self):
+        self.first = {}  # question -> (line, flashcard_id)
+
+    def check(self, ctx, line, row):
+        question = row["question"].strip()
+        fid = row["flashcard_id"].strip()
+        if question not in self.first:
+            self.first[question] = (line, fid)
+            return None
+        first_line, first_id = self.first[question]
+        kind = "same_id" if fid == first_id else "cross_id"
+        return self.issue(ctx, line, fid, f"{kind} first_line={first_line} text={question}",
+                          warning=kind == "cross_id")
+
+
+@rule("near-duplicate-question", "fillgaps", columns={"flashcard_id", "question"})
+class NearDuplicateQuestion(Rule):
+    """
+    Near-twins of a question (punctuation, width/kana, a swapped word); exact
+    copies are duplicate-question's. Twins on the same card fail the run;
+    across cards they are only warnings, since different words often share a
+    sentence frame (今日は____です。 / 明日は____です。).
+    """
+
+    def __init__(self):
+        self.rows = []  # (line, flashcard_id, question)
+
+    def check(self, ctx, line, row):
+        self.rows.append((line, row["flashcard_id"].strip(), row["question"].strip()))
+        return None
+
+    def finish(self, ctx):
+        band_cache = ctx.cache.band_keys() if ctx.cache else None
+        for members in find_clusters([question for _, _, question in self.rows], band_cache=band_cache):
+            first_line, first_id, first_question = self.rows[members[0]]
+            for line, fid, question in (self.rows[i] for i in members[1:]):
+                if question != first_question:
+                    kind = "same_id" if fid == first_id else "cross_id"
+                    yield self.issue(ctx, line, fid, f"{kind} first_line={first_line} text={question}",
+                                     warning=kind == "cross_id")
+
+
+@rule("extra-id", "fillgaps", columns={"flashcard_id"})
+class ExtraId(Rule):
+    """Fill-gap rows for an id that is not in the flashcard file."""
+
+    def finish(self, ctx):
+        for fid in sorted(set(ctx.counts) - set(ctx.words)):
+            yield self.issue(ctx, None, fid, f"{ctx.counts[fid]} rows for an unknown flashcard")
+
+
+@rule("empty-breakdown", "breakdowns", columns={"flashcard_id", "analysis_json"}, per_row=True)
+class EmptyBreakdown(Rule):
+    """A breakdown that is blank, not a JSON object, or has none of the sections."""
+
+    def check(self, ctx, line, row):
+        if Breakdown(row.get("analysis_json", "")).is_empty:
+            return self.issue(ctx, line, row["flashcard_id"].strip(), f"question={row.get('question', '')}")
+        return None
+
+
+################################################################################
+# Engine
+################################################################################
+
+class ValidationCache:
+    """
+    Results of earlier runs, in `directory`:
+
+        index.json          per validated file: (size, mtime_ns) and digests of
+                            what the results depend on
+        <file>.issues.json  the issues found in that state
+        <file>.rows.json    per record (by hash of its raw bytes): the columns
+                            the cross-row rules read, and the per-row results
+        band_keys.json      near-duplicate LSH band keys per normalized question
+
+    When nothing changed only index.json and the issues are read. Entries are
+    rewritten from the current rows on every run, so deleted rows drop out.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.index = self._load("index.json", {})
+        self._band_keys = None  # loaded on first use
+        self._band_snapshot = None
+
+    def _load(self, name, default):
+        try:
+            with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return default
+
+    def _save(self, name, data):
+        os.makedirs(self.directory, exist_ok=True)
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                # dumps() uses the C encoder; dump() streams in pure Python
+                f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+        atomic_write(os.path.join(self.directory, name), write)
+
+    @staticmethod
+    def _name(path, kind):
+        return f"{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]}.{kind}.json"
+
+    def issues(self, path, stat, deps):
+        """The issues of the last run if neither the file nor its dependencies changed, else None."""
+        entry = self.index.get(path)
+        if not entry or entry["stat"] != stat or entry["deps"] != deps:
+            return None
+        saved = self._load(self._name(path, "issues"), {})
+        if saved.get("state") != [stat, deps]:  # written by a run that never saved the index
+            return None
+        return [Issue(rule, path, *rest) for rule, *rest in saved["issues"]]
+
+    def row_results(self, path, row_deps):
+        """The record entries of the last run, if the per-row rules would still agree."""
+        entry = self.index.get(path)
+        if not entry or entry["row_deps"] != row_deps:
+            return {}
+        return self._load(self._name(path, "rows"), {})
+
+    def store(self, path, stat, deps, row_deps, issues, row_results=None):
+        if row_results is not None:
+            self._save(self._name(path, "rows"), row_results)
+        self._save(self._name(path, "issues"), {
+            "state": [stat, deps],
+            "issues": [[issue.rule, *issue[2:]] for issue in issues],
+        })
+        self.index[path] = {"stat": stat, "deps": deps, "row_deps": row_deps}
+
+    def band_keys(self):
+        if self._band_keys is None:
+            self._band_keys = self._load("band_keys.json", {})
+            self._band_snapshot = set(self._band_keys)
+        return self._band_keys
+
+    def save(self):
+        if self._band_keys is not None and set(self._band_keys) != self._band_snapshot:
+            self._save("band_keys.json", self._band_keys)
+        self._save("index.json", self.index)
+
+
+def file_stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def file_digest(*paths) -> str:
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def read_words(path):
+    """{flashcard_id: word} from the flashcard master list."""
+    words = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if {"flashcard_id", "word"} - set(reader.fieldnames or ()):
+            raise SystemExit(f"[FATAL] {path} must have columns 'flashcard_id' and 'word'")
+        for row in reader:
+            fid = row["flashcard_id"].strip()
+            if fid:
+                words[fid] = row["word"].strip()
+    return words
+
+
+def scan(ctx, source, rules, issues, writer_path=None):
+    """One pass over a file: every row goes through every rule of that file (and is rewritten if fixing)."""
+    path = ctx.paths[source]
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = set().union(*(r.columns for r in rules)) - set(reader.fieldnames or ())
+        if missing:
+            raise SystemExit(f"[FATAL] {path} missing column(s): {', '.join(sorted(missing))}")
+
+        out = open(writer_path, "w", encoding="utf-8", newline="") if writer_path else None
+        try:
+            writer = csv.DictWriter(out, fieldnames=reader.fieldnames) if out else None
+            if writer:
+                writer.writeheader()
+            for line, row in enumerate(reader, start=2):  # line 1 = header
+                if source == "fillgaps":
+                    ctx.counts[row["flashcard_id"].strip()] += 1
+                for r in rules:
+                    found = r.check(ctx, line, row)
+                    if found is not None:
+                        issues.append(found)
+                if writer:
+                    writer.writerow(row)
+        finally:
+            if out:
+                out.close()
+
+
+def raw_records(path):
+    """
+    Yields the CSV records of a file as raw bytes (header first), without
+    parsing them: a record ends at the first newline after an even number of
+    quotes, which is how quoted fields with embedded newlines are delimited.
+    """
+    with open(path, "rb") as f:
+        parts, open_quote = [], False
+        for chunk in f:
+            parts.append(chunk)
+            if chunk.count(b'"') % 2:
+                open_quote = not open_quote
+            if not open_quote:
+                record = b"".join(parts)
+                parts = []
+                if record.strip(b"\r\n"):  # DictReader skips blank lines too
+                    yield record
+        if parts:
+            yield b"".join(parts)
+
+
+def parse_record(record, fieldnames=None):
+    values = next(csv.reader(io.StringIO(record.decode("utf-8"), newline="")), [])
+    if fieldnames is None:
+        return values
+    return dict(zip(fieldnames, values + [None] * (len(fieldnames) - len(values))))
+
+
+def scan_incremental(ctx, source, rules, issues, known, results):
+    """
+    scan() for a file that changed since the last run. Records are matched
+    by the hash of their raw bytes: an unchanged one is not even parsed, its
+    per-row results and the columns the other rules need come from `known`;
+    new and edited records are parsed and checked. `results` receives the
+    entry of every current record ({"header": [...], "columns": [...],
+    "records": {hash: [[column values], {rule: details}]}}), so deleted rows
+    drop out of the cache.
+    """
+    path = ctx.paths[source]
+    records = raw_records(path)
+    fieldnames = parse_record(next(records, b""))
+    missing = set().union(*(r.columns for r in rules)) - set(fieldnames)
+    if missing:
+        raise SystemExit(f"[FATAL] {path} missing column(s): {', '.join(sorted(missing))}")
+    per_row = [r for r in rules if r.per_row]
+    others = [r for r in rules if not r.per_row]
+    columns = sorted({"flashcard_id"}.union(*(r.columns for r in others)))
+    # the same bytes mean another row under a different header
+    if known.get("header") != fieldnames or known.get("columns") != columns:
+        known = {}
+    known = known.get("records", {})
+    results.update(header=fieldnames, columns=columns)
+    results = results.setdefault("records", {})
+    fid_at = columns.index("flashcard_id")
+
+    for line, record in enumerate(records, start=2):  # line 1 = header
+        key = hashlib.sha1(record).hexdigest()
+        entry = results.get(key) or known.get(key)
+        row = None
+        if entry is None:
+            row = parse_record(record, fieldnames)
+            entry = [[row[c] or "" for c in columns], {}]
+        results[key] = entry
+        values, outcome = entry
+        fid = values[fid_at].strip()
+        if source == "fillgaps":
+            ctx.counts[fid] += 1
+
+        for r in per_row:
+            if r.name in outcome:
+                details = outcome[r.name]
+                found = None if details is None else r.issue(ctx, line, fid, details)
+            else:
+                row = row or parse_record(record, fieldnames)
+                found = r.check(ctx, line, row)
+                outcome[r.name] = None if found is None else found.details
+            if found is not None:
+                issues.append(found)
+        for r in others:
+            found = r.check(ctx, line, row or dict(zip(columns, values)))
+            if found is not None:
+                issues.append(found)
+
+
+def validate(flashcards_path, fillgap_path, breakdown_path=None, rule_names=None,
+             per_card=3, fix=False, output_path=None, cache_dir=None):
+    """
+    Runs the rules; returns the issues per file (fill-gaps, then breakdowns),
+    each in line order followed by the end-of-file ones. With `cache_dir`
+    (ignored when fixing) the run reuses and updates a ValidationCache.
+    """
+    rules = [RULES[name]() for name in (rule_names or RULES)]
+    paths = {"flashcards": str(flashcards_path), "fillgaps": str(fillgap_path),
+             "breakdowns": str(breakdown_path) if breakdown_path else None}
+    cache = ValidationCache(cache_dir) if cache_dir and not fix else None
+    ctx = Context(paths, read_words(flashcards_path), per_card, fix, cache)
+    if cache:
+        # what the per-row results depend on; a file's issues also depend on --per-card and the rules
+        row_deps = file_digest(flashcards_path, *CODE_FILES)
+    issues = []
+
+    for source in ("fillgaps", "breakdowns"):
+        source_rules = [r for r in rules if r.source == source]
+        if not source_rules and not (fix and source == "fillgaps"):
+            continue
+        if not paths[source] or not os.path.exists(paths[source]):
+            print(f"⚠️ No {source} file, skipping: {', '.join(r.name for r in source_rules)}")
+            for r in source_rules:
+                issues.extend(r.finish(ctx))
+            continue
+
+        path = paths[source]
+        if source == "fillgaps" and fix:
+            source_issues = []
+            atomic_write(str(output_path), lambda tmp: scan(ctx, source, source_rules, source_issues, tmp))
+        elif cache:
+            stat = file_stat(path)
+            deps = digest(row_deps, per_card, sorted(r.name for r in source_rules))
+            source_issues = cache.issues(path, stat, deps)
+            if source_issues is not None:
+                issues.extend(source_issues)
+                continue
+            source_issues = []
+            if source in RECORD_CACHED:
+                results = {}
+                scan_incremental(ctx, source, source_rules, source_issues,
+                                 cache.row_results(path, row_deps), results)
+            else:
+                results = None
+                scan(ctx, source, source_rules, source_issues)
+        else:
+            source_issues = []
+            scan(ctx, source, source_rules, source_issues)
+
+        for r in source_rules:
+            source_issues.extend(r.finish(ctx))
+        if cache:
+            cache.store(path, stat, deps, row_deps, source_issues, results)
+        issues.extend(source_issues)
+
+    if cache:
+        cache.save()
+    return issues
+
+
+def write_report(path, issues):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["rule", "file", "line", "flashcard_id", "details", "fixed", "warning"])
+        for issue in issues:
+            w.writerow([issue.rule, issue.file, issue.line or "", issue.flashcard_id, issue.details,
+                        "yes" if issue.fixed else "", "yes" if issue.warning else ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate (and optionally fix) the fill-gap artifacts in one pass")
+    parser.add_argument("-f", "--flashcards", default=DEFAULT_FLASHCARDS, help="flashcard master list")
+    parser.add_argument("-g", "--fillgaps", default=DEFAULT_FILLGAPS, help="fill-gap questions")
+    parser.add_argument("-b", "--breakdowns", default=DEFAULT_BREAKDOWNS, help="fill-gap breakdowns")
+    parser.add_argument("--rules", nargs="+", choices=list(RULES), help="only run these rules (default: all)")
+    parser.add_argument("--list-rules", action="store_true", help="list the rules and exit")
+    parser.add_argument("--per-card", type=int, default=3, help="expected questions per flashcard (default: 3)")
+    parser.add_argument("--fix", action="store_true", help="apply the fixable rules and write the corrected file")
+    parser.add_argument("-o", "--output", help="corrected fill-gap CSV (default: <fillgaps>_fixed.csv)")
+    parser.add_argument("--report", help="optional CSV report of every issue")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and don't update the results of earlier runs")
+    args = parser.parse_args()
+
+    if args.list_rules:
+        for name, cls in RULES.items():
+            print(f"{name:<24} {cls.source:<11} {'fixable ' if cls.fixable else ''}{cls.__doc__}")
+        return
+
+    fillgap_path = Path(args.fillgaps)
+    output_path = Path(args.output) if args.output else fillgap_path.with_stem(fillgap_path.stem + "_fixed")
+    issues = validate(args.flashcards, fillgap_path, args.breakdowns, args.rules,
+                      per_card=args.per_card, fix=args.fix, output_path=output_path,
+                      cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
+
+    counts = collections.Counter(issue.rule for issue in issues)
+    fixed = collections.Counter(issue.rule for issue in issues if issue.fixed)
+    warnings = collections.Counter(issue.rule for issue in issues if issue.warning)
+    print("────────────────────────────────────────────────────────")
+    print("📊  VALIDATION SUMMARY")
+    print("────────────────────────────────────────────────────────")
+    for name in (args.rules or RULES):
+        notes = [f"{fixed[name]} fixed"] * bool(fixed[name]) + [f"{warnings[name]} warnings"] * bool(warnings[name])
+        suffix = f"  ({', '.join(notes)})" if notes else ""
+        print(f"{name + ':':<28}{counts[name]:>6}{suffix}")
+    print("────────────────────────────────────────────────────────")
+
+    if args.fix:
+        print(f"🛠  Corrected file written to: {output_path}")
+    if args.report:
+        write_report(args.report, issues)
+        print(f"📝 Detailed CSV report written to: {args.report}")
+    if any(not issue.fixed and not issue.warning for issue in issues):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
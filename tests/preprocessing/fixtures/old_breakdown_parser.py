@@ -0,0 +1,368 @@
+"""
+The markdown breakdown parser as it was before the single-pass rewrite in
+flashcard_preprocessing/ai_processing/breakdown_parser.py (the regex part of
+the old `parse_analysis_response`), frozen as the reference for
+test_breakdown_parser.py. Do not change it.
+"""
+import regex as re
+
+
+def parse_markdown_breakdown(response_text: str) -> dict:
+    # -------------------------------------------------------------------------
+    # 1) Extract the text for each major heading using improved regex
+    # -------------------------------------------------------------------------
+    vocab_match = re.search(
+        r"###\s*1\.?\s*Vocabulary Breakdown\s*:?(.*?)(?=###\s*2\.|###\s*\d+\.|$)",
+        response_text,
+        flags=re.S
+    )
+    grammar_match = re.search(
+        r"###\s*2\.?\s*Grammar Explanation\s*:?(.*?)(?=###\s*3\.|###\s*\d+\.|$)",
+        response_text,
+        flags=re.S
+    )
+    tips_match = re.search(
+        r"###\s*3\.?\s*Beginner Tips.*?\s*:?(.*?)(?=###\s*\d+\.|$)",
+        response_text,
+        flags=re.S
+    )
+
+    # Safely extract matched sections or empty string if not found
+    vocab_section = vocab_match.group(1).strip() if vocab_match else ""
+    grammar_section = grammar_match.group(1).strip() if grammar_match else ""
+    tips_section = tips_match.group(1).strip() if tips_match else ""
+
+    # Final output template
+    parsed_output = {
+        "vocabulary": [],
+        "grammar": {
+            "context": "",
+            "steps": [],
+            "sentence_pattern": "",
+            "sentence_pattern_kanji": "",
+            "sentence_pattern_hiragana": "",
+            "sentence_pattern_english": "",
+            "contribution": ""
+        },
+        "tips": {
+            "tip": "",
+            "common_mistake": "",
+            "alternative_expression": {
+                "kanji": "",
+                "hiragana": "",
+                "english": ""
+            },
+            "new_words_in_alternative": []
+        }
+    }
+
+    # -------------------------------------------------------------------------
+    # 2) PARSE VOCABULARY BREAKDOWN
+    # -------------------------------------------------------------------------
+    def parse_vocab_section(text: str):
+        vocab_results = []
+        lines = text.splitlines()
+        i = 0
+
+        # Example line:
+        # - **明日 (あした)**: “tomorrow” - [Noun]
+        main_pattern = re.compile(
+            r'^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]',
+            re.U
+        )
+
+        while i < len(lines):
+            line = lines[i].strip()
+
+            m = main_pattern.match(line)
+            if not m:
+                i += 1
+                continue
+
+            word_str, reading_str, meaning_text, role_text = m.groups()
+            vocab_entry = {
+                "word": word_str.strip(),
+                "reading": reading_str.strip(),
+                "meaning": meaning_text.strip(),
+                "role": role_text.strip(),
+                "components": [],
+                "combined_explanation": ""
+            }
+
+            i += 1
+            # Now parse sub-lines (component breakdown, contribution, etc.)
+            while i < len(lines):
+                sub_line = lines[i].rstrip()
+                # If we see a new main bullet that matches main_pattern, break
+                if main_pattern.match(sub_line):
+                    break
+
+                # 1) Look for "Component Breakdown"
+                if re.search(r"(?i)component breakdown", sub_line):
+                    i += 1
+                    while i < len(lines):
+                        comp_line = lines[i].strip()
+                        if not comp_line.startswith("-"):
+                            break
+
+                        # 1A) Check for "Contribution to Overall Meaning"
+                        contrib_match_inside = re.match(
+                            r"^- ?\*?\*?Contribution to Overall Meaning\*?\*?:\s*(.*)$",
+                            comp_line, re.I
+                        )
+                        if contrib_match_inside:
+                            vocab_entry["combined_explanation"] = contrib_match_inside.group(1).strip()
+                            i += 1
+                            continue
+
+                        # 1B) Otherwise parse as a component
+                        comp_regex = re.compile(
+                            r"^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]"
+                        )
+                        comp_match = comp_regex.match(comp_line)
+                        if comp_match:
+                            part_word, part_reading, part_meaning, part_contrib = comp_match.groups()
+                            vocab_entry["components"].append({
+                                "part": part_word.strip(),
+                                "reading": part_reading.strip(),
+                                "meaning": part_meaning.strip(),
+                                "contribution": part_contrib.strip()
+                            })
+                        else:
+                            # simpler fallback
+                            simple_comp = re.match(
+                                r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)$",
+                                comp_line
+                            )
+                            if simple_comp:
+                                part_word, part_reading, part_meaning, part_contrib = simple_comp.groups()
+                                vocab_entry["components"].append({
+                                    "part": part_word.strip(),
+                                    "reading": part_reading.strip(),
+                                    "meaning": part_meaning.strip(),
+                                    "contribution": part_contrib.strip()
+                                })
+
+                        i += 1
+                    continue
+
+                # 2) If line is "Contribution to Overall Meaning" outside
+                outside_contrib_pattern = re.match(
+                    r"^- ?\*?\*?Contribution to Overall Meaning\*?\*?:\s*(.*)$",
+                    sub_line, re.I
+                )
+                if outside_contrib_pattern:
+                    vocab_entry["combined_explanation"] = outside_contrib_pattern.group(1).strip()
+                    i += 1
+                    continue
+
+                # 3) If there's an extra bullet line, append it to combined_explanation
+                if sub_line.startswith("- "):
+                    text_only = sub_line.lstrip("- ").strip()
+                    vocab_entry["combined_explanation"] += " " + text_only
+
+                i += 1
+
+            vocab_results.append(vocab_entry)
+
+        return vocab_results
+
+    parsed_output["vocabulary"] = parse_vocab_section(vocab_section)
+
+    # -------------------------------------------------------------------------
+    # 3) PARSE GRAMMAR
+    # -------------------------------------------------------------------------
+    grammar_data = {
+        "context": "",
+        "steps": [],
+        "sentence_pattern": "",
+        "sentence_pattern_kanji": "",
+        "sentence_pattern_hiragana": "",
+        "sentence_pattern_english": "",
+        "contribution": ""
+    }
+
+    g_lines = grammar_section.splitlines()
+    idx = 0
+    while idx < len(g_lines):
+        gline = g_lines[idx].strip()
+
+        # Check for "Context"
+        if re.match(r"(\d\.\s*)?\**Context\**", gline, re.I):
+            idx += 1
+            context_lines = []
+            # gather lines until next big bullet or blank
+            while idx < len(g_lines):
+                if not g_lines[idx].strip() or re.match(r"(\d\.\s*)?\**Steps\**", g_lines[idx], re.I):
+                    break
+                context_lines.append(g_lines[idx].strip())
+                idx += 1
+            grammar_data["context"] = " ".join(context_lines)
+
+        # Check for "Steps"
+        elif re.match(r"(\d\.\s*)?\**Steps\**", gline, re.I):
+            idx += 1
+            step_list = []
+            while idx < len(g_lines):
+                line = g_lines[idx].strip()
+                if not line or re.match(r"(\d\.\s*)?\**Sentence Pattern\**", line, re.I):
+                    break
+                if line.startswith("-"):
+                    step_list.append(line.lstrip("- ").strip())
+                else:
+                    # Could also gather lines that don't start with '-'
+                    step_list.append(line)
+                idx += 1
+            grammar_data["steps"] = step_list
+
+        # Check for "Sentence Pattern"
+        elif re.match(r"(\d\.\s*)?\**Sentence Pattern\**", gline, re.I):
+            idx += 1
+            pattern_lines = []
+            while idx < len(g_lines):
+                line = g_lines[idx].strip()
+                # Stop if blank line or next bullet heading
+                if not line or line.startswith("---") or re.match(r"^\d\.\s*", line):
+                    break
+                pattern_lines.append(line)
+                idx += 1
+
+            # pattern_lines might be something like:
+            #   - [Time] + [は] + [Verb (dictionary form)] + [の] + [？]
+            #   - **Kanji**: 今日は何をするの？
+            #   - **Hiragana**: きょうはなにをするの？
+            #   - **English Translation**: What are you doing today?
+
+            # We can parse them more granularly:
+            joined_pattern = "\n".join(pattern_lines)
+            grammar_data["sentence_pattern"] = joined_pattern
+
+            # Attempt to capture sub-lines
+            for pline in pattern_lines:
+                pline_str = pline.strip()
+                # - **Kanji**: ...
+                kanji_match = re.match(r"-?\s*\*\*Kanji\*\*:\s*(.*)$", pline_str, re.I)
+                if kanji_match:
+                    grammar_data["sentence_pattern_kanji"] = kanji_match.group(1).strip()
+                    continue
+
+                # - **Hiragana**: ...
+                hira_match = re.match(r"-?\s*\*\*Hiragana\*\*:\s*(.*)$", pline_str, re.I)
+                if hira_match:
+                    grammar_data["sentence_pattern_hiragana"] = hira_match.group(1).strip()
+                    continue
+
+                # - **English Translation**: ...
+                eng_match = re.match(r"-?\s*\*\*English Translation\*\*:\s*(.*)$", pline_str, re.I)
+                if eng_match:
+                    grammar_data["sentence_pattern_english"] = eng_match.group(1).strip()
+                    continue
+
+            idx -= 1  # so outer loop doesn't skip next line
+        idx += 1
+
+    parsed_output["grammar"] = grammar_data
+
+    # -------------------------------------------------------------------------
+    # 4) PARSE TIPS
+    # -------------------------------------------------------------------------
+    tips_data = {
+        "tip": "",
+        "common_mistake": "",
+        "alternative_expression": {
+            "kanji": "",
+            "hiragana": "",
+            "english": ""
+        },
+        "new_words_in_alternative": []
+    }
+
+    t_lines = tips_section.splitlines()
+    j = 0
+    in_new_words_section = False
+    in_alt_expr_section = False
+
+    while j < len(t_lines):
+        tline = t_lines[j].strip()
+
+        # Tip
+        if re.match(r"- ?\*\*Tip\*\*:", tline, re.I):
+            tips_data["tip"] = tline.split(":", 1)[1].strip()
+            in_new_words_section = False
+            in_alt_expr_section = False
+
+        # Common Mistake
+        elif re.match(r"- ?\*\*Common Mistake\*\*:", tline, re.I):
+            tips_data["common_mistake"] = tline.split(":", 1)[1].strip()
+            in_new_words_section = False
+            in_alt_expr_section = False
+
+        # Alternative Expression
+        elif re.match(r"- ?\*\*Alternative Expression\*\*:", tline, re.I):
+            # We’ll parse the lines that follow as Kanji/Hiragana/English
+            in_alt_expr_section = True
+            in_new_words_section = False
+            j += 1
+            # Read lines until we hit a new bullet or blank
+            while j < len(t_lines):
+                alt_line = t_lines[j].strip()
+                # If we see 'New Words' bullet or run out of lines, stop
+                if not alt_line or re.match(r"- ?\*\*New Words in Alternative Expression\*\*:", alt_line, re.I):
+                    j -= 1
+                    break
+
+                # e.g. "- **Kanji**: 明日は出かけますか？"
+                kanji_match = re.match(r"-?\s*\*\*Kanji\*\*:\s*(.*)$", alt_line, re.I)
+                if kanji_match:
+                    tips_data["alternative_expression"]["kanji"] = kanji_match.group(1).strip()
+                hira_match = re.match(r"-?\s*\*\*Hiragana\*\*:\s*(.*)$", alt_line, re.I)
+                if hira_match:
+                    tips_data["alternative_expression"]["hiragana"] = hira_match.group(1).strip()
+                eng_match = re.match(r"-?\s*\*\*English\*\*:\s*(.*)$", alt_line, re.I)
+                if eng_match:
+                    tips_data["alternative_expression"]["english"] = eng_match.group(1).strip()
+
+                j += 1
+
+        # New Words in Alternative Expression
+        elif re.match(r"- ?\*\*New Words in Alternative Expression\*\*:", tline, re.I):
+            in_new_words_section = True
+            in_alt_expr_section = False
+
+        elif in_new_words_section:
+            # For lines like:
+            # - **出かけます (でかけます)**: "to go out" - [Verb, polite form]
+            new_word_pat = re.compile(
+                r"^- ?\*\*(.*?)\s*\((.*?)\)\*\*:\s*[\"“]([^\"”]+)[\"”]\s*-\s*\[(.*?)\]"
+            )
+            mw = new_word_pat.match(tline)
+            if mw:
+                w_word, w_reading, w_meaning, w_extra = mw.groups()
+                tips_data["new_words_in_alternative"].append({
+                    "word": w_word.strip(),
+                    "reading": w_reading.strip(),
+                    "meaning": w_meaning.strip(),
+                    "description": w_extra.strip()
+                })
+            else:
+                # simpler fallback
+                simple_nw = re.match(
+                    r"^- ?(.*?)\s*\((.*?)\):\s*[\"“]([^\"”]+)[\"”]\s*-\s*(.*)?",
+                    tline
+                )
+                if simple_nw:
+                    w_word, w_reading, w_meaning, w_extra = simple_nw.groups()
+                    if w_extra is None:
+                        w_extra = ""
+                    tips_data["new_words_in_alternative"].append({
+                        "word": w_word.strip(),
+                        "reading": w_reading.strip(),
+                        "meaning": w_meaning.strip(),
+                        "description": w_extra.strip()
+                    })
+
+        j += 1
+
+    parsed_output["tips"] = tips_data
+
+    return parsed_output
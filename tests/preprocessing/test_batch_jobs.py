@@ -0,0 +1,247 @@
+"""
+Batch mode end to end with the directory stand-in for the Batch API:
+write_request_file -> run_batch -> read_results, resuming from the saved
+batch state, and create_breakdown_csv.py --batch merging the results into
+the breakdown log (also after a crash in the middle of the merge).
+"""
+import csv
+import json
+import os
+import runpy
+import sys
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from flashcard_preprocessing.ai_processing import batch_jobs  # noqa: E402
+from flashcard_preprocessing.ai_processing.batch_jobs import (  # noqa: E402
+    LocalDirBatchBackend, finish_batch, read_results, run_batch, write_request_file,
+)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ANSWER = os.path.join(os.path.dirname(__file__), "fixtures", "breakdown_answers", "example_1.md")
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setenv("LLM_TELEMETRY", "0")
+
+
+def echo(body):
+    return "answer to " + body["messages"][-1]["content"]
+
+
+class CountingBackend(LocalDirBatchBackend):
+    """LocalDirBatchBackend that counts submissions and can fail one collect."""
+
+    def __init__(self, root, responder=None, fail_collect=False):
+        super().__init__(root, responder)
+        self.submitted = 0
+        self.polled = 0
+        self.fail_collect = fail_collect
+
+    def submit(self, request_path):
+        self.submitted += 1
+        return super().submit(request_path)
+
+    def poll(self, batch_id):
+        self.polled += 1
+        return super().poll(batch_id)
+
+    def collect(self, batch_id, output_path):
+        if self.fail_collect:
+            self.fail_collect = False
+            raise KeyboardInterrupt("interrupted while collecting")
+        super().collect(batch_id, output_path)
+
+
+def write_requests(tmp_path, count=3):
+    path = tmp_path / "requests.jsonl"
+    write_request_file(path, (
+        (f"row-{i}", {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": f"sentence {i}"}]})
+        for i in range(count)
+    ))
+    return path
+
+
+def test_round_trip(tmp_path):
+    requests = write_requests(tmp_path)
+    output, state = tmp_path / "results.jsonl", tmp_path / "state.json"
+    backend = CountingBackend(str(tmp_path / "batches"), echo)
+
+    assert run_batch(backend, requests, output, state_path=state, poll_interval=0) == "completed"
+    assert read_results(requests, output) == {f"row-{i}": f"answer to sentence {i}" for i in range(3)}
+    # kept until the caller has merged the results
+    assert json.loads(state.read_text())["status"] == "completed"
+    finish_batch(state)
+    assert not state.exists()
+
+
+def test_failed_requests_are_left_out(tmp_path):
+    requests = write_requests(tmp_path)
+    output = tmp_path / "results.jsonl"
+    run_batch(LocalDirBatchBackend(str(tmp_path / "batches"), echo), requests, output, poll_interval=0)
+    lines = output.read_text(encoding="utf-8").splitlines()
+    failed = json.loads(lines[1])
+    failed["response"]["status_code"] = 500
+    lines[1] = json.dumps(failed)
+    output.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert sorted(read_results(requests, output)) == ["row-0", "row-2"]
+
+
+def test_resumes_from_state_instead_of_resubmitting(tmp_path):
+    requests = write_requests(tmp_path)
+    output, state = tmp_path / "results.jsonl", tmp_path / "state.json"
+    backend = CountingBackend(str(tmp_path / "batches"), echo, fail_collect=True)
+
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(backend, requests, output, state_path=state, poll_interval=0)
+    assert backend.submitted == 1 and state.exists()
+
+    # the submitted batch is picked up again
+    assert run_batch(backend, requests, output, state_path=state, poll_interval=0) == "completed"
+    assert backend.submitted == 1
+
+    # collected but not merged yet: the output on disk is reused without polling
+    polled = backend.polled
+    assert run_batch(backend, requests, output, state_path=state, poll_interval=0) == "completed"
+    assert (backend.submitted, backend.polled) == (1, polled)
+
+    # after finish_batch the next run is a new batch
+    finish_batch(state)
+    run_batch(backend, requests, output, state_path=state, poll_interval=0)
+    assert backend.submitted == 2
+
+
+def test_unfinished_batch_drops_its_state(tmp_path):
+    requests = write_requests(tmp_path)
+    output, state = tmp_path / "results.jsonl", tmp_path / "state.json"
+    state.write_text(json.dumps({"batch_id": "batch_local_gone"}))
+    status = run_batch(LocalDirBatchBackend(str(tmp_path / "batches")), requests, output,
+                       state_path=state, poll_interval=0)
+    assert status == "failed"
+    assert not state.exists()
+
+
+# ─── create_breakdown_csv.py --batch ─────────────────────────────────────────
+
+FILL_GAPS = [
+    {"flashcard_id": "1", "question": "それから10年が＿＿＿。", "answer": "経った", "english": "Ten years passed."},
+    {"flashcard_id": "2", "question": "＿＿＿から10年が経った。", "answer": "それ", "english": "Since then, ten years."},
+    {"flashcard_id": "3", "question": "それから＿＿＿が経った。", "answer": "10年", "english": "Ten years passed."},
+]
+
+
+@pytest.fixture
+def breakdown_project(tmp_path, monkeypatch):
+    pytest.importorskip("regex")
+    pytest.importorskip("tqdm")
+    (tmp_path / "practice_preprocessing").mkdir()
+    with open(tmp_path / "practice_preprocessing" / "fill_gap_questions.csv", "w", encoding="utf-8",
+              newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(FILL_GAPS[0]))
+        writer.writeheader()
+        writer.writerows(FILL_GAPS)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(os.path.join(PROJECT_ROOT, "practice_preprocessing"))
+
+    with open(ANSWER, encoding="utf-8") as f:
+        answer = f.read()
+    submitted = []
+
+    class Backend(LocalDirBatchBackend):
+        def __init__(self, root):
+            super().__init__(root, responder=lambda body: answer)
+
+        def submit(self, request_path):
+            submitted.append(request_path)
+            return super().submit(request_path)
+
+    monkeypatch.setattr(batch_jobs, "LocalDirBatchBackend", Backend)
+    return tmp_path, submitted
+
+
+def run_create_breakdown_csv(monkeypatch, batch_dir):
+    # --no-repair: the recorded answer has no component breakdowns, and the
+    # section repairs would go to the live API
+    monkeypatch.setattr(sys, "argv", ["create_breakdown_csv.py", "--batch", "--batch-dir", str(batch_dir),
+                                      "--poll-interval", "0", "--no-repair"])
+    runpy.run_path(os.path.join(PROJECT_ROOT, "practice_preprocessing", "create_breakdown_csv.py"),
+                   run_name="__main__")
+
+
+def logged_statuses():
+    from flashcard_preprocessing.ai_processing.record_log import RecordLog
+    with RecordLog("practice_preprocessing/fill_gap_breakdown.log.jsonl") as log:
+        return {key: log.status(key) for key in log.keys()}
+
+
+def test_create_breakdown_csv_merges_the_batch(breakdown_project, monkeypatch):
+    tmp_path, submitted = breakdown_project
+    run_create_breakdown_csv(monkeypatch, tmp_path / "batches")
+
+    assert len(submitted) == 1
+    assert set(logged_statuses()) == {(row["flashcard_id"], row["question"]) for row in FILL_GAPS}
+    assert set(logged_statuses().values()) == {"repair"}  # parsed, components missing
+    assert not os.path.exists("practice_preprocessing/batch/fill_gap_breakdown_batch.json")
+
+
+def test_create_breakdown_csv_finishes_an_interrupted_merge(breakdown_project, monkeypatch):
+    from flashcard_preprocessing.ai_processing.record_log import RecordLog
+
+    tmp_path, submitted = breakdown_project
+    append = RecordLog.append
+    calls = []
+
+    def crash_on_second_row(self, *args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt("crash during the merge")
+        return append(self, *args, **kwargs)
+
+    monkeypatch.setattr(RecordLog, "append", crash_on_second_row)
+    with pytest.raises(KeyboardInterrupt):
+        run_create_breakdown_csv(monkeypatch, tmp_path / "batches")
+    monkeypatch.setattr(RecordLog, "append", append)
+    assert len(logged_statuses()) == 1
+
+    # the rerun merges the rest from the collected results: no second batch
+    run_create_breakdown_csv(monkeypatch, tmp_path / "batches")
+    assert len(submitted) == 1
+    assert set(logged_statuses()) == {(row["flashcard_id"], row["question"]) for row in FILL_GAPS}
+    assert not os.path.exists("practice_preprocessing/batch/fill_gap_breakdown_batch.json")
+
+
+def test_rewritten_csv_does_not_override_newer_log_rows(breakdown_project, monkeypatch):
+    from flashcard_preprocessing.ai_processing.record_log import RecordLog
+
+    tmp_path, _ = breakdown_project
+    run_create_breakdown_csv(monkeypatch, tmp_path / "batches")
+    script = os.path.join(PROJECT_ROOT, "practice_preprocessing", "create_breakdown_csv.py")
+    monkeypatch.setattr(sys, "argv", ["create_breakdown_csv.py", "--compact"])
+    with pytest.raises(SystemExit):
+        runpy.run_path(script, run_name="__main__")
+
+    # after the compaction, rows 1 and 3 get newer breakdowns in the log...
+    keys = [(row["flashcard_id"], row["question"]) for row in FILL_GAPS]
+    with RecordLog("practice_preprocessing/fill_gap_breakdown.log.jsonl") as log:
+        for key in (keys[0], keys[2]):
+            log.append(key, {**log.get(key), "analysis_json": "newer"}, "failed")
+    # ...and another tool rewrites the CSV, changing rows 2 and 3
+    csv_path = "practice_preprocessing/fill_gap_breakdown.csv"
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows[1:]:
+        row["analysis_json"] = "rewritten"
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with pytest.raises(SystemExit):  # --compact again: imports the CSV first
+        runpy.run_path(script, run_name="__main__")
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        merged = {(row["flashcard_id"], row["question"]): row["analysis_json"] for row in csv.DictReader(f)}
+    assert merged == {keys[0]: "newer", keys[1]: "rewritten", keys[2]: "newer"}
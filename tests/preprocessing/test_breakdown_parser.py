@@ -0,0 +1,129 @@
+"""
+The single-pass markdown parser (user-011) and its streaming driver
+(user-012) must give byte-for-byte the same result as the regex parser they
+replaced. The old parser is frozen in fixtures/old_breakdown_parser.py; the
+inputs are the three recorded few-shot answers from the breakdown prompt and
+seeded random mutations of them (dropped, repeated, swapped and re-indented
+lines, broken bullets, headings and quotes, truncated answers, ...).
+"""
+import json
+import os
+import random
+
+import pytest
+
+pytest.importorskip("regex")
+
+from flashcard_preprocessing.ai_processing.breakdown_parser import (  # noqa: E402
+    StreamingBreakdownParser, parse_markdown_breakdown,
+)
+from fixtures import old_breakdown_parser  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "breakdown_answers")
+ANSWERS = sorted(name for name in os.listdir(FIXTURES) if name.endswith(".md"))
+MUTATIONS_PER_ANSWER = 500
+SPLITS_PER_ANSWER = 200
+
+# characters that matter to the parsers
+NOISE = ["#", "###", "*", "**", ":", "-", "- ", " ", "\n", "\n\n", "(", ")", "“", "”", '"', "[", "]", "1.", "2.", "3."]
+
+
+def read_answer(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def dump(result):
+    return json.dumps(result, ensure_ascii=False, sort_keys=False)
+
+
+def mutate(text, rng):
+    """One to four random edits of an answer."""
+    for _ in range(rng.randint(1, 4)):
+        lines = text.split("\n")
+        i = rng.randrange(len(lines))
+        op = rng.randrange(12)
+        if op == 0:
+            del lines[i]
+        elif op == 1:
+            lines.insert(i, lines[i])
+        elif op == 2 and i + 1 < len(lines):
+            lines[i], lines[i + 1] = lines[i + 1], lines[i]
+        elif op == 3:
+            lines.insert(i, "")
+        elif op == 4:
+            lines[i] = lines[i].replace("- ", "-", 1) if rng.random() < 0.5 else lines[i].replace("- ", "", 1)
+        elif op == 5:
+            lines[i] = lines[i].replace("**", "", rng.choice([1, 2, -1]))
+        elif op == 6:
+            lines[i] = lines[i].replace("“", '"').replace("”", '"') if rng.random() < 0.5 \
+                else lines[i].replace("“", "").replace("”", "")
+        elif op == 7:
+            lines[i] = " " * rng.randint(1, 4) + lines[i]
+        elif op == 8:
+            headings = [n for n, line in enumerate(lines) if line.startswith("###")]
+            if headings:
+                n = rng.choice(headings)
+                lines[n] = rng.choice(["", lines[n].replace("###", "##"), lines[n].rstrip() + ":",
+                                       lines[n].replace(". ", " "), "### 4. Extra Notes"])
+        else:
+            text = "\n".join(lines)
+            at = rng.randrange(len(text) + 1)
+            if op == 9:
+                text = text[:at] + rng.choice(NOISE) + text[at:]
+            elif op == 10:
+                text = text[:at] + text[at + rng.randint(1, 6):]
+            else:
+                text = text[:at]
+            continue
+        text = "\n".join(lines)
+    return text
+
+
+def corpus(name, count):
+    rng = random.Random(name)
+    text = read_answer(name)
+    yield text
+    for _ in range(count):
+        yield mutate(text, rng)
+
+
+def stream_parse(text, rng):
+    parser = StreamingBreakdownParser(max_preamble_chars=len(text) + 1)
+    at = 0
+    while at < len(text):
+        size = rng.choice([1, 2, 3, 5, 8, 13, 40, 200])
+        if not parser.feed(text[at:at + size]):
+            break
+        at += size
+    return parser, parser.finish()
+
+
+@pytest.mark.parametrize("name", ANSWERS)
+def test_recorded_answer_has_every_section(name):
+    result = parse_markdown_breakdown(read_answer(name))
+    assert result["vocabulary"]
+    assert result["grammar"]["steps"]
+    assert result["tips"]["tip"]
+
+
+@pytest.mark.parametrize("name", ANSWERS)
+def test_matches_old_parser(name):
+    for n, text in enumerate(corpus(name, MUTATIONS_PER_ANSWER)):
+        expected = dump(old_breakdown_parser.parse_markdown_breakdown(text))
+        assert dump(parse_markdown_breakdown(text)) == expected, f"{name}, mutation {n}:\n{text}"
+
+
+@pytest.mark.parametrize("name", ANSWERS)
+def test_streaming_matches_batch_parser_for_any_chunking(name):
+    rng = random.Random(f"chunks:{name}")
+    texts = list(corpus(name, MUTATIONS_PER_ANSWER))
+    for n in range(SPLITS_PER_ANSWER):
+        text = texts[n % len(texts)]
+        expected = parse_markdown_breakdown(text)
+        parser, result = stream_parse(text, rng)
+        if parser.aborted:
+            # the only early stop left: the vocabulary section closed without entries
+            assert not expected["vocabulary"], f"{name}, split {n}: {parser.aborted}\n{text}"
+        else:
+            assert dump(result) == dump(expected), f"{name}, split {n}:\n{text}"
@@ -0,0 +1,82 @@
+"""
+ResponseCache: finish reasons, cache files from before they were stored,
+batched last_used_at updates and LRU eviction by the running byte total.
+"""
+import sqlite3
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from flashcard_preprocessing.ai_processing import llm_cache  # noqa: E402
+from flashcard_preprocessing.ai_processing.llm_cache import ResponseCache, cached_response  # noqa: E402
+
+USAGE = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15, "cached_tokens": 0}
+
+
+def last_used(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_used_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_finish_reason_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("a", "m", "answer", USAGE, "content_filter")
+    cache.put("b", "m", "answer", USAGE)
+
+    content, usage, finish_reason = cache.get("a")
+    assert (content, usage, finish_reason) == ("answer", USAGE, "content_filter")
+    assert cache.get("b")[2] == "stop"
+    assert cache.get("missing") is None
+    assert cached_response(content, usage, finish_reason).choices[0].finish_reason == "content_filter"
+    cache.close()
+
+
+def test_old_cache_file_gets_finish_reason(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, content TEXT NOT NULL,
+                usage_json TEXT NOT NULL, size_bytes INTEGER NOT NULL, created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL);
+            INSERT INTO responses VALUES ('old', 'm', 'answer', '{}', 6, 1, 1);
+        """)
+
+    cache = ResponseCache(path)
+    assert cache.get("old") == ("answer", {}, "stop")
+    cache.close()
+
+
+def test_hits_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "TOUCH_BATCH", 3)
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    for key in "abc":
+        cache.put(key, "m", "answer", USAGE)
+    before = {key: last_used(path, key) for key in "abc"}
+
+    cache.get("a")
+    cache.get("b")
+    assert {key: last_used(path, key) for key in "ab"} == {key: before[key] for key in "ab"}
+    cache.get("c")  # third hit: the batch is written
+    assert all(last_used(path, key) > before[key] for key in "abc")
+
+    cache.get("a")
+    cache.close()  # pending hits are written on close
+    assert last_used(path, "a") > before["a"]
+
+
+def test_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    for key in "abc":
+        cache.put(key, "m", "x" * 10, USAGE)  # c pushes the total to 30
+    assert cache.get("a") is None
+    assert cache._total == 20
+
+    cache.put("b", "m", "x" * 5, USAGE)  # replacing an entry counts only the difference
+    assert cache._total == 15
+    cache.put("d", "m", "x" * 11, USAGE)  # 26: c is now the least recently used
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert cache._total == cache._count_bytes() == 16
+    cache.close()